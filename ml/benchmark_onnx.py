@@ -0,0 +1,345 @@
+"""
+CycleMate - ONNX Inference Benchmark
+====================================
+
+Export edilen ONNX modellerini onnxruntime CPU execution provider ile ölçer.
+- Soğuk session oluşturma (process'teki ilk InferenceSession) + tekrar yükleme medyanı
+- Tek satır gecikmesi: p50 / p95 / p99 (µs)
+- Batch throughput (rows/sec) farklı batch boyutlarında
+- Peak RSS (VmHWM), import sonrası RSS ve session'ın RSS'e eklediği bellek
+
+Her model ayrı bir process'te ölçülür; soğuk yükleme ve peak RSS diğer modellerden etkilenmez.
+Girdiler gerçekçi feature satırlarıdır. Modelin input genişliğine göre train_cycle_ai_model
+(cycle modelleri) ya da train_model (tip modeli) sentetik verisi kullanılır; --inputs ile .npy verilebilir.
+Sonuç, eğitim koşuları arasında diff'lenebilen JSON'dur (sıralı anahtarlar, yuvarlanmış değerler).
+--baseline önceki JSON ile karşılaştırır, gate'li bir metrikte (p50, throughput, peak RSS)
+--max-regression'ı aşan modelde exit code 1 döner; soğuk yükleme ve p95/p99 sadece raporlanır.
+
+Kullanım:
+    python ml/benchmark_onnx.py
+    python ml/benchmark_onnx.py assets/models/model.onnx ml/models/phase_classification.onnx
+    python ml/benchmark_onnx.py --output ml/onnx_benchmark.json --baseline ml/onnx_benchmark_prev.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from profiling import current_rss_mb, format_mb, peak_rss_mb  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MODELS = [REPO_ROOT / "assets" / "models" / "model.onnx", REPO_ROOT / "ml" / "models" / "*.onnx"]
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "onnx_benchmark.json"
+SCHEMA_VERSION = 1
+
+BATCH_SIZES = [1, 16, 128, 1024]
+LATENCY_ROWS = 1000                 # Tek satır gecikmesi için ölçülen run() sayısı
+WARMUP_RUNS = 20
+LOAD_REPEATS = 5                    # Soğuk yüklemeden sonraki tekrar yüklemeler (medyan)
+THROUGHPUT_SECONDS = 0.5            # Batch boyutu başına en az ölçüm süresi
+INPUT_USERS = 50                    # Girdi satırları için üretilen sentetik kullanıcı
+
+# --baseline karşılaştırması: (metrik yolu, büyüdükçe kötü mü). Gate sadece çok örnekten gelen
+# metriklerde (p50, throughput, peak RSS); p95/p99 kuyruğu ve tek seferlik soğuk yükleme gürültülüdür,
+# sadece raporlanır
+COMPARE_METRICS = [
+    ('size_kb', True),
+    ('cold_load_ms', True),
+    ('load_ms_median', True),
+    ('latency_us.p50', True),
+    ('latency_us.p95', True),
+    ('latency_us.p99', True),
+    (f'throughput_rows_per_sec.{BATCH_SIZES[-1]}', False),
+    ('peak_rss_mb', True),
+]
+GATED_METRICS = {'latency_us.p50', f'throughput_rows_per_sec.{BATCH_SIZES[-1]}', 'peak_rss_mb'}
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    """Diff'lenebilir JSON için anlamlı basamağa yuvarla (ölçülemeyen RSS None kalır)"""
+    return float(f"{value:.{digits}g}") if value is not None else None
+
+
+def resolve_models(patterns: List[str]) -> List[Path]:
+    """Model yolları / glob'ları; sıralı ve tekrarsız"""
+    models = []
+    for pattern in patterns:
+        pattern = Path(pattern)
+        matches = sorted(pattern.parent.glob(pattern.name)) if any(ch in pattern.name for ch in '*?[') else [pattern]
+        models.extend(path.resolve() for path in matches if path.exists())
+    return list(dict.fromkeys(models))
+
+
+def model_key(path: Path) -> str:
+    """JSON anahtarı: repo köküne göre yol (makineler arası diff'lenebilir)"""
+    try:
+        return str(path.relative_to(REPO_ROOT))
+    except ValueError:
+        return str(path)
+
+
+def input_width(path: Path) -> int:
+    """Modelin ilk input'unun feature sayısı"""
+    import onnx
+
+    model = onnx.load(str(path), load_external_data=False)
+    return model.graph.input[0].type.tensor_type.shape.dim[1].dim_value
+
+
+def build_inputs(width: int, seed: int) -> np.ndarray:
+    """
+    Input genişliğine uyan gerçekçi feature satırları: train_cycle_ai_model (cycle modelleri) ya da
+    train_model (tip modeli) sentetik verisi. Hiçbiri uymazsa seed'li standart normal satırlar.
+    """
+    rng = np.random.default_rng(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import generate_synthetic_data as gen
+        import train_cycle_ai_model as tcm
+        import train_model
+
+        if width == len(tcm.get_feature_names()):
+            X = tcm.generate_synthetic_training_data(INPUT_USERS, 6, seed=seed)['features']
+        elif width == train_model.N_FEATURES:
+            users = (gen.generate_cycle_data_vectorized(user_id, gen.generate_user_profile(rng), 6, rng)
+                     for user_id in range(INPUT_USERS))
+            X, _ = train_model.prepare_training_data(users)
+        else:
+            X = rng.standard_normal((BATCH_SIZES[-1] * 4, width))
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return X[rng.permutation(len(X))]
+
+
+def _session(path: Path, threads: int) -> Any:
+    """onnxruntime CPU oturumu (intra/inter op thread sayısı sabit)"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+
+
+def _run_model(args: argparse.Namespace) -> None:
+    """(alt process) Tek modeli ölç, sonucu JSON olarak bas"""
+    import onnxruntime  # noqa: F401  (import maliyeti soğuk yüklemeye karışmasın)
+
+    path = Path(args.model)
+    X = np.load(args.inputs)
+    baseline_mb = current_rss_mb()
+
+    start = time.perf_counter()
+    session = _session(path, args.threads)
+    cold_load = time.perf_counter() - start
+    session_mb = current_rss_mb() - baseline_mb if baseline_mb is not None else None
+    loads = []
+    for _ in range(LOAD_REPEATS):
+        start = time.perf_counter()
+        _session(path, args.threads)
+        loads.append(time.perf_counter() - start)
+
+    input_name = session.get_inputs()[0].name
+    for i in range(WARMUP_RUNS):
+        session.run(None, {input_name: X[i % len(X):i % len(X) + 1]})
+    timings = np.empty(args.rows)
+    for i in range(args.rows):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        session.run(None, {input_name: row})
+        timings[i] = time.perf_counter() - start
+    timings *= 1e6
+
+    throughput = {}
+    for batch_size in BATCH_SIZES:
+        rows, elapsed, offset = 0, 0.0, 0
+        while elapsed < THROUGHPUT_SECONDS:
+            if offset + batch_size > len(X):
+                offset = 0
+            batch = X[offset:offset + batch_size]
+            start = time.perf_counter()
+            session.run(None, {input_name: batch})
+            elapsed += time.perf_counter() - start
+            rows += len(batch)
+            offset += batch_size
+        throughput[str(batch_size)] = _round(rows / elapsed)
+
+    print(json.dumps({
+        'size_kb': _round(path.stat().st_size / 1024),
+        'inputs': [{'name': node.name, 'shape': [dim if isinstance(dim, int) else None for dim in node.shape]}
+                   for node in session.get_inputs()],
+        'outputs': [node.name for node in session.get_outputs()],
+        'cold_load_ms': _round(cold_load * 1e3),
+        'load_ms_median': _round(float(np.median(loads)) * 1e3),
+        'latency_us': {'p50': _round(float(np.percentile(timings, 50))),
+                       'p95': _round(float(np.percentile(timings, 95))),
+                       'p99': _round(float(np.percentile(timings, 99))),
+                       'mean': _round(float(timings.mean()))},
+        'throughput_rows_per_sec': throughput,
+        'import_rss_mb': _round(baseline_mb),
+        'session_rss_mb': _round(session_mb),
+        'peak_rss_mb': _round(peak_rss_mb()),
+    }))
+
+
+def benchmark_models(models: List[Path], threads: int = 1, rows: int = LATENCY_ROWS,
+                     inputs: Optional[str] = None, seed: int = 42) -> Dict[str, Any]:
+    """Her modeli ayrı process'te ölç; girdi satırları input genişliği başına bir kez üretilir"""
+    import onnxruntime
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_files = {}
+        for path in models:
+            width = input_width(path)
+            if width not in input_files:
+                X = np.load(inputs) if inputs else build_inputs(width, seed)
+                if X.shape[1] != width:
+                    raise ValueError(f"{inputs} has {X.shape[1]} features, {path.name} expects {width}")
+                input_files[width] = Path(tmp_dir) / f"inputs_{width}.npy"
+                np.save(input_files[width], np.ascontiguousarray(X, dtype=np.float32))
+            process = subprocess.run(
+                [sys.executable, __file__, '_model-run', '--model', str(path), '--inputs', str(input_files[width]),
+                 '--threads', str(threads), '--rows', str(rows)],
+                capture_output=True, text=True
+            )
+            if process.returncode == 0:
+                results[model_key(path)] = json.loads(process.stdout.strip().splitlines()[-1])
+            else:
+                # Float feature matrisi almayan modeller (ör. eski encoder export'ları) ölçülemez
+                error = (process.stderr.strip().splitlines() or ['unknown error'])[-1]
+                results[model_key(path)] = {'error': error[:300]}
+
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'onnxruntime': onnxruntime.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'settings': {'threads': threads, 'latency_rows': rows, 'warmup_runs': WARMUP_RUNS,
+                     'load_repeats': LOAD_REPEATS, 'batch_sizes': BATCH_SIZES,
+                     'throughput_seconds': THROUGHPUT_SECONDS, 'inputs': inputs or 'synthetic', 'seed': seed},
+        'models': results,
+    }
+
+
+def _metric(result: Dict[str, Any], path: str) -> Optional[float]:
+    """'latency_us.p95' gibi noktalı yoldaki değer"""
+    for key in path.split('.'):
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare_reports(baseline: Dict[str, Any], report: Dict[str, Any],
+                    max_regression: float = 0.25) -> List[str]:
+    """Ortak modellerde metrik değişimlerini bas; GATED_METRICS'te max_regression'ı aşanları döndür"""
+    regressions = []
+    print(f"\nComparison with baseline ({baseline.get('created', '?')}), max regression {max_regression:.0%}:")
+    for key in sorted(set(baseline['models']) & set(report['models'])):
+        print(f"  {key}")
+        for path, higher_is_worse in COMPARE_METRICS:
+            old, new = _metric(baseline['models'][key], path), _metric(report['models'][key], path)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            worse = change if higher_is_worse else -change
+            flag = ''
+            if worse > max_regression:
+                flag = '  REGRESSION' if path in GATED_METRICS else '  (not gated)'
+                if path in GATED_METRICS:
+                    regressions.append(f"{key} {path}: {old} -> {new} ({change:+.1%})")
+            print(f"    {path:32s} {old:>12.4g} -> {new:<12.4g} {change:+7.1%}{flag}")
+    for key in sorted(set(baseline['models']) ^ set(report['models'])):
+        print(f"  {key}: only in {'baseline' if key in baseline['models'] else 'this run'}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Sonuç tablosu"""
+    largest = str(BATCH_SIZES[-1])
+    print(f"ONNX inference benchmark: onnxruntime {report['environment']['onnxruntime']} CPU, "
+          f"{report['settings']['threads']} thread(s), {report['settings']['latency_rows']} single-row runs")
+    print(f"  {'model':45s} {'KB':>7s} {'cold(ms)':>9s} {'load(ms)':>9s} {'p50(µs)':>8s} {'p95(µs)':>8s} "
+          f"{'p99(µs)':>8s} {'rows/s@1':>9s} {'rows/s@' + largest:>11s} {'peak MB':>8s}")
+    for key, result in report['models'].items():
+        if 'error' in result:
+            print(f"  {key:45s} failed: {result['error'][:100]}")
+            continue
+        print(f"  {key:45s} {result['size_kb']:7.0f} {result['cold_load_ms']:9.1f} {result['load_ms_median']:9.1f} "
+              f"{result['latency_us']['p50']:8.1f} {result['latency_us']['p95']:8.1f} {result['latency_us']['p99']:8.1f} "
+              f"{result['throughput_rows_per_sec']['1']:9.0f} {result['throughput_rows_per_sec'][largest]:11.0f} "
+              f"{format_mb(result['peak_rss_mb'], '8.1f', '')}")
+
+
+def bench(args: argparse.Namespace) -> None:
+    """Modelleri ölç, JSON'a yaz ve (verildiyse) baseline ile karşılaştır"""
+    models = resolve_models(args.models or [str(path) for path in DEFAULT_MODELS])
+    if not models:
+        raise SystemExit("No ONNX models found")
+
+    report = benchmark_models(models, threads=args.threads, rows=args.rows, inputs=args.inputs, seed=args.seed)
+    print_report(report)
+    with Path(args.output).open('w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\n✓ Results saved: {args.output}")
+
+    if args.baseline:
+        with Path(args.baseline).open() as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.max_regression)
+        if regressions:
+            print("\n❌ Inference regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✓ No inference regressions")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '_model-run':
+        run_parser = argparse.ArgumentParser()
+        run_parser.add_argument('command')
+        run_parser.add_argument('--model', required=True)
+        run_parser.add_argument('--inputs', required=True)
+        run_parser.add_argument('--threads', type=int, required=True)
+        run_parser.add_argument('--rows', type=int, required=True)
+        _run_model(run_parser.parse_args())
+        return
+
+    parser = argparse.ArgumentParser(description="CycleMate ONNX Inference Benchmark")
+    parser.add_argument("models", nargs="*",
+                        help="ONNX model paths or globs (default: assets/models/model.onnx, ml/models/*.onnx)")
+    parser.add_argument("--output", type=str, default=str(DEFAULT_OUTPUT), help="Result JSON path")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Previous result JSON; exit 1 if a gated metric regresses beyond --max-regression")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative regression for p50 latency, throughput and peak RSS "
+                             "(cold load and p95/p99 are reported but not gated)")
+    parser.add_argument("--threads", type=int, default=1, help="onnxruntime intra-op threads (device: 1)")
+    parser.add_argument("--rows", type=int, default=LATENCY_ROWS, help="Single-row runs for latency percentiles")
+    parser.add_argument("--inputs", type=str, default=None, help="Feature rows (.npy, float32) instead of synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    bench(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1035 @@
+"""
+CycleMate - ML Pipeline Benchmark
+=================================
+
+Veri üretim / eğitim pipeline'ı için ölçüm komutları.
+- generator: python vs numpy motoru (users/sec + dağılım karşılaştırması)
+- formats: JSON vs JSON Lines vs kolonsal .npz shard (yazma süresi, boyut, yükleme süresi)
+- loader: train_model liste yükleme vs lazy shard akışı (peak RSS, süre)
+- features: log bazlı vs vektörize feature extraction (parity kontrolü + logs/sec)
+- cycles: log -> cycle eşleme (lineer tarama vs searchsorted vs cycleIndex), 12 vs 60 cycle
+- training-data: train_cycle_ai_model gün gün vs vektörize sentetik veri (rows/sec + dağılım)
+- regression: hedef başına ayrı HGB vs tek period modeli + sabit gün offset'leri
+- training-memory: train_cycle_ai_model veri hazırlığı peak RSS (float64/string hedefler vs float32/int8)
+- symptom-targets: symptom hedef matrisi (list.index döngüsü vs uint32 bitmask unpack)
+- out-of-core: eski satır limitleri (max_samples / mood alt örneklemesi) vs tüm satırlar vs out-of-core
+- feature-store: HGB'lerin her fit'te X'i yeniden bin'lemesi vs bir kez quantize edilmiş uint8 store
+- search: sabit HGB/RF hiperparametreleri vs --search (successive halving) seçimi; kalite + ONNX boyut/gecikme
+- early-stopping: sabit boyutlu HGB/RF vs kullanıcı bazlı holdout'ta early stopping (süre, ağaç, ONNX boyutu)
+- export-budget: phase_classification export varyantları (budanmış orman, damıtılmış MLP, fp16) boyut/accuracy tablosu
+- onnx-parity: görev başına dönüştürücü, ONNX boyutu ve onnxruntime/sklearn parity (HGB: skl2onnx vs hgb_to_onnx)
+- fused-export: görev başına ayrı ONNX oturumları vs tek fused multi-head graph (yükleme süresi, tek satır gecikmesi)
+
+Kullanım:
+    python ml/benchmark_pipeline.py generator --users 500 --cycles 12
+    python ml/benchmark_pipeline.py formats --users 2000
+    python ml/benchmark_pipeline.py loader --users 4000 --format jsonl
+    python ml/benchmark_pipeline.py features --users 1000
+    python ml/benchmark_pipeline.py cycles --users 500 --cycles 12 60
+    python ml/benchmark_pipeline.py training-data --users 500
+    python ml/benchmark_pipeline.py regression --users 2000
+    python ml/benchmark_pipeline.py training-memory --users 10000
+    python ml/benchmark_pipeline.py symptom-targets --users 10000
+    python ml/benchmark_pipeline.py out-of-core --users 10000
+    python ml/benchmark_pipeline.py feature-store --users 4000
+    python ml/benchmark_pipeline.py search --users 2000 --budget 600
+    python ml/benchmark_pipeline.py early-stopping --users 2000
+    python ml/benchmark_pipeline.py export-budget --users 2000
+    python ml/benchmark_pipeline.py onnx-parity --users 2000
+    python ml/benchmark_pipeline.py fused-export --users 2000
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import generate_synthetic_data as gen  # noqa: E402
+from profiling import RssSampler, anon_rss_mb, peak_rss_mb  # noqa: E402
+
+
+def _summarize_users(users: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Kullanıcı kayıtlarından dağılım özetleri çıkar"""
+    cycle_lengths, period_lengths, severities = [], [], []
+    symptoms, moods, flows = Counter(), Counter(), Counter()
+    total_logs = total_cycles = 0
+
+    for user in users:
+        total_cycles += len(user['cycles'])
+        total_logs += user['totalLogs']
+        for cycle in user['cycles']:
+            cycle_lengths.append(cycle['cycleLength'])
+            period_lengths.append(cycle['periodLength'])
+        for log in user['logs']:
+            for symptom in log['symptoms']:
+                symptoms[symptom['id']] += 1
+                severities.append(symptom['severity'])
+            moods[log['mood']] += 1
+            flows[log['flow']] += 1
+
+    return {
+        'avgCycleLength': float(np.mean(cycle_lengths)),
+        'avgPeriodLength': float(np.mean(period_lengths)),
+        'logsPerCycle': total_logs / total_cycles,
+        'symptomsPerLog': sum(symptoms.values()) / total_logs,
+        'avgSeverity': float(np.mean(severities)),
+        'moodShare': {m: moods[m] / total_logs for m in gen.MOODS},
+        'symptomShare': {s: symptoms[s] / total_logs for s in gen.SYMPTOMS},
+        'flowShare': {str(f): flows[f] / total_logs for f in [None] + gen.FLOWS},
+    }
+
+
+def _run_engine(engine: str, num_users: int, cycles: int, seed: int) -> Dict[str, Any]:
+    start_date = datetime(2024, 1, 1)
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
+
+    users = []
+    start = time.perf_counter()
+    for user_id in range(1, num_users + 1):
+        if engine == 'numpy':
+            profile = gen.generate_user_profile(rng)
+            users.append(gen.generate_cycle_data_vectorized(user_id, profile, cycles, rng, start_date))
+        else:
+            profile = gen.generate_user_profile()
+            users.append(gen.generate_cycle_data(user_id, profile, cycles, start_date))
+    elapsed = time.perf_counter() - start
+
+    # Sadece dizi üretimi (JSON kayıt dönüşümü hariç)
+    arrays_elapsed = None
+    if engine == 'numpy':
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        for user_id in range(1, num_users + 1):
+            profile = gen.generate_user_profile(rng)
+            gen.generate_cycle_arrays(user_id, profile, cycles, rng, start_date)
+        arrays_elapsed = time.perf_counter() - start
+
+    return {
+        'elapsed': elapsed,
+        'users_per_sec': num_users / elapsed,
+        'arrays_users_per_sec': num_users / arrays_elapsed if arrays_elapsed else None,
+        'summary': _summarize_users(users),
+    }
+
+
+def bench_generator(args: argparse.Namespace) -> None:
+    """Python ve NumPy motorlarının hızını ve dağılımlarını karşılaştır"""
+    results = {engine: _run_engine(engine, args.users, args.cycles, args.seed) for engine in gen.ENGINES}
+    py, vec = results['python'], results['numpy']
+
+    print(f"Generator benchmark: {args.users} users x {args.cycles} cycles (seed={args.seed})")
+    print(f"  python: {py['users_per_sec']:8.1f} users/sec ({py['elapsed']:.2f}s)")
+    print(f"  numpy:  {vec['users_per_sec']:8.1f} users/sec ({vec['elapsed']:.2f}s, records)")
+    print(f"          {vec['arrays_users_per_sec']:8.1f} users/sec (arrays only)")
+    print(f"  speedup: {vec['users_per_sec'] / py['users_per_sec']:.1f}x records, "
+          f"{vec['arrays_users_per_sec'] / py['users_per_sec']:.1f}x arrays")
+
+    print("\nDistribution check (python vs numpy):")
+    for key in ['avgCycleLength', 'avgPeriodLength', 'logsPerCycle', 'symptomsPerLog', 'avgSeverity']:
+        print(f"  {key:18s} {py['summary'][key]:8.3f} {vec['summary'][key]:8.3f}")
+    for group in ['moodShare', 'symptomShare', 'flowShare']:
+        py_share, vec_share = py['summary'][group], vec['summary'][group]
+        max_diff = max(abs(py_share[k] - vec_share[k]) for k in py_share)
+        print(f"  {group:18s} max abs diff {max_diff:.4f}")
+
+
+def bench_formats(args: argparse.Namespace) -> None:
+    """JSON ve .npz shard formatlarını boyut + yazma/yükleme süresi ile karşılaştır"""
+    import train_model
+
+    print(f"Shard format benchmark: {args.users} users x {args.cycles} cycles (engine=numpy)")
+    print(f"  {'format':8s} {'write(s)':>9s} {'size(MB)':>9s} {'read(s)':>8s} {'load(s)':>8s}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for shard_format in gen.SHARD_FORMATS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                dataset = gen.generate_dataset(args.users, args.cycles, args.seed, engine='numpy',
+                                               shard_format=shard_format, output_dir=tmp_dir)
+                write_elapsed = time.perf_counter() - start
+
+                shard_files = dataset['metadata']['shardFiles']
+                size_mb = sum(Path(f).stat().st_size for f in shard_files) / (1024 * 1024)
+
+                # read: ham dosya okuma (json.load / np.load), load: train_model'in gördüğü kullanıcı kayıtları
+                start = time.perf_counter()
+                for shard_file in shard_files:
+                    if shard_format == 'npz':
+                        gen.read_npz_shard(shard_file)
+                    elif shard_format == 'jsonl':
+                        for _ in gen.iter_jsonl_shard(shard_file):
+                            pass
+                    else:
+                        with open(shard_file, 'r', encoding='utf-8') as f:
+                            json.load(f)
+                read_elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                train_model.load_shard_files(str(Path(tmp_dir) / f"*_part_*.{shard_format}"))
+                load_elapsed = time.perf_counter() - start
+
+            print(f"  {shard_format:8s} {write_elapsed:9.2f} {size_mb:9.1f} {read_elapsed:8.2f} {load_elapsed:8.2f}")
+
+
+def _run_loader(args: argparse.Namespace) -> None:
+    """(alt process) Tek yükleme modunu çalıştır, sonucu JSON olarak bas"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_model
+        baseline_mb = peak_rss_mb()
+        start = time.perf_counter()
+        if args.mode == 'list':
+            X, y = train_model.prepare_training_data(train_model.load_shard_files(args.data))
+        else:
+            shard_files = train_model.find_shard_files(args.data)
+            X, y = train_model.prepare_training_data(train_model.iter_shard_users(shard_files),
+                                                     train_model.count_shard_logs(shard_files))
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'elapsed': elapsed,
+        'baseline_mb': baseline_mb,
+        'peak_mb': peak_rss_mb(),
+        'xy_mb': (X.nbytes + y.nbytes) / (1024 * 1024),
+        'samples': len(X),
+    }))
+
+
+def bench_loader(args: argparse.Namespace) -> None:
+    """Liste tabanlı ve lazy yüklemenin peak RSS'ini ayrı process'lerde ölç"""
+    print(f"Loader memory benchmark: {args.users} users x {args.cycles} cycles (format={args.format})")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen.generate_dataset(args.users, args.cycles, args.seed, engine='numpy',
+                                 shard_format=args.format, output_dir=tmp_dir)
+        pattern = str(Path(tmp_dir) / f"*_part_*.{args.format}")
+
+        print(f"  {'mode':8s} {'time(s)':>8s} {'imports(MB)':>12s} {'peak(MB)':>9s} {'delta(MB)':>10s} {'X+y(MB)':>8s}")
+        for mode in ['list', 'stream']:
+            output = subprocess.run(
+                [sys.executable, __file__, '_loader-run', '--mode', mode, '--data', pattern],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"  {mode:8s} {result['elapsed']:8.2f} {result['baseline_mb']:12.1f} {result['peak_mb']:9.1f} "
+                  f"{result['peak_mb'] - result['baseline_mb']:10.1f} {result['xy_mb']:8.1f}")
+
+
+# Parity kontrolüne eklenen uç durumlar (eksik alanlar, bilinmeyen ID'ler, None değerler)
+EDGE_CASE_LOGS = [
+    ({}, {}),
+    ({'dayInCycle': 3, 'phase': 'unknown', 'symptoms': None, 'mood': None, 'flow': None}, {'cycleLength': 30}),
+    ({'dayInCycle': 1, 'symptoms': [{'id': 'cramp', 'severity': 3}, {'id': 'legacySymptom', 'severity': 1}],
+      'mood': 'tired', 'flow': 'spotting'}, {'cycleLength': 26, 'periodLength': 4}),
+    ({'dayInCycle': 20, 'phase': 'luteal', 'symptoms': [{'id': 'sleepy', 'severity': 2}], 'mood': 'angry'},
+     {'cycleLength': 33, 'periodLength': 6}),
+]
+
+
+def bench_features(args: argparse.Namespace) -> None:
+    """extract_features_from_log ile extract_features_batch'in aynı çıktıyı ürettiğini doğrula ve hızı ölç"""
+    import train_model
+
+    rng = np.random.default_rng(args.seed)
+    start_date = datetime(2024, 1, 1)
+    logs, cycle_infos = [], []
+    for user_id in range(1, args.users + 1):
+        profile = gen.generate_user_profile(rng)
+        user = gen.generate_cycle_data_vectorized(user_id, profile, args.cycles, rng, start_date)
+        for log in user['logs']:
+            cycle_info = next(c for c in user['cycles'] if c['cycleStart'] <= log['date'] <= c['cycleEnd'])
+            logs.append(log)
+            cycle_infos.append(cycle_info)
+    for log, cycle_info in EDGE_CASE_LOGS:
+        logs.append(log)
+        cycle_infos.append(cycle_info)
+
+    start = time.perf_counter()
+    X_ref = np.array([train_model.extract_features_from_log(log, c) for log, c in zip(logs, cycle_infos)],
+                     dtype=np.float32)
+    y_ref = np.array([train_model.determine_tip_label(log, log.get('phase', 'menstrual')) for log in logs],
+                     dtype=np.int64)
+    ref_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X_batch, y_batch = [], []
+    for i in range(0, len(logs), train_model.FEATURE_BATCH_SIZE):
+        X_block, y_block = train_model.extract_features_batch(
+            logs[i:i + train_model.FEATURE_BATCH_SIZE], cycle_infos[i:i + train_model.FEATURE_BATCH_SIZE]
+        )
+        X_batch.append(X_block)
+        y_batch.append(y_block)
+    X_batch, y_batch = np.concatenate(X_batch), np.concatenate(y_batch)
+    batch_elapsed = time.perf_counter() - start
+
+    features_equal = X_ref.shape == X_batch.shape and np.array_equal(X_ref.view(np.uint32), X_batch.view(np.uint32))
+    labels_equal = np.array_equal(y_ref, y_batch)
+
+    print(f"Feature extraction benchmark: {len(logs)} logs ({args.users} users x {args.cycles} cycles "
+          f"+ {len(EDGE_CASE_LOGS)} edge cases)")
+    print(f"  per-log: {len(logs) / ref_elapsed:10.0f} logs/sec ({ref_elapsed:.2f}s)")
+    print(f"  batch:   {len(logs) / batch_elapsed:10.0f} logs/sec ({batch_elapsed:.2f}s)")
+    print(f"  speedup: {ref_elapsed / batch_elapsed:.1f}x")
+    print(f"  parity:  features {'bit-identical' if features_equal else 'MISMATCH'}, "
+          f"labels {'identical' if labels_equal else 'MISMATCH'}")
+    if not (features_equal and labels_equal):
+        sys.exit(1)
+
+
+def _linear_scan_lookup(cycles: List[Dict[str, Any]], logs: List[Dict[str, Any]]) -> List[int]:
+    """Eski prepare_training_data eşlemesi: her log için cycle listesinde string karşılaştırmalı tarama"""
+    indices = []
+    for log in logs:
+        index = -1
+        for i, cycle in enumerate(cycles):
+            if cycle['cycleStart'] <= log['date'] <= cycle['cycleEnd']:
+                index = i
+                break
+        indices.append(index)
+    return indices
+
+
+def bench_cycles(args: argparse.Namespace) -> None:
+    """Log -> cycle eşleme yöntemlerini farklı cycle sayılarında karşılaştır"""
+    import train_model
+
+    print(f"Cycle lookup benchmark: {args.users} users (seed={args.seed})")
+    print(f"  {'cycles':>6s} {'logs':>8s} {'linear(s)':>10s} {'searchsorted(s)':>16s} {'cycleIndex(s)':>14s} "
+          f"{'prepare(s)':>11s} {'legacy prepare(s)':>18s}")
+
+    for num_cycles in args.cycles:
+        rng = np.random.default_rng(args.seed)
+        users = [
+            gen.generate_cycle_data_vectorized(user_id, gen.generate_user_profile(rng), num_cycles, rng,
+                                               datetime(2020, 1, 1))
+            for user_id in range(1, args.users + 1)
+        ]
+        # cycleIndex alanı olmayan (eski format) kopya
+        legacy_users = [
+            {**user, 'logs': [{k: v for k, v in log.items() if k != 'cycleIndex'} for log in user['logs']]}
+            for user in users
+        ]
+
+        timings = {}
+        results = {}
+        for name, lookup, data in [
+            ('linear', _linear_scan_lookup, legacy_users),
+            ('searchsorted', lambda c, l: train_model.find_log_cycle_indices(c, l).tolist(), legacy_users),
+            ('cycleIndex', lambda c, l: train_model.find_log_cycle_indices(c, l).tolist(), users),
+        ]:
+            start = time.perf_counter()
+            results[name] = [lookup(user['cycles'], user['logs']) for user in data]
+            timings[name] = time.perf_counter() - start
+
+        if not results['linear'] == results['searchsorted'] == results['cycleIndex']:
+            print(f"  {num_cycles}: cycle index MISMATCH")
+            sys.exit(1)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            train_model.prepare_training_data(users)
+            timings['prepare'] = time.perf_counter() - start
+            start = time.perf_counter()
+            train_model.prepare_training_data(legacy_users)
+            timings['legacy_prepare'] = time.perf_counter() - start
+
+        total_logs = sum(user['totalLogs'] for user in users)
+        print(f"  {num_cycles:6d} {total_logs:8d} {timings['linear']:10.2f} {timings['searchsorted']:16.2f} "
+              f"{timings['cycleIndex']:14.2f} {timings['prepare']:11.2f} {timings['legacy_prepare']:18.2f}")
+
+
+def bench_training_data(args: argparse.Namespace) -> None:
+    """train_cycle_ai_model.generate_synthetic_training_data motorlarını karşılaştır"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model
+
+    results = {}
+    for engine in train_cycle_ai_model.TRAINING_DATA_ENGINES:
+        np.random.seed(args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            data = train_cycle_ai_model.generate_synthetic_training_data(args.users, args.cycles,
+                                                                         engine=engine, seed=args.seed)
+            elapsed = time.perf_counter() - start
+        results[engine] = (data, elapsed)
+
+    feature_names = train_cycle_ai_model.get_feature_names()
+    print(f"Training data benchmark: {args.users} users x {args.cycles} cycles (seed={args.seed})")
+    for engine, (data, elapsed) in results.items():
+        print(f"  {engine:7s} {len(data['features']) / elapsed:10.0f} rows/sec ({elapsed:.2f}s, "
+              f"shape {data['features'].shape}, {len(feature_names)} feature names)")
+    py, vec = results['python'][0], results['numpy'][0]
+    print(f"  speedup: {results['python'][1] / results['numpy'][1]:.1f}x")
+
+    print("\nDistribution check (python vs numpy):")
+    mean_diff = np.abs(py['features'].mean(axis=0) - vec['features'].mean(axis=0))
+    worst = int(np.argmax(mean_diff))
+    print(f"  feature means      max abs diff {mean_diff[worst]:.4f} ({feature_names[worst]})")
+    for key in ['next_period', 'ovulation', 'fertile_window_start', 'fertile_window_end', 'energy_level']:
+        print(f"  {key:20s} {np.mean(py['targets'][key]):8.3f} {np.mean(vec['targets'][key]):8.3f}")
+    for key in ['phase', 'mood']:
+        py_share, vec_share = Counter(py['targets'][key]), Counter(vec['targets'][key].tolist())
+        max_diff = max(abs(py_share[k] / len(py['features']) - vec_share[k] / len(vec['features']))
+                       for k in set(py_share) | set(vec_share))
+        print(f"  {key:20s} max share diff {max_diff:.4f}")
+    prevalence_diff = np.abs(train_cycle_ai_model.unpack_symptom_masks(py['targets']['symptoms']).mean(axis=0)
+                             - train_cycle_ai_model.unpack_symptom_masks(vec['targets']['symptoms']).mean(axis=0))
+    print(f"  {'symptoms':20s} max label prevalence diff {prevalence_diff.max():.4f}")
+
+
+def bench_symptom_targets(args: argparse.Namespace) -> None:
+    """Symptom hedef matrisi: string listesi + list.index döngüsü vs uint32 bitmask unpack"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+    masks = data['targets']['symptoms']
+    symptom_lists = [[tcm.SYMPTOMS[j] for j in range(len(tcm.SYMPTOMS)) if mask >> j & 1] for mask in masks.tolist()]
+
+    start = time.perf_counter()
+    legacy = np.zeros((len(symptom_lists), len(tcm.SYMPTOMS)))
+    for i, symptoms in enumerate(symptom_lists):
+        for symptom in symptoms:
+            if symptom in tcm.SYMPTOMS:
+                legacy[i, tcm.SYMPTOMS.index(symptom)] = 1
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unpacked = tcm.unpack_symptom_masks(masks)
+    unpack_time = time.perf_counter() - start
+
+    repacked = tcm.pack_symptom_matrix(unpacked)
+    parity = np.array_equal(legacy, unpacked) and np.array_equal(repacked, masks)
+    print(f"Symptom target benchmark: {len(masks):,} rows ({args.users} users x {args.cycles} cycles)")
+    print(f"  {'method':14s} {'time(s)':>8s} {'MB':>8s}")
+    print(f"  {'list.index':14s} {legacy_time:8.3f} {legacy.nbytes / 2**20:8.1f}  (+ {len(symptom_lists):,} python lists)")
+    print(f"  {'bitmask':14s} {unpack_time:8.3f} {unpacked.nbytes / 2**20:8.1f}  "
+          f"(packed {masks.nbytes / 2**20:.1f} MB uint32)")
+    print(f"  speedup: {legacy_time / unpack_time:.0f}x | parity: {'OK' if parity else 'MISMATCH'}")
+    if not parity:
+        sys.exit(1)
+
+
+def bench_regression(args: argparse.Namespace) -> None:
+    """Dört gün offset hedefi için ayrı modeller ile shared (period + offset) modu karşılaştır"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+    from sklearn.model_selection import GroupKFold
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    X_train, X_test = X[train_idx], X[test_idx]
+
+    def _fit(target: str):
+        model = tcm._make_task_model('period_prediction', 1)
+        start = time.perf_counter()
+        model.fit(X_train, y[target][train_idx])
+        return model, time.perf_counter() - start
+
+    separate_preds, separate_time = {}, 0.0
+    for target in tcm.DAY_OFFSET_TARGETS:
+        model, elapsed = _fit(target)
+        separate_preds[target] = model.predict(X_test)
+        separate_time += elapsed
+
+    period_model, shared_time = _fit('next_period')
+    period_pred = period_model.predict(X_test)
+    shared_preds = {target: period_pred + offset for target, offset in tcm.DAY_OFFSET_TARGETS.items()}
+
+    print(f"Day-offset regression benchmark: {args.users} users x {args.cycles} cycles, "
+          f"fold 1 ({len(train_idx):,} train / {len(test_idx):,} test)")
+    print(f"  {'target':22s} {'MAE sep':>8s} {'MAE shared':>11s} {'±2d sep':>8s} {'±2d shared':>11s}")
+    for target in tcm.DAY_OFFSET_TARGETS:
+        truth = y[target][test_idx]
+        sep_err, shared_err = np.abs(separate_preds[target] - truth), np.abs(shared_preds[target] - truth)
+        print(f"  {target:22s} {sep_err.mean():8.3f} {shared_err.mean():11.3f} "
+              f"{np.mean(sep_err <= 2.0) * 100:7.1f}% {np.mean(shared_err <= 2.0) * 100:10.1f}%")
+    print(f"  fit time: separate {separate_time:.1f}s ({len(tcm.DAY_OFFSET_TARGETS)} models) | "
+          f"shared {shared_time:.1f}s (1 model)")
+
+
+def _legacy_prepare(data: Dict[str, Any]) -> tuple:
+    """Eski temsil: float64 features, string/list hedefler, LabelEncoder.fit_transform ve list.index döngüsü"""
+    import train_cycle_ai_model as tcm
+    from sklearn.preprocessing import LabelEncoder
+
+    X = data['features'].astype(np.float64)
+    targets = data['targets']
+    y = {key: np.array(targets[key].tolist()) for key in
+         ['next_period', 'ovulation', 'fertile_window_start', 'fertile_window_end', 'energy_level']}
+    phase = np.array(tcm.PHASE_CLASSES)[targets['phase']].tolist()
+    mood = np.array(tcm.MOOD_CLASSES)[targets['mood']].tolist()
+    symptoms = [[tcm.SYMPTOMS[j] for j in np.flatnonzero(row)] for row in tcm.unpack_symptom_masks(targets['symptoms'])]
+    del data, targets
+
+    y['phase'] = LabelEncoder().fit_transform(phase)
+    y['mood'] = LabelEncoder().fit_transform(mood)
+    symptom_matrix = np.zeros((len(X), len(tcm.SYMPTOMS)))
+    for i, row in enumerate(symptoms):
+        for symptom in row:
+            symptom_matrix[i, tcm.SYMPTOMS.index(symptom)] = 1.0
+    y['symptoms'] = symptom_matrix
+    return X, y, phase, mood, symptoms
+
+
+def _run_training_memory(args: argparse.Namespace) -> None:
+    """(alt process) Veri üretimi + hazırlığı tek temsil ile çalıştır, peak RSS'i JSON olarak bas"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        baseline_mb = peak_rss_mb()
+        start = time.perf_counter()
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        if args.mode == 'legacy':
+            X, y, *_ = _legacy_prepare(data)
+        else:
+            X, y, *_ = tcm.prepare_data_for_training(data)
+        del data
+        elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'elapsed': elapsed,
+        'baseline_mb': baseline_mb,
+        'peak_mb': peak_rss_mb(),
+        'x_mb': X.nbytes / (1024 * 1024),
+        'y_mb': sum(v.nbytes for v in y.values()) / (1024 * 1024),
+        'samples': len(X),
+    }))
+
+
+def bench_training_memory(args: argparse.Namespace) -> None:
+    """Eski (float64 + string hedef) ve kompakt (float32 + int8 kod) temsilin peak RSS'ini ayrı process'lerde ölç"""
+    print(f"Training data memory benchmark: {args.users} users x {args.cycles} cycles")
+    print(f"  {'mode':8s} {'time(s)':>8s} {'peak(MB)':>9s} {'delta(MB)':>10s} {'X(MB)':>7s} {'y(MB)':>7s}")
+    for mode in ['legacy', 'compact']:
+        output = subprocess.run(
+            [sys.executable, __file__, '_training-memory-run', '--mode', mode, '--users', str(args.users),
+             '--cycles', str(args.cycles), '--seed', str(args.seed)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"  {mode:8s} {result['elapsed']:8.2f} {result['peak_mb']:9.1f} "
+              f"{result['peak_mb'] - result['baseline_mb']:10.1f} {result['x_mb']:7.1f} {result['y_mb']:7.1f}")
+
+
+OUT_OF_CORE_MODES = ['capped', 'all-rows', 'out-of-core']
+OUT_OF_CORE_TASKS = ['phase_classification', 'mood_classification', 'symptom_prediction', 'energy_prediction']
+
+
+def _run_out_of_core(args: argparse.Namespace) -> None:
+    """(alt process) Fold 1'de phase/mood/symptom/energy modellerini tek modda eğit, metrikleri JSON bas"""
+    results = {}
+    with RssSampler(anon_rss_mb).track() as anon_peak, contextlib.redirect_stdout(io.StringIO()), \
+            tempfile.TemporaryDirectory(prefix='cyclemate_ooc_') as tmp:
+        import train_cycle_ai_model as tcm
+        from sklearn.metrics import accuracy_score, average_precision_score, f1_score, mean_squared_error
+        from sklearn.model_selection import GroupKFold
+
+        out_of_core = args.mode == 'out-of-core'
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed,
+                                                    out_dir=tmp if out_of_core else None)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+        train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+        X_train = tcm._memmap_rows(X, train_idx, tmp, 'X_train') if out_of_core else X[train_idx]
+        X_test = X[test_idx]
+
+        for name in OUT_OF_CORE_TASKS:
+            target = tcm.TASK_TARGETS[name]
+            X_fit, y_fit, y_test = X_train, y[target][train_idx], y[target][test_idx]
+            start = time.perf_counter()
+            if out_of_core:
+                model = tcm._fit_incremental_model(name, X_fit, y_fit)
+            else:
+                model = tcm._make_task_model(name, 1)
+                if args.mode == 'capped':
+                    # Eski davranış: mood için 250k alt örnekleme, RF ağaçları için max_samples=200000
+                    if name == 'mood_classification' and len(X_fit) > 250000:
+                        subset = np.random.default_rng(42).choice(len(X_fit), 250000, replace=False)
+                        X_fit, y_fit = X_fit[subset], y_fit[subset]
+                    model.set_params(max_samples=min(200000, len(X_fit)))
+                model.fit(X_fit, y_fit)
+            elapsed = time.perf_counter() - start
+            rows_per_tree = model.get_params().get('max_samples') or len(X_fit)
+
+            if name == 'symptom_prediction':
+                metric = average_precision_score(y_test, tcm.symptom_probabilities(model, X_test), average='micro')
+            elif name == 'energy_prediction':
+                metric = float(np.sqrt(mean_squared_error(y_test, model.predict(X_test))))
+            elif name == 'mood_classification':
+                metric = f1_score(y_test, model.predict(X_test), average='macro')
+            else:
+                metric = accuracy_score(y_test, model.predict(X_test))
+            results[name] = {'metric': float(metric), 'rows': int(rows_per_tree), 'seconds': elapsed}
+        del X_train
+
+    print(json.dumps({'tasks': results, 'peak_anon_mb': anon_peak['peak_mb'], 'peak_rss_mb': peak_rss_mb(),
+                      'train_rows': int(len(train_idx))}))
+
+
+def bench_out_of_core(args: argparse.Namespace) -> None:
+    """Eski satır limitleri vs tüm satırlar (bellek içi RF) vs out-of-core (memmap + partial_fit), fold 1"""
+    runs = {}
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, __file__, '_out-of-core-run', '--mode', mode, '--users', str(args.users),
+             '--cycles', str(args.cycles), '--seed', str(args.seed)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs[mode] = json.loads(output.strip().splitlines()[-1])
+
+    metric_names = {'phase_classification': 'accuracy', 'mood_classification': 'f1_macro',
+                    'symptom_prediction': 'avg_precision', 'energy_prediction': 'rmse'}
+    first = next(iter(runs.values()))
+    print(f"Out-of-core benchmark: {args.users} users x {args.cycles} cycles, fold 1 ({first['train_rows']:,} train rows)")
+    print(f"  {'task':22s} {'metric':14s} " + " ".join(f"{mode:>24s}" for mode in runs))
+    for name in OUT_OF_CORE_TASKS:
+        cells = [f"{run['tasks'][name]['metric']:.4f} {run['tasks'][name]['rows'] // 1000:5d}k {run['tasks'][name]['seconds']:6.1f}s"
+                 for run in runs.values()]
+        print(f"  {name:22s} {metric_names[name]:14s} " + " ".join(f"{cell:>24s}" for cell in cells))
+    print(f"  {'peak anon RSS (MB)':37s} " + " ".join(f"{run['peak_anon_mb']:24.0f}" for run in runs.values()))
+    print(f"  {'peak RSS incl. mapped (MB)':37s} " + " ".join(f"{run['peak_rss_mb']:24.0f}" for run in runs.values()))
+    print("  (cells: metric | rows per tree / per pass | fit time)")
+
+
+def bench_feature_store(args: argparse.Namespace) -> None:
+    """period/ovulation HGB'leri tüm CV fold'larında: fit başına binning vs fold başına paylaşılan BinnedFeatureStore"""
+    import re
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+
+    splits = list(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))[:args.folds]
+    targets = ['next_period', 'ovulation']
+    runs, store = {}, None
+    for mode in ['per-fit', 'store']:
+        binning, preds = 0.0, []
+        with RssSampler(anon_rss_mb).track() as anon_peak:
+            start = time.perf_counter()
+            for train_idx, test_idx in splits:
+                if mode == 'store':
+                    # Bin kenarları train_models'taki gibi sadece fold'un train satırlarından
+                    binning_start = time.perf_counter()
+                    fit_input = tcm.BinnedFeatureStore.build(X, train_idx)
+                    binning += time.perf_counter() - binning_start
+                else:
+                    fit_input = None
+                X_train = X[train_idx] if mode == 'per-fit' else None
+                for target in targets:
+                    model = tcm._make_task_model('period_prediction', 1)
+                    log = io.StringIO()
+                    with contextlib.redirect_stdout(log):
+                        if mode == 'store':
+                            model.fit(fit_input.X_binned, y[target][train_idx], bin_mapper=fit_input.bin_mapper)
+                        else:
+                            model.set_params(verbose=1)
+                            model.fit(X_train, y[target][train_idx])
+                    binning += sum(float(t) for t in re.findall(r'Binning [\d.]+ GB of training data: ([\d.]+) s',
+                                                                log.getvalue()))
+                    preds.append(model.predict(X[test_idx]))
+                if mode == 'store':
+                    store = fit_input
+                del fit_input, X_train
+            elapsed = time.perf_counter() - start
+        maes = [np.mean(np.abs(pred - y[target][test_idx]))
+                for pred, (target, (_, test_idx)) in zip(preds, [(t, s) for s in splits for t in targets])]
+        runs[mode] = {'binning': binning, 'elapsed': elapsed, 'peak': anon_peak['peak_mb'] - anon_peak['baseline_mb'],
+                      'mae': float(np.mean(maes)), 'preds': preds}
+
+    n_fits = len(splits) * len(targets)
+    train_rows = len(splits[0][0])
+    print(f"HGB feature store benchmark: {args.users} users x {args.cycles} cycles, {len(splits)} folds x "
+          f"{len(targets)} HGB = {n_fits} fits ({train_rows:,} train rows/fold, {X.shape[1]} features)")
+    print(f"  train matrix per fit: float64 (HGB input) {train_rows * X.shape[1] * 8 / 2**20:.0f} MB | "
+          f"float32 {train_rows * X.shape[1] * 4 / 2**20:.0f} MB | uint8 store {train_rows * X.shape[1] / 2**20:.0f} MB")
+    print(f"  {'mode':8s} {'binning(s)':>10s} {'total(s)':>9s} {'peak anon +MB':>14s} {'mean MAE':>9s}")
+    for mode, run in runs.items():
+        print(f"  {mode:8s} {run['binning']:10.2f} {run['elapsed']:9.1f} {run['peak']:14.0f} {run['mae']:9.4f}")
+    max_diff = max(np.abs(a - b).max() for a, b in zip(runs['per-fit']['preds'], runs['store']['preds']))
+    print(f"  max |prediction diff| per-fit vs store: {max_diff:.4f} days "
+          f"(per-fit sizing uses its own holdout-split bins; identical without early stopping)")
+
+    # Cihaz üstü kural: bin = eşiklerden küçük olan sayısı (son fold'un train satırları)
+    X_last = X[splits[-1][0]]
+    codes = np.column_stack([np.searchsorted(edges, X_last[:, j], side='left')
+                             for j, edges in enumerate(store.bin_edges)])
+    print(f"  exported bin edges reproduce store codes: {'OK' if np.array_equal(codes, store.X_binned) else 'MISMATCH'}")
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    """Fold 1 train kullanıcılarında arama; varsayılan ve seçilen ayarı fold 1 test kullanıcılarında karşılaştır"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    search = tcm.hyperparameter_search(X[train_idx], {key: val[train_idx] for key, val in y.items()},
+                                       user_ids[train_idx], budget_seconds=args.budget, n_jobs=args.jobs)
+
+    print(f"\nSearch benchmark: {args.users} users x {args.cycles} cycles | search {search['elapsed_seconds']:.0f}s "
+          f"(budget {args.budget:.0f}s) | eval on fold 1 test users ({len(test_idx):,} rows)")
+    print(f"  {'family':6s} {'config':8s} {'quality':>8s} {'ONNX KB':>9s} {'us/row':>8s} {'fit(s)':>7s}  params")
+    for family, family_report in search['families'].items():
+        for label, params in [('default', {}), ('searched', search['best_params'][family])]:
+            result = tcm._search_fold(family, params, X, y[tcm.TASK_TARGETS[family_report['task']]],
+                                      train_idx, test_idx, True)
+            cost = result['cost']
+            size = f"{cost['onnx_kb']:9.0f}" if 'onnx_kb' in cost else f"{'n/a':>9s}"
+            latency = f"{cost['latency_us_per_row']:8.1f}" if 'latency_us_per_row' in cost else f"{'n/a':>8s}"
+            print(f"  {family:6s} {label:8s} {result['quality']:8.4f} {size} {latency} {result['fit_seconds']:7.1f}  "
+                  f"{params or 'defaults'}")
+    print("  quality: rf = phase accuracy, hgb = period within ±2 days; n/a = ONNX conversion failed")
+
+
+EARLY_STOPPING_METRICS = {
+    'period_prediction': ('mae', 'MAE'),
+    'ovulation_prediction': ('mae', 'MAE'),
+    'phase_classification': ('accuracy', 'accuracy'),
+    'mood_classification': ('f1_macro', 'F1-macro'),
+    'symptom_prediction': ('average_precision_micro', 'avg precision'),
+    'energy_prediction': ('rmse', 'RMSE'),
+}
+
+
+def bench_early_stopping(args: argparse.Namespace) -> None:
+    """Fold 1'i sabit boyutlu modellerle ve early stopping ile (HGB kullanıcı holdout'u, RF OOB) eğit; kalite/süre/ONNX karşılaştır"""
+    import warnings
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    prebinned = tcm._prebinned_supported()
+    runs = {}
+    for mode, groups in [('fixed', None), ('early-stop', user_ids)]:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            models, results = tcm._fit_fold_models(X, y, train_idx, test_idx, 1, prebinned=prebinned, groups=groups)
+        onnx_kb = {}
+        for name, model in models.items():
+            try:
+                onnx_kb[name] = len(tcm.convert_task_model(name, model, X.shape[1]).SerializeToString()) / 1024
+            except Exception:
+                onnx_kb[name] = None
+        runs[mode] = (results, onnx_kb)
+
+    print(f"Early stopping benchmark: {args.users} users x {args.cycles} cycles | fold 1 "
+          f"({len(train_idx):,} train rows, HGB holdout {tcm.EARLY_STOPPING_USER_FRACTION:.0%} of train users, RF out-of-bag, "
+          f"{len(test_idx):,} test rows, 1 thread)")
+    print(f"  {'model':22s} {'metric':>13s} {'fixed':>8s} {'early':>8s} {'trees/iters':>12s} "
+          f"{'fit(s)':>14s} {'ONNX KB':>16s}")
+    for name, (metric, label) in EARLY_STOPPING_METRICS.items():
+        (fixed, fixed_kb), (early, early_kb) = runs['fixed'], runs['early-stop']
+        fixed, early = fixed[name], early[name]
+        sizes = (f"{fixed_kb[name]:7.0f} -> {early_kb[name]:<6.0f}" if fixed_kb[name] and early_kb[name]
+                 else f"{'n/a':>16s}")
+        print(f"  {name:22s} {label:>13s} {fixed[metric]:8.4f} {early[metric]:8.4f} "
+              f"{fixed['fitted_estimators']:5d} -> {early['fitted_estimators']:<4d} "
+              f"{fixed['fit_seconds']:6.1f} -> {early['fit_seconds']:<6.1f} {sizes}")
+    total = {mode: sum(results[name]['fit_seconds'] for name in EARLY_STOPPING_METRICS)
+             for mode, (results, _) in runs.items()}
+    print(f"  total fit: {total['fixed']:.1f}s -> {total['early-stop']:.1f}s "
+          f"(fixed HGB keeps sklearn's 'auto' early stopping on a random 10% row split)")
+
+
+def bench_export_budget(args: argparse.Namespace) -> None:
+    """Uygulamadaki 50 ağaçlık phase RF'sini fold 1'de eğit ve export bütçesi varyantlarını karşılaştır"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    start = time.perf_counter()
+    model = tcm._make_task_model('phase_classification', 1).fit(X[train_idx], y['phase'][train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(42)
+    train_sample, holdout_sample = (np.sort(rng.choice(idx, min(tcm.EXPORT_SAMPLE_ROWS, len(idx)), replace=False))
+                                    for idx in (train_idx, test_idx))
+    export_data = {'X_train': X[train_sample], 'X_holdout': X[holdout_sample],
+                   'y_holdout': {key: val[holdout_sample] for key, val in y.items()}}
+    budget = {'max_kb': args.max_kb, 'max_latency_us': args.max_latency_us, 'max_accuracy_drop': args.max_accuracy_drop}
+    print(f"Export budget benchmark: {args.users} users x {args.cycles} cycles | phase RF "
+          f"{model.n_estimators} trees, max_depth {model.max_depth}, fold 1 ({len(train_idx):,} train rows, "
+          f"fit {fit_seconds:.0f}s)")
+    start = time.perf_counter()
+    onnx_model, report, _ = tcm.apply_export_budget('phase_classification', model, X.shape[1], export_data, budget)
+    print(f"  export stage: {time.perf_counter() - start:.1f}s | outputs {[out.name for out in onnx_model.graph.output]}")
+
+
+def bench_onnx_parity(args: argparse.Namespace) -> None:
+    """Fold 1 görev modellerini export_to_onnx dönüştürücüleriyle çevir; boyut, gecikme ve sklearn parity'si"""
+    import warnings
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, _, _, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    prebinned = tcm._prebinned_supported()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        models, _ = tcm._fit_fold_models(X, y, train_idx, test_idx, 1, prebinned=prebinned, groups=user_ids)
+    X_batch = np.ascontiguousarray(X[test_idx[-tcm.EXPORT_PARITY_ROWS:]], dtype=np.float32)
+
+    print(f"ONNX parity benchmark: {args.users} users x {args.cycles} cycles | fold 1 "
+          f"({len(train_idx):,} train rows, parity on last {len(X_batch):,} test rows)")
+    print(f"  {'model':22s} {'learner':38s} {'converter':12s} {'KB':>7s} {'us/row':>7s} {'parity':>22s}")
+    for name, model in models.items():
+        converter = 'hgb_to_onnx' if isinstance(model, tcm.HistGradientBoostingRegressor) else 'skl2onnx'
+        if converter == 'hgb_to_onnx':
+            # Önceki yol: skl2onnx'in kendi HGB dönüştürücüsü (başarısız olunca joblib'e düşülüyordu)
+            from skl2onnx import update_registered_converter
+            from skl2onnx.operator_converters.random_forest import convert_sklearn_random_forest_regressor_converter
+            from skl2onnx.shape_calculators.linear_regressor import calculate_linear_regressor_output_shapes
+            update_registered_converter(type(model), 'SklearnHistGradientBoostingRegressor',
+                                        calculate_linear_regressor_output_shapes,
+                                        convert_sklearn_random_forest_regressor_converter)
+            try:
+                convert_sklearn(model, initial_types=[('float_input', FloatTensorType([None, X.shape[1]]))],
+                                target_opset=17)
+                print(f"  {name:22s} {'':38s} {'skl2onnx':12s} {'ok':>7s}")
+            except Exception as e:
+                print(f"  {name:22s} {'':38s} {'skl2onnx':12s} failed: {type(e).__name__}: "
+                      f"{str(e).splitlines()[0][:60]}")
+        payload = tcm.convert_task_model(name, model, X.shape[1]).SerializeToString()
+        parity = tcm.check_onnx_parity(model, payload, X_batch)
+        latency = tcm.onnx_row_latency_us(tcm.onnx_session(payload), X_batch[:tcm.SEARCH_LATENCY_ROWS])
+        check = (f"agreement {parity['label_agreement']:.4f}" if 'label_agreement' in parity
+                 else f"max|diff| {parity['max_abs_diff']:.1e}")
+        print(f"  {name:22s} {type(model).__name__:38s} {converter:12s} {len(payload) / 1024:7.0f} "
+              f"{latency:7.1f} {check:>17s} {'ok' if parity['passed'] else 'FAIL':>4s}")
+
+
+# Uygulamanın (aiModel.ts) bugün yüklediği görev modelleri
+APP_ONNX_TASKS = ['period_prediction', 'ovulation_prediction', 'phase_classification', 'mood_classification']
+
+
+def bench_fused_export(args: argparse.Namespace) -> None:
+    """Fold 1 görev modellerini export_to_onnx gibi çevir; ayrı oturumlar vs fused graph yükleme/gecikme"""
+    import warnings
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import train_cycle_ai_model as tcm
+        data = tcm.generate_synthetic_training_data(args.users, args.cycles, seed=args.seed)
+        X, y, phase_encoder, mood_encoder, user_ids = tcm.prepare_data_for_training(data)
+        del data
+    from sklearn.model_selection import GroupKFold
+
+    train_idx, test_idx = next(GroupKFold(n_splits=tcm.CV_FOLDS).split(X, groups=user_ids))
+    prebinned = tcm._prebinned_supported()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        models, _ = tcm._fit_fold_models(X, y, train_idx, test_idx, 1, prebinned=prebinned, groups=user_ids)
+    rng = np.random.default_rng(42)
+    train_sample, holdout_sample = (np.sort(rng.choice(idx, min(tcm.EXPORT_SAMPLE_ROWS, len(idx)), replace=False))
+                                    for idx in (train_idx, test_idx))
+    export_data = {'X_train': X[train_sample], 'X_holdout': X[holdout_sample],
+                   'y_holdout': {key: val[holdout_sample] for key, val in y.items()}}
+    onnx_models = {}
+    for name, model in models.items():
+        if name in tcm.EXPORT_BUDGETS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                onnx_models[name], _, _ = tcm.apply_export_budget(name, model, X.shape[1], export_data,
+                                                                  tcm.EXPORT_BUDGETS[name])
+        else:
+            onnx_models[name] = tcm.convert_task_model(name, model, X.shape[1])
+    encoders = {'phase_classification': phase_encoder, 'mood_classification': mood_encoder}
+    X_sample = np.ascontiguousarray(export_data['X_holdout'], dtype=np.float32)
+
+    print(f"Fused export benchmark: {args.users} users x {args.cycles} cycles | fold 1 models "
+          f"({len(train_idx):,} train rows), 1 thread, load = median of {tcm.FUSED_LOAD_REPEATS}, "
+          f"latency = median over {tcm.FUSED_LATENCY_ROWS} single-row run()s")
+    # shared regression modu: period modeli aynıdır, ovulation head'i yerine 'day_offsets' çıktısı eklenir
+    shared_period = copy.deepcopy(onnx_models['period_prediction'])
+    tcm.append_day_offsets_output(shared_period)
+    shared_tasks = [task for task in APP_ONNX_TASKS if task in tcm.task_model_names('shared')]
+    variants = [('all task heads', {task: onnx_models[task] for task in onnx_models}),
+                ('app heads', {task: onnx_models[task] for task in APP_ONNX_TASKS}),
+                ('app heads, shared regression', {task: shared_period if task == 'period_prediction'
+                                                  else onnx_models[task] for task in shared_tasks})]
+    for label, subset in variants:
+        tasks = list(subset)
+        labels = {task: (models[task].classes_, encoders[task].inverse_transform(models[task].classes_))
+                  for task in subset if task in encoders}
+        fused = tcm.fuse_onnx_models(subset, labels)
+        fused_payload = fused.SerializeToString()
+        session = tcm.onnx_session(fused_payload)
+        tcm.check_output_shapes(fused, session, X_sample[:2000])
+        agreement = min(float(np.mean(session.run([tcm.fused_output_name(task)], {'float_input': X_sample[:2000]})[0]
+                                      .reshape(-1) == tcm.onnx_session(subset[task].SerializeToString())
+                                      .run(None, {'float_input': X_sample[:2000]})[0].reshape(-1)))
+                        for task in subset)
+        print(f"\n  {label}: {', '.join(tasks)} (fused vs separate output agreement {agreement:.4f})")
+        print(f"  outputs: {', '.join(out.name for out in session.get_outputs())}")
+        tcm.compare_fused_latency({task: model.SerializeToString() for task, model in subset.items()},
+                                  fused_payload, X_sample)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CycleMate ML Pipeline Benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen_parser = subparsers.add_parser("generator", help="python vs numpy generation engine")
+    gen_parser.add_argument("--users", type=int, default=500)
+    gen_parser.add_argument("--cycles", type=int, default=12)
+    gen_parser.add_argument("--seed", type=int, default=42)
+    gen_parser.set_defaults(func=bench_generator)
+
+    fmt_parser = subparsers.add_parser("formats", help="JSON vs JSON Lines vs columnar .npz shards")
+    fmt_parser.add_argument("--users", type=int, default=2000)
+    fmt_parser.add_argument("--cycles", type=int, default=12)
+    fmt_parser.add_argument("--seed", type=int, default=42)
+    fmt_parser.set_defaults(func=bench_formats)
+
+    loader_parser = subparsers.add_parser("loader", help="list vs lazy loader peak RSS")
+    loader_parser.add_argument("--users", type=int, default=4000)
+    loader_parser.add_argument("--cycles", type=int, default=12)
+    loader_parser.add_argument("--seed", type=int, default=42)
+    loader_parser.add_argument("--format", choices=gen.SHARD_FORMATS, default="jsonl")
+    loader_parser.set_defaults(func=bench_loader)
+
+    feat_parser = subparsers.add_parser("features", help="per-log vs batched feature extraction parity + speed")
+    feat_parser.add_argument("--users", type=int, default=1000)
+    feat_parser.add_argument("--cycles", type=int, default=12)
+    feat_parser.add_argument("--seed", type=int, default=42)
+    feat_parser.set_defaults(func=bench_features)
+
+    cycles_parser = subparsers.add_parser("cycles", help="log -> cycle lookup at different cycle counts")
+    cycles_parser.add_argument("--users", type=int, default=500)
+    cycles_parser.add_argument("--cycles", type=int, nargs="+", default=[12, 60])
+    cycles_parser.add_argument("--seed", type=int, default=42)
+    cycles_parser.set_defaults(func=bench_cycles)
+
+    td_parser = subparsers.add_parser("training-data", help="train_cycle_ai_model python vs numpy data engine")
+    td_parser.add_argument("--users", type=int, default=500)
+    td_parser.add_argument("--cycles", type=int, default=6)
+    td_parser.add_argument("--seed", type=int, default=42)
+    td_parser.set_defaults(func=bench_training_data)
+
+    sym_parser = subparsers.add_parser("symptom-targets", help="list.index symptom matrix vs uint32 bitmask unpack")
+    sym_parser.add_argument("--users", type=int, default=2000)
+    sym_parser.add_argument("--cycles", type=int, default=6)
+    sym_parser.add_argument("--seed", type=int, default=42)
+    sym_parser.set_defaults(func=bench_symptom_targets)
+
+    reg_parser = subparsers.add_parser("regression", help="separate day-offset models vs one period model + offsets")
+    reg_parser.add_argument("--users", type=int, default=2000)
+    reg_parser.add_argument("--cycles", type=int, default=6)
+    reg_parser.add_argument("--seed", type=int, default=42)
+    reg_parser.set_defaults(func=bench_regression)
+
+    mem_parser = subparsers.add_parser("training-memory", help="train_cycle_ai_model data preparation peak RSS")
+    mem_parser.add_argument("--users", type=int, default=10000)
+    mem_parser.add_argument("--cycles", type=int, default=6)
+    mem_parser.add_argument("--seed", type=int, default=42)
+    mem_parser.set_defaults(func=bench_training_memory)
+
+    mem_run_parser = subparsers.add_parser("_training-memory-run")
+    mem_run_parser.add_argument("--mode", choices=["legacy", "compact"], required=True)
+    mem_run_parser.add_argument("--users", type=int, required=True)
+    mem_run_parser.add_argument("--cycles", type=int, required=True)
+    mem_run_parser.add_argument("--seed", type=int, required=True)
+    mem_run_parser.set_defaults(func=_run_training_memory)
+
+    ooc_parser = subparsers.add_parser("out-of-core", help="capped vs all-rows vs out-of-core phase/mood/symptom/energy")
+    ooc_parser.add_argument("--users", type=int, default=10000)
+    ooc_parser.add_argument("--cycles", type=int, default=6)
+    ooc_parser.add_argument("--seed", type=int, default=42)
+    ooc_parser.add_argument("--modes", nargs="+", choices=OUT_OF_CORE_MODES, default=OUT_OF_CORE_MODES)
+    ooc_parser.set_defaults(func=bench_out_of_core)
+
+    fs_parser = subparsers.add_parser("feature-store", help="HGB per-fit binning vs shared uint8 feature store")
+    fs_parser.add_argument("--users", type=int, default=4000)
+    fs_parser.add_argument("--cycles", type=int, default=6)
+    fs_parser.add_argument("--seed", type=int, default=42)
+    fs_parser.add_argument("--folds", type=int, default=5, help="CV folds to run (max CV_FOLDS)")
+    fs_parser.set_defaults(func=bench_feature_store)
+
+    search_parser = subparsers.add_parser("search", help="fixed HGB/RF hyperparameters vs successive-halving search")
+    search_parser.add_argument("--users", type=int, default=2000)
+    search_parser.add_argument("--cycles", type=int, default=6)
+    search_parser.add_argument("--seed", type=int, default=42)
+    search_parser.add_argument("--budget", type=float, default=600, help="Search time budget (seconds)")
+    search_parser.add_argument("--jobs", type=int, default=-1)
+    search_parser.set_defaults(func=bench_search)
+
+    es_parser = subparsers.add_parser("early-stopping", help="fixed-size HGB/RF vs user-grouped holdout early stopping")
+    es_parser.add_argument("--users", type=int, default=2000)
+    es_parser.add_argument("--cycles", type=int, default=6)
+    es_parser.add_argument("--seed", type=int, default=42)
+    es_parser.set_defaults(func=bench_early_stopping)
+
+    eb_parser = subparsers.add_parser("export-budget", help="phase_classification.onnx size/latency/accuracy variants")
+    eb_parser.add_argument("--users", type=int, default=2000)
+    eb_parser.add_argument("--cycles", type=int, default=6)
+    eb_parser.add_argument("--seed", type=int, default=42)
+    eb_parser.add_argument("--max-kb", type=float, default=1024)
+    eb_parser.add_argument("--max-latency-us", type=float, default=200)
+    eb_parser.add_argument("--max-accuracy-drop", type=float, default=0.005)
+    eb_parser.set_defaults(func=bench_export_budget)
+
+    op_parser = subparsers.add_parser("onnx-parity", help="per-model ONNX converters, size and onnxruntime parity")
+    op_parser.add_argument("--users", type=int, default=2000)
+    op_parser.add_argument("--cycles", type=int, default=6)
+    op_parser.add_argument("--seed", type=int, default=42)
+    op_parser.set_defaults(func=bench_onnx_parity)
+
+    fe_parser = subparsers.add_parser("fused-export", help="per-task ONNX sessions vs one fused multi-head graph")
+    fe_parser.add_argument("--users", type=int, default=2000)
+    fe_parser.add_argument("--cycles", type=int, default=6)
+    fe_parser.add_argument("--seed", type=int, default=42)
+    fe_parser.set_defaults(func=bench_fused_export)
+
+    ooc_run_parser = subparsers.add_parser("_out-of-core-run")
+    ooc_run_parser.add_argument("--mode", choices=OUT_OF_CORE_MODES, required=True)
+    ooc_run_parser.add_argument("--users", type=int, required=True)
+    ooc_run_parser.add_argument("--cycles", type=int, required=True)
+    ooc_run_parser.add_argument("--seed", type=int, required=True)
+    ooc_run_parser.set_defaults(func=_run_out_of_core)
+
+    loader_run_parser = subparsers.add_parser("_loader-run")
+    loader_run_parser.add_argument("--mode", choices=["list", "stream"], required=True)
+    loader_run_parser.add_argument("--data", required=True)
+    loader_run_parser.set_defaults(func=_run_loader)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
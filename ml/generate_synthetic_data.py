@@ -6,8 +6,10 @@ ML eğitimi için gerçekçi menstrüasyon cycle verisi üretir.
 - 3 kademeli semptom şiddeti (1=hafif, 2=orta, 3=şiddetli)
 - Dinamik faz geçişleri (kullanıcı bazlı ovulation timing)
 - Zenginleştirilmiş mood profilleri
-- Streaming shard yazımı (RAM dostu)
-- CLI argümanları (--users, --cycles, --seed)
+- Streaming shard yazımı (RAM dostu; --format jsonl ile kullanıcı başına satır)
+- Çok çekirdekli shard üretimi (--workers), worker sayısından bağımsız seed'ler
+- CLI argümanları (--users, --cycles, --seed, --engine)
+- Vektörize NumPy motoru (--engine numpy)
 - ID validation (semptom/mood doğrulama)
 - Reproducible (default SEED=42)
 """
@@ -16,11 +18,22 @@ import json
 import random
 import time
 import argparse
+import gzip
+import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import IO, Iterator, List, Dict, Any, Optional, Tuple
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 import numpy as np
 
+# zstd sıkıştırma opsiyonel (pip install zstandard)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 # ===== Semptom ve Mood Listeleri =====
 SYMPTOMS = [
     'cramp', 'headache', 'backPain', 'jointPain',
@@ -32,6 +45,18 @@ SYMPTOMS = [
 
 MOODS = ['ecstatic', 'happy', 'calm', 'neutral', 'tired', 'sad', 'anxious', 'irritable', 'angry']
 
+PHASES = ['menstrual', 'follicular', 'ovulation', 'luteal']
+FLOWS = ['light', 'medium', 'heavy']
+HABITS = ['water', 'walk', 'rest', 'shower']
+MOOD_PROFILE_TYPES = ['positive', 'neutral', 'negative']
+MOOD_PROFILE_WEIGHTS = [0.3, 0.5, 0.2]
+
+NOTES = [
+    "Bugün çok yorgunum", "Ağrılar başladı", "İyi hissediyorum",
+    "Baş ağrısı var", "Enerji seviyem düşük", "Harika bir gün",
+    "Stresli bir gün", "Dinlenmeye ihtiyacım var"
+]
+
 # Türkçe label map'leri
 SYMPTOM_LABELS_TR = {
     'cramp': 'Kramp', 'headache': 'Baş Ağrısı', 'backPain': 'Bel Ağrısı',
@@ -106,6 +131,9 @@ MOOD_BIAS_PROFILES = {
     'negative': {'sad': 0.1, 'anxious': 0.1, 'irritable': 0.05, 'happy': -0.1, 'ecstatic': -0.05}
 }
 
+ENGINES = ['python', 'numpy']
+EPOCH = datetime(1970, 1, 1)
+
 
 def get_cycle_phase(day_in_cycle: int, ovulation_day: int, period_length: int) -> str:
     """Dinamik faz hesaplaması"""
@@ -119,11 +147,21 @@ def get_cycle_phase(day_in_cycle: int, ovulation_day: int, period_length: int) -
         return 'luteal'
 
 
-def generate_user_profile() -> Dict[str, Any]:
-    """Kullanıcı bazlı parametreler"""
+def generate_user_profile(rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+    """Kullanıcı bazlı parametreler (rng verilirse tüm çekilişler ondan yapılır)"""
+    if rng is not None:
+        mood_profile_type = MOOD_PROFILE_TYPES[rng.choice(len(MOOD_PROFILE_TYPES), p=MOOD_PROFILE_WEIGHTS)]
+        return {
+            'cycle_mean': int(rng.normal(28, 3)),
+            'period_mean': int(rng.normal(5, 1)),
+            'logging_rate': np.clip(rng.normal(0.7, 0.15), 0.3, 1.0),
+            'symptom_sensitivity': np.clip(rng.normal(1.0, 0.3), 0.5, 2.0),
+            'mood_bias_profile': mood_profile_type
+        }
+    
     mood_profile_type = random.choices(
-        ['positive', 'neutral', 'negative'],
-        weights=[0.3, 0.5, 0.2],
+        MOOD_PROFILE_TYPES,
+        weights=MOOD_PROFILE_WEIGHTS,
         k=1
     )[0]
     
@@ -264,22 +302,17 @@ def generate_cycle_data(
                 # Habits
                 habits = []
                 if random.random() < 0.4:
-                    habit_options = ['water', 'walk', 'rest', 'shower']
-                    habits = random.sample(habit_options, k=random.randint(1, 3))
+                    habits = random.sample(HABITS, k=random.randint(1, 3))
                 
                 # Note
                 note = None
                 if random.random() < 0.2:
-                    notes = [
-                        "Bugün çok yorgunum", "Ağrılar başladı", "İyi hissediyorum",
-                        "Baş ağrısı var", "Enerji seviyem düşük", "Harika bir gün",
-                        "Stresli bir gün", "Dinlenmeye ihtiyacım var"
-                    ]
-                    note = random.choice(notes)
+                    note = random.choice(NOTES)
                 
                 log_entry = {
                     'date': log_date.strftime('%Y-%m-%d'),
                     'dayInCycle': day_in_cycle,
+                    'cycleIndex': cycle_num,
                     'phase': phase,
                     'symptoms': symptoms,
                     'mood': mood,
@@ -302,154 +335,753 @@ def generate_cycle_data(
     }
 
 
-def validate_ids(dataset: Dict[str, Any]) -> bool:
-    """Semptom ve mood ID'lerini doğrula"""
-    ok_sym = set(SYMPTOMS)
-    ok_mood = set(MOODS)
-    bad_sym, bad_mood = set(), set()
+# ===== Vektörize motor için önceden hesaplanmış tablolar =====
+SYMPTOM_INDEX = {s: i for i, s in enumerate(SYMPTOMS)}
+MOOD_INDEX = {m: i for i, m in enumerate(MOODS)}
+
+
+def _build_symptom_prob_table() -> np.ndarray:
+    """(faz, semptom) -> base + faz olasılığı; generate_symptoms_for_phase ile aynı birleşim"""
+    table = np.zeros((len(PHASES), len(SYMPTOMS)))
+    for p, phase in enumerate(PHASES):
+        combined_probs = {**BASE_SYMPTOM_PROB}
+        for symptom, prob in PHASE_SYMPTOM_PROBABILITIES.get(phase, {}).items():
+            combined_probs[symptom] = combined_probs.get(symptom, 0) + prob
+        for symptom, prob in combined_probs.items():
+            table[p, SYMPTOM_INDEX[symptom]] = prob
+    return table
+
+
+def _build_mood_cdf_table() -> np.ndarray:
+    """(mood profili, faz) -> kümülatif mood dağılımı; generate_mood_for_phase ile aynı"""
+    table = np.zeros((len(MOOD_PROFILE_TYPES), len(PHASES), len(MOODS)))
+    for b, profile_type in enumerate(MOOD_PROFILE_TYPES):
+        bias = MOOD_BIAS_PROFILES.get(profile_type, {})
+        for p, phase in enumerate(PHASES):
+            phase_probs = PHASE_MOOD_PROBABILITIES[phase]
+            probs = np.array([max(0.01, phase_probs.get(m, 0) + bias.get(m, 0)) for m in MOODS])
+            table[b, p] = np.cumsum(probs / probs.sum())
+    table[:, :, -1] = 1.0
+    return table
+
+
+SYMPTOM_PROB_TABLE = _build_symptom_prob_table()
+SEVERITY_CDF_TABLE = np.cumsum([PHASE_SEVERITY_PROBS[p] for p in PHASES], axis=1)
+MOOD_CDF_TABLE = _build_mood_cdf_table()
+HABIT_LISTS = [[h for bit, h in enumerate(HABITS) if mask >> bit & 1] or None
+               for mask in range(1 << len(HABITS))]
+
+
+def generate_cycle_arrays(
+    user_id: int,
+    profile: Dict[str, Any],
+    num_cycles: int,
+    rng: np.random.Generator,
+    start_date: datetime = None
+) -> Dict[str, Any]:
+    """
+    Bir kullanıcının tüm cycle'larını tek adımda NumPy dizileri olarak üret.
+    
+    generate_cycle_data ile aynı dağılımlar; tarihler 1970-01-01'den gün sayısı,
+    kategoriler kod olarak tutulur (faz: PHASES, mood: MOODS, flow: 0=yok + FLOWS,
+    habits: HABITS bitmask, note: NOTES indeksi / -1, severity: 0=yok).
+    """
+    if start_date is None:
+        start_date = datetime.now() - timedelta(days=num_cycles * int(profile['cycle_mean']))
+    
+    # Cycle parametreleri (tüm cycle'lar için tek çekiliş)
+    cycle_lengths = rng.normal(profile['cycle_mean'], 2, num_cycles).astype(np.int64)
+    cycle_lengths = np.maximum(21, np.minimum(35, cycle_lengths))
+    
+    period_lengths = rng.normal(profile['period_mean'], 0.8, num_cycles).astype(np.int64)
+    period_lengths = np.maximum(3, np.minimum(7, period_lengths))
+    
+    ovulation_days = rng.normal(cycle_lengths // 2, 1).astype(np.int64)
+    ovulation_days = np.maximum(period_lengths + 3, np.minimum(cycle_lengths - 4, ovulation_days))
+    
+    cycle_offsets = np.concatenate(([0], np.cumsum(cycle_lengths)[:-1]))
+    start_day = (start_date - EPOCH).days
+    
+    # Gün bazlı diziler -> sadece loglanan günler
+    total_days = int(cycle_lengths.sum())
+    day_cycle = np.repeat(np.arange(num_cycles), cycle_lengths)
+    day_in_cycle = np.arange(total_days) - cycle_offsets[day_cycle] + 1
+    logged = rng.random(total_days) < profile['logging_rate']
+    
+    cycle_index = day_cycle[logged]
+    day_in_cycle = day_in_cycle[logged]
+    dates = start_day + cycle_offsets[cycle_index] + day_in_cycle - 1
+    n_logs = len(day_in_cycle)
+    
+    period_length = period_lengths[cycle_index]
+    ovulation_day = ovulation_days[cycle_index]
+    phase = np.full(n_logs, 3, dtype=np.uint8)  # luteal
+    phase[(day_in_cycle >= ovulation_day - 1) & (day_in_cycle <= ovulation_day + 1)] = 2
+    phase[day_in_cycle < ovulation_day - 1] = 1
+    phase[day_in_cycle <= period_length] = 0
     
-    for u in dataset['data']:
-        for log in u['logs']:
-            if log.get('symptoms'):
-                for s in log['symptoms']:
-                    if s['id'] not in ok_sym:
-                        bad_sym.add(s['id'])
-            if log.get('mood') and log['mood'] not in ok_mood:
-                bad_mood.add(log['mood'])
+    # Semptomlar (Bernoulli) + severity (kategorik)
+    symptom_probs = np.minimum(SYMPTOM_PROB_TABLE[phase] * profile['symptom_sensitivity'], 1.0)
+    has_symptom = rng.random((n_logs, len(SYMPTOMS))) < symptom_probs
+    severity_cdf = SEVERITY_CDF_TABLE[phase]
+    severity_draw = rng.random((n_logs, len(SYMPTOMS)))
+    severity = (1 + (severity_draw >= severity_cdf[:, 0:1]) + (severity_draw >= severity_cdf[:, 1:2])).astype(np.uint8)
+    severity[~has_symptom] = 0
     
-    if bad_sym or bad_mood:
-        print("⚠️  Unknown IDs found:", {"symptoms": list(bad_sym), "moods": list(bad_mood)})
+    # Mood (kategorik)
+    mood_cdf = MOOD_CDF_TABLE[MOOD_PROFILE_TYPES.index(profile['mood_bias_profile'])][phase]
+    mood = (rng.random((n_logs, 1)) >= mood_cdf).sum(axis=1).astype(np.int8)
+    
+    # Flow (0=yok, 1=light, 2=medium, 3=heavy)
+    flow = np.zeros(n_logs, dtype=np.uint8)
+    in_period = day_in_cycle <= period_length
+    flow[in_period] = 2 + (rng.random(int(in_period.sum())) < 0.5)
+    flow[in_period & (day_in_cycle > 2) & (day_in_cycle >= period_length - 1)] = 1
+    
+    # Habits (1-3 farklı alışkanlık, bitmask)
+    habit_k = np.where(rng.random(n_logs) < 0.4, rng.integers(1, 4, n_logs), 0)
+    habit_rank = rng.random((n_logs, len(HABITS))).argsort(axis=1).argsort(axis=1)
+    habits = ((habit_rank < habit_k[:, None]) << np.arange(len(HABITS))).sum(axis=1).astype(np.uint8)
+    
+    # Note
+    note = np.where(rng.random(n_logs) < 0.2, rng.integers(0, len(NOTES), n_logs), -1).astype(np.int8)
+    
+    return {
+        'userId': user_id,
+        'profile': profile,
+        'cycleStart': start_day + cycle_offsets,
+        'cycleLength': cycle_lengths,
+        'periodLength': period_lengths,
+        'ovulationDay': ovulation_days,
+        'date': dates,
+        'dayInCycle': day_in_cycle,
+        'cycleIndex': cycle_index,
+        'phase': phase,
+        'severity': severity,
+        'mood': mood,
+        'flow': flow,
+        'habits': habits,
+        'note': note
+    }
+
+
+def _days_to_iso(days: np.ndarray) -> List[str]:
+    """Epoch gün sayılarını 'YYYY-MM-DD' string'lerine çevir"""
+    return np.asarray(days).astype('datetime64[D]').astype(str).tolist()
+
+
+def cycle_arrays_to_record(arrays: Dict[str, Any]) -> Dict[str, Any]:
+    """generate_cycle_arrays çıktısını generate_cycle_data ile aynı JSON yapısına çevir"""
+    cycle_start = arrays['cycleStart']
+    cycle_length = arrays['cycleLength']
+    period_length = arrays['periodLength']
+    
+    cycles = [
+        {
+            'cycleStart': start,
+            'cycleEnd': end,
+            'periodStart': start,
+            'periodEnd': period_end,
+            'cycleLength': c_len,
+            'periodLength': p_len,
+            'ovulationDay': ov_day
+        }
+        for start, end, period_end, c_len, p_len, ov_day in zip(
+            _days_to_iso(cycle_start),
+            _days_to_iso(cycle_start + cycle_length - 1),
+            _days_to_iso(cycle_start + period_length - 1),
+            cycle_length.tolist(),
+            period_length.tolist(),
+            arrays['ovulationDay'].tolist()
+        )
+    ]
+    
+    flow_names = [None] + FLOWS
+    logs = [
+        {
+            'date': date,
+            'dayInCycle': day,
+            'cycleIndex': cycle_index,
+            'phase': PHASES[phase],
+            'symptoms': [
+                {'id': SYMPTOMS[i], 'severity': sev}
+                for i, sev in enumerate(severities) if sev
+            ],
+            'mood': MOODS[mood] if mood >= 0 else None,
+            'flow': flow_names[flow],
+            'habits': HABIT_LISTS[habits],
+            'note': NOTES[note] if note >= 0 else None
+        }
+        for date, day, cycle_index, phase, severities, mood, flow, habits, note in zip(
+            _days_to_iso(arrays['date']),
+            arrays['dayInCycle'].tolist(),
+            arrays['cycleIndex'].tolist(),
+            arrays['phase'].tolist(),
+            arrays['severity'].tolist(),
+            arrays['mood'].tolist(),
+            arrays['flow'].tolist(),
+            arrays['habits'].tolist(),
+            arrays['note'].tolist()
+        )
+    ]
+    
+    return {
+        'userId': arrays['userId'],
+        'profile': arrays['profile'],
+        'cycles': cycles,
+        'logs': logs,
+        'totalLogs': len(logs)
+    }
+
+
+def generate_cycle_data_vectorized(
+    user_id: int,
+    profile: Dict[str, Any],
+    num_cycles: int,
+    rng: np.random.Generator,
+    start_date: datetime = None
+) -> Dict[str, Any]:
+    """generate_cycle_data'nın vektörize karşılığı (aynı çıktı yapısı)"""
+    return cycle_arrays_to_record(generate_cycle_arrays(user_id, profile, num_cycles, rng, start_date))
+
+
+PHASE_INDEX = {p: i for i, p in enumerate(PHASES)}
+FLOW_CODES = {None: 0, **{f: i for i, f in enumerate(FLOWS, 1)}}
+HABIT_BITS = {h: 1 << i for i, h in enumerate(HABITS)}
+NOTE_INDEX = {n: i for i, n in enumerate(NOTES)}
+
+
+def cycle_record_to_arrays(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    generate_cycle_data çıktısını generate_cycle_arrays formatına çevir.
+    Sözlükte olmayan semptom/mood ID'leri dizilere yazılmaz (mood -1 olur); 'unknownSymptoms' ve
+    'unknownMoods' listelerinde DatasetStats/validate_ids'e raporlanmak üzere taşınır.
+    """
+    cycles = user_data['cycles']
+    logs = user_data['logs']
+    
+    cycle_start = np.array([c['cycleStart'] for c in cycles], dtype='datetime64[D]').astype(np.int64)
+    dates = np.array([log['date'] for log in logs], dtype='datetime64[D]').astype(np.int64)
+    
+    if logs and all('cycleIndex' in log for log in logs):
+        cycle_index = np.array([log['cycleIndex'] for log in logs], dtype=np.int64)
+    else:
+        # cycleIndex'siz eski kayıtlar
+        cycle_index = np.searchsorted(cycle_start, dates, side='right') - 1
+    
+    severity = np.zeros((len(logs), len(SYMPTOMS)), dtype=np.uint8)
+    mood = np.full(len(logs), -1, dtype=np.int8)
+    unknown_symptoms, unknown_moods = [], []
+    for row, log in enumerate(logs):
+        for symptom in log.get('symptoms') or []:
+            if symptom['id'] in SYMPTOM_INDEX:
+                severity[row, SYMPTOM_INDEX[symptom['id']]] = symptom['severity']
+            else:
+                unknown_symptoms.append(symptom['id'])
+        if log.get('mood') in MOOD_INDEX:
+            mood[row] = MOOD_INDEX[log['mood']]
+        elif log.get('mood'):
+            unknown_moods.append(log['mood'])
+    
+    return {
+        'userId': user_data['userId'],
+        'profile': user_data['profile'],
+        'cycleStart': cycle_start,
+        'cycleLength': np.array([c['cycleLength'] for c in cycles], dtype=np.int64),
+        'periodLength': np.array([c['periodLength'] for c in cycles], dtype=np.int64),
+        'ovulationDay': np.array([c['ovulationDay'] for c in cycles], dtype=np.int64),
+        'date': dates,
+        'dayInCycle': np.array([log['dayInCycle'] for log in logs], dtype=np.int64),
+        'cycleIndex': cycle_index,
+        'phase': np.array([PHASE_INDEX[log['phase']] for log in logs], dtype=np.uint8),
+        'severity': severity,
+        'mood': mood,
+        'flow': np.array([FLOW_CODES[log.get('flow')] for log in logs], dtype=np.uint8),
+        'habits': np.array([sum(HABIT_BITS[h] for h in log.get('habits') or []) for log in logs], dtype=np.uint8),
+        'note': np.array([NOTE_INDEX[log['note']] if log.get('note') else -1 for log in logs], dtype=np.int8),
+        'unknownSymptoms': unknown_symptoms,
+        'unknownMoods': unknown_moods
+    }
+
+
+# ===== Shard formatları =====
+# json: tek {'metadata', 'data'} objesi
+# jsonl: satır başına bir kullanıcı kaydı (opsiyonel .gz/.zst), metadata sidecar dosyada
+# npz: kolonsal tablolar users_*, cycles_*, logs_* (kullanıcı sırasına göre ardışık)
+#   Kodlar: phase=PHASES, mood=MOODS (-1 yok), flow=0 yok + FLOWS, note=NOTES (-1 yok),
+#   symptom_mask/habit_mask=SYMPTOMS/HABITS bitmask, severity=(n, 19) 0=yok,
+#   cycle_index=kullanıcının cycles_* satırları içindeki sıra (eski shard'larda yok)
+SHARD_FORMATS = ['json', 'jsonl', 'npz']
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+SYMPTOM_BITS = (1 << np.arange(len(SYMPTOMS))).astype(np.uint32)
+
+
+def open_shard_file(path: str, mode: str = 'r') -> IO[str]:
+    """Shard dosyasını metin modunda aç; .gz/.zst uzantısına göre sıkıştırma uygula"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def shard_sidecar_path(shard_path: str) -> str:
+    """JSONL shard'ının metadata sidecar yolu (..._part_N.jsonl[.gz] -> ..._meta_N.json)"""
+    directory, filename = os.path.split(shard_path)
+    stem = filename.split('.', 1)[0].replace('_part_', '_meta_')
+    return os.path.join(directory, stem + '.json')
+
+
+def iter_jsonl_shard(path: str) -> Iterator[Dict[str, Any]]:
+    """JSONL shard'ından kullanıcı kayıtlarını satır satır (lazy) oku"""
+    with open_shard_file(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_json_shard(path: str, metadata: Dict[str, Any], users: List[Dict[str, Any]]) -> None:
+    """Kullanıcı kayıtlarını (generate_cycle_data formatı) JSON shard olarak yaz"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': metadata, 'data': users}, f, indent=2, ensure_ascii=False)
+
+
+def write_npz_shard(path: str, metadata: Dict[str, Any], users: List[Dict[str, Any]]) -> None:
+    """Kullanıcı dizilerini (generate_cycle_arrays formatı) kolonsal .npz shard olarak yaz"""
+    user_ids = np.array([u['userId'] for u in users], dtype=np.int32)
+    cycle_counts = [len(u['cycleStart']) for u in users]
+    log_counts = [len(u['date']) for u in users]
+    
+    def _cat(key: str, dtype) -> np.ndarray:
+        return np.concatenate([u[key] for u in users]).astype(dtype)
+    
+    severity = np.concatenate([u['severity'] for u in users]).astype(np.uint8)
+    
+    np.savez(
+        path,
+        metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+        users_user_id=user_ids,
+        users_cycle_mean=np.array([u['profile']['cycle_mean'] for u in users], dtype=np.int16),
+        users_period_mean=np.array([u['profile']['period_mean'] for u in users], dtype=np.int16),
+        users_logging_rate=np.array([u['profile']['logging_rate'] for u in users], dtype=np.float64),
+        users_symptom_sensitivity=np.array([u['profile']['symptom_sensitivity'] for u in users], dtype=np.float64),
+        users_mood_bias=np.array([MOOD_PROFILE_TYPES.index(u['profile']['mood_bias_profile']) for u in users], dtype=np.uint8),
+        cycles_user_id=np.repeat(user_ids, cycle_counts),
+        cycles_start=_cat('cycleStart', np.int32),
+        cycles_length=_cat('cycleLength', np.uint8),
+        cycles_period_length=_cat('periodLength', np.uint8),
+        cycles_ovulation_day=_cat('ovulationDay', np.uint8),
+        logs_user_id=np.repeat(user_ids, log_counts),
+        logs_date=_cat('date', np.int32),
+        logs_day_in_cycle=_cat('dayInCycle', np.uint8),
+        logs_cycle_index=_cat('cycleIndex', np.uint16),
+        logs_phase=_cat('phase', np.uint8),
+        logs_symptom_mask=((severity > 0) * SYMPTOM_BITS).sum(axis=1, dtype=np.uint32),
+        logs_severity=severity,
+        logs_mood=_cat('mood', np.int8),
+        logs_flow=_cat('flow', np.uint8),
+        logs_habit_mask=_cat('habits', np.uint8),
+        logs_note=_cat('note', np.int8)
+    )
+
+
+def read_npz_shard(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Kolonsal .npz shard'ı oku -> (metadata, kullanıcı dizileri listesi)"""
+    with np.load(path) as shard:
+        tables = {key: shard[key] for key in shard.files}
+    
+    metadata = json.loads(str(tables['metadata']))
+    user_ids = tables['users_user_id']
+    cycle_bounds = np.searchsorted(tables['cycles_user_id'], user_ids, side='right')
+    log_bounds = np.searchsorted(tables['logs_user_id'], user_ids, side='right')
+    stored_cycle_index = tables.get('logs_cycle_index')
+    
+    users = []
+    cycle_lo = log_lo = 0
+    for u, user_id in enumerate(user_ids.tolist()):
+        cycle_hi, log_hi = cycle_bounds[u], log_bounds[u]
+        cycle_start = tables['cycles_start'][cycle_lo:cycle_hi].astype(np.int64)
+        dates = tables['logs_date'][log_lo:log_hi].astype(np.int64)
+        if stored_cycle_index is not None:
+            cycle_index = stored_cycle_index[log_lo:log_hi].astype(np.int64)
+        else:
+            cycle_index = np.searchsorted(cycle_start, dates, side='right') - 1
+        users.append({
+            'userId': user_id,
+            'profile': {
+                'cycle_mean': int(tables['users_cycle_mean'][u]),
+                'period_mean': int(tables['users_period_mean'][u]),
+                'logging_rate': float(tables['users_logging_rate'][u]),
+                'symptom_sensitivity': float(tables['users_symptom_sensitivity'][u]),
+                'mood_bias_profile': MOOD_PROFILE_TYPES[tables['users_mood_bias'][u]]
+            },
+            'cycleStart': cycle_start,
+            'cycleLength': tables['cycles_length'][cycle_lo:cycle_hi].astype(np.int64),
+            'periodLength': tables['cycles_period_length'][cycle_lo:cycle_hi].astype(np.int64),
+            'ovulationDay': tables['cycles_ovulation_day'][cycle_lo:cycle_hi].astype(np.int64),
+            'date': dates,
+            'dayInCycle': tables['logs_day_in_cycle'][log_lo:log_hi].astype(np.int64),
+            'cycleIndex': cycle_index,
+            'phase': tables['logs_phase'][log_lo:log_hi],
+            'severity': tables['logs_severity'][log_lo:log_hi],
+            'mood': tables['logs_mood'][log_lo:log_hi],
+            'flow': tables['logs_flow'][log_lo:log_hi],
+            'habits': tables['logs_habit_mask'][log_lo:log_hi],
+            'note': tables['logs_note'][log_lo:log_hi]
+        })
+        cycle_lo, log_lo = cycle_hi, log_hi
+    
+    return metadata, users
+
+
+class RunningStats:
+    """
+    Sabit bellekli, birleştirilebilir akış istatistiği:
+    Welford/Chan ortalama-varyans + sabit boyutlu tamsayı histogramı (taşan değerler son bin'e)
+    """
+    
+    def __init__(self, num_bins: int):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = np.zeros(num_bins, dtype=np.int64)
+    
+    def update(self, values: np.ndarray) -> None:
+        """Bir değer dizisini (batch) ekle"""
+        values = np.asarray(values)
+        if values.size == 0:
+            return
+        batch = RunningStats(len(self.histogram))
+        batch.count = int(values.size)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.histogram = np.bincount(np.clip(values, 0, len(self.histogram) - 1).ravel(),
+                                      minlength=len(self.histogram))
+        self.merge(batch)
+    
+    def merge(self, other: 'RunningStats') -> None:
+        """Başka bir RunningStats'ı bu nesneye ekle (Chan et al. paralel varyans)"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.histogram += other.histogram
+    
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+    
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+
+class DatasetStats:
+    """
+    Dataset üretim istatistikleri; kullanıcı sayısından bağımsız sabit bellek.
+    Semptom/mood sayaçları koda göre indekslenmiş dizilerdir. Shard/worker'lar arasında merge edilebilir.
+    Sözlük dışı semptom/mood ID'leri (cycle_record_to_arrays'in unknown* listeleri) ID başına sayılır.
+    """
+    
+    def __init__(self):
+        self.users = 0
+        self.total_logs = 0
+        self.cycle_length = RunningStats(36)                    # 0-35 gün
+        self.period_length = RunningStats(8)                    # 0-7 gün
+        self.symptoms_per_log = RunningStats(len(SYMPTOMS) + 1)  # sadece semptomlu loglar
+        self.severity = RunningStats(4)                         # 1-3 (0 kullanılmaz)
+        self.symptom_counts = np.zeros(len(SYMPTOMS), dtype=np.int64)
+        self.mood_counts = np.zeros(len(MOODS), dtype=np.int64)
+        self.invalid_moods = 0
+        self.invalid_severities = 0
+        self.unknown_symptoms: Counter = Counter()
+        self.unknown_moods: Counter = Counter()
+    
+    def update(self, arrays: Dict[str, Any]) -> None:
+        """Bir kullanıcının dizilerini (generate_cycle_arrays formatı) ekle"""
+        severity = arrays['severity']
+        has_symptom = severity > 0
+        mood = arrays['mood']
+        mood = mood[mood >= 0]
+        
+        self.users += 1
+        self.total_logs += len(arrays['date'])
+        self.cycle_length.update(arrays['cycleLength'])
+        self.period_length.update(arrays['periodLength'])
+        
+        symptoms_per_log = has_symptom.sum(axis=1)
+        self.symptoms_per_log.update(symptoms_per_log[symptoms_per_log > 0])
+        present_severity = severity[has_symptom]
+        self.severity.update(present_severity)
+        self.invalid_severities += int((present_severity > 3).sum())
+        self.symptom_counts += has_symptom.sum(axis=0)
+        
+        valid_mood = mood < len(MOODS)
+        self.invalid_moods += int((~valid_mood).sum())
+        self.mood_counts += np.bincount(mood[valid_mood], minlength=len(MOODS))
+        self.unknown_symptoms.update(arrays.get('unknownSymptoms', ()))
+        self.unknown_moods.update(arrays.get('unknownMoods', ()))
+    
+    def merge(self, other: 'DatasetStats') -> None:
+        """Başka bir shard/worker'ın istatistiklerini ekle"""
+        self.users += other.users
+        self.total_logs += other.total_logs
+        for name in ['cycle_length', 'period_length', 'symptoms_per_log', 'severity']:
+            getattr(self, name).merge(getattr(other, name))
+        self.symptom_counts += other.symptom_counts
+        self.mood_counts += other.mood_counts
+        self.invalid_moods += other.invalid_moods
+        self.invalid_severities += other.invalid_severities
+        self.unknown_symptoms.update(other.unknown_symptoms)
+        self.unknown_moods.update(other.unknown_moods)
+    
+    @property
+    def total_cycles(self) -> int:
+        return self.cycle_length.count
+    
+    @property
+    def total_symptoms(self) -> int:
+        return self.severity.count
+    
+    @property
+    def total_moods(self) -> int:
+        return int(self.mood_counts.sum()) + self.invalid_moods + sum(self.unknown_moods.values())
+    
+    def top_symptoms(self, k: int) -> List[Tuple[str, int]]:
+        order = np.argsort(-self.symptom_counts, kind='stable')[:k]
+        return [(SYMPTOMS[i], int(self.symptom_counts[i])) for i in order if self.symptom_counts[i]]
+    
+    def top_moods(self, k: int) -> List[Tuple[str, int]]:
+        order = np.argsort(-self.mood_counts, kind='stable')[:k]
+        return [(MOODS[i], int(self.mood_counts[i])) for i in order if self.mood_counts[i]]
+
+
+def validate_ids(stats: DatasetStats) -> bool:
+    """
+    Semptom, mood ve severity değerlerini doğrula.
+    Üretim sırasında tutulan sayaçlar (tüm shard'ların birleşimi) üzerinden çalışır; diske dokunmaz.
+    """
+    if stats.unknown_symptoms or stats.unknown_moods or stats.invalid_moods or stats.invalid_severities:
+        print("⚠️  Unknown IDs found:", {
+            "symptoms": sorted(stats.unknown_symptoms),
+            "moods": sorted(stats.unknown_moods),
+            "mood_codes": stats.invalid_moods,
+            "severities": stats.invalid_severities
+        })
         return False
     
     print("✓ ID validation passed")
     return True
 
 
+SHARD_SIZE = 500
+SHARD_FILENAME = "synthetic_cycle_data_v2_2_part_{}.{}"
+DATASET_METADATA_FILENAME = "synthetic_cycle_data_v2_2_metadata.json"
+
+
+def build_metadata(
+    stats: DatasetStats,
+    num_users: int,
+    cycles_per_user: int,
+    seed: int,
+    engine: str
+) -> Dict[str, Any]:
+    """Kısmi/global istatistiklerden metadata oluştur"""
+    top_mood = stats.top_moods(1)
+    top_symptom = stats.top_symptoms(1)
+    
+    return {
+        'version': '2.2.0',
+        'generatedBy': 'CycleMate Synthetic Data Generator v2.2',
+        'seed': seed,
+        'engine': engine,
+        'labelLang': 'en',
+        'numUsers': num_users,
+        'cyclesPerUser': cycles_per_user,
+        'totalCycles': stats.total_cycles,
+        'totalLogs': stats.total_logs,
+        'totalSymptoms': stats.total_symptoms,
+        'totalMoods': stats.total_moods,
+        'avgCycleLength': round(stats.cycle_length.mean, 2),
+        'stdCycleLength': round(stats.cycle_length.std, 2),
+        'avgPeriodLength': round(stats.period_length.mean, 2),
+        'stdPeriodLength': round(stats.period_length.std, 2),
+        'avgSymptomsPerLog': round(stats.symptoms_per_log.mean, 2),
+        'avgSeverity': round(stats.severity.mean, 2),
+        'mostCommonMood': top_mood[0][0] if top_mood else None,
+        'mostCommonSymptom': top_symptom[0][0] if top_symptom else None,
+        'generatedAt': datetime.now().isoformat(),
+        'symptomLabelsTR': SYMPTOM_LABELS_TR,
+        'moodLabelsTR': MOOD_LABELS_TR
+    }
+
+
+def generate_shard(
+    shard_index: int,
+    first_user: int,
+    last_user: int,
+    num_users: int,
+    cycles_per_user: int,
+    seed: int,
+    shard_seed: np.random.SeedSequence,
+    engine: str,
+    reference_date: datetime,
+    shard_format: str = 'json',
+    output_dir: str = 'ml',
+    compression: str = 'none'
+) -> Tuple[int, str, DatasetStats]:
+    """
+    Tek shard üret ve diske yaz (process pool worker'ı)
+    Shard çıktısı sadece shard_seed'e bağlıdır; worker sayısından bağımsızdır.
+    jsonl formatında her kullanıcı üretilir üretilmez tek satır olarak yazılır (shard bellekte tutulmaz).
+    (shard_index, dosya adı, shard istatistikleri) döndürür.
+    """
+    rng = np.random.default_rng(shard_seed)
+    legacy_seed = int(shard_seed.generate_state(1)[0])
+    random.seed(legacy_seed)
+    np.random.seed(legacy_seed)
+    
+    shard_filename = os.path.join(output_dir, SHARD_FILENAME.format(shard_index, shard_format))
+    if shard_format == 'jsonl':
+        shard_filename += COMPRESSION_SUFFIXES[compression]
+    
+    all_data = []
+    stats = DatasetStats()
+    
+    with open_shard_file(shard_filename, 'w') if shard_format == 'jsonl' else nullcontext() as stream:
+        for user_id in range(first_user, last_user + 1):
+            # Kayıt (JSON) veya dizi (npz) formatı: gereksiz dönüşüm yapma
+            if engine == 'numpy':
+                profile = generate_user_profile(rng)
+                start_date = reference_date - timedelta(days=cycles_per_user * int(profile['cycle_mean']))
+                arrays = generate_cycle_arrays(user_id, profile, cycles_per_user, rng, start_date)
+                user_data = arrays if shard_format == 'npz' else cycle_arrays_to_record(arrays)
+            else:
+                profile = generate_user_profile()
+                start_date = reference_date - timedelta(days=cycles_per_user * int(profile['cycle_mean']))
+                user_data = generate_cycle_data(user_id, profile, cycles_per_user, start_date)
+                arrays = cycle_record_to_arrays(user_data)
+                if shard_format == 'npz':
+                    user_data = arrays
+            stats.update(arrays)
+            
+            if stream is not None:
+                stream.write(json.dumps(user_data, ensure_ascii=False) + '\n')
+            else:
+                all_data.append(user_data)
+    
+    metadata = build_metadata(stats, num_users, cycles_per_user, seed, engine)
+    metadata['shard'] = shard_index
+    metadata['usersInShard'] = stats.users
+    metadata['format'] = shard_format
+    
+    if shard_format == 'jsonl':
+        with open(shard_sidecar_path(shard_filename), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+    elif shard_format == 'npz':
+        write_npz_shard(shard_filename, metadata, all_data)
+    else:
+        write_json_shard(shard_filename, metadata, all_data)
+    
+    return shard_index, shard_filename, stats
+
+
 def generate_dataset(
     num_users: int = 4000,
     cycles_per_user: int = 12,
-    seed: int = 42
+    seed: int = 42,
+    engine: str = 'python',
+    workers: int = 1,
+    shard_format: str = 'json',
+    output_dir: str = 'ml',
+    compression: str = 'none'
 ) -> Dict[str, Any]:
     """
     Tüm dataset'i üret (streaming shard yazımı ile)
-    Her 500 kullanıcıda bir shard'a yaz (RAM dostu)
+    Her 500 kullanıcı bir shard (RAM dostu); shard'lar workers > 1 ise process pool'da üretilir.
+    Her shard SeedSequence.spawn ile kendi deterministik seed'ini alır.
+    engine='numpy' ise her kullanıcı tek np.random.Generator ile vektörize üretilir
+    shard_format='npz' ise shard'lar kolonsal .npz, 'jsonl' ise satır bazlı JSON (+ sidecar metadata)
+    olarak yazılır. Global metadata her formatta synthetic_cycle_data_v2_2_metadata.json dosyasına yazılır.
     """
-    # Seed ayarla
-    random.seed(seed)
-    np.random.seed(seed)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {ENGINES})")
+    if shard_format not in SHARD_FORMATS:
+        raise ValueError(f"Unknown format: {shard_format} (expected one of {SHARD_FORMATS})")
+    if compression != 'none' and shard_format != 'jsonl':
+        raise ValueError("Compression is only supported for the jsonl format")
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
     
     print(f"CycleMate Synthetic Data Generator v2.2")
-    print(f"Generating data for {num_users} users (SEED={seed})...")
+    print(f"Generating data for {num_users} users (SEED={seed}, engine={engine}, "
+          f"workers={workers}, format={shard_format})...")
     
-    all_data = []
-    shard_index = 1
+    # Shard aralıkları + shard başına child seed
+    shard_ranges = [
+        (first, min(first + SHARD_SIZE - 1, num_users))
+        for first in range(1, num_users + 1, SHARD_SIZE)
+    ]
+    shard_seeds = np.random.SeedSequence(seed).spawn(len(shard_ranges))
+    os.makedirs(output_dir, exist_ok=True)
+    reference_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
-    # Global istatistikler
-    total_logs = 0
-    total_cycles = 0
-    total_symptoms = 0
-    total_moods = 0
-    all_cycle_lengths = []
-    all_period_lengths = []
-    all_severities = []
-    symptoms_per_log = []
-    all_symptoms = []
-    all_moods = []
-    
-    for user_id in range(1, num_users + 1):
-        # Progress (her 100 kullanıcıda)
-        if user_id % 100 == 0:
-            print(f"  Progress: {user_id}/{num_users} users...")
-        
-        profile = generate_user_profile()
-        user_data = generate_cycle_data(user_id, profile, cycles_per_user)
-        all_data.append(user_data)
-        
-        # İstatistikler
-        total_logs += user_data['totalLogs']
-        total_cycles += len(user_data['cycles'])
-        
-        for cycle in user_data['cycles']:
-            all_cycle_lengths.append(cycle['cycleLength'])
-            all_period_lengths.append(cycle['periodLength'])
-        
-        for log in user_data['logs']:
-            if log.get('symptoms'):
-                symptoms_per_log.append(len(log['symptoms']))
-                for symptom in log['symptoms']:
-                    total_symptoms += 1
-                    all_symptoms.append(symptom['id'])
-                    all_severities.append(symptom['severity'])
-            if log.get('mood'):
-                total_moods += 1
-                all_moods.append(log['mood'])
-        
-        # Her 500 kullanıcıda bir shard'a yaz (streaming)
-        if user_id % 500 == 0 or user_id == num_users:
-            # Metadata hesapla
-            symptom_counts = Counter(all_symptoms)
-            mood_counts = Counter(all_moods)
-            
-            metadata = {
-                'version': '2.2.0',
-                'generatedBy': 'CycleMate Synthetic Data Generator v2.2',
-                'seed': seed,
-                'labelLang': 'en',
-                'shard': shard_index,
-                'usersInShard': len(all_data),
-                'numUsers': num_users,
-                'cyclesPerUser': cycles_per_user,
-                'totalCycles': total_cycles,
-                'totalLogs': total_logs,
-                'totalSymptoms': total_symptoms,
-                'totalMoods': total_moods,
-                'avgCycleLength': round(np.mean(all_cycle_lengths), 2) if all_cycle_lengths else 0,
-                'avgPeriodLength': round(np.mean(all_period_lengths), 2) if all_period_lengths else 0,
-                'avgSymptomsPerLog': round(np.mean(symptoms_per_log), 2) if symptoms_per_log else 0,
-                'avgSeverity': round(np.mean(all_severities), 2) if all_severities else 0,
-                'mostCommonMood': mood_counts.most_common(1)[0][0] if all_moods else None,
-                'mostCommonSymptom': symptom_counts.most_common(1)[0][0] if all_symptoms else None,
-                'generatedAt': datetime.now().isoformat(),
-                'symptomLabelsTR': SYMPTOM_LABELS_TR,
-                'moodLabelsTR': MOOD_LABELS_TR
-            }
-            
-            shard_dataset = {
-                'metadata': metadata,
-                'data': all_data
-            }
-            
-            # Shard'a yaz
-            shard_filename = f"ml/synthetic_cycle_data_v2_2_part_{shard_index}.json"
-            with open(shard_filename, 'w', encoding='utf-8') as f:
-                json.dump(shard_dataset, f, indent=2, ensure_ascii=False)
-            
-            print(f"  ✓ Shard {shard_index} saved: {shard_filename} ({len(all_data)} users)")
-            
-            # Sonraki shard için temizle
-            all_data = []
-            shard_index += 1
+    jobs = [
+        (shard_index, first, last, num_users, cycles_per_user, seed, shard_seed, engine, reference_date,
+         shard_format, output_dir, compression)
+        for shard_index, ((first, last), shard_seed) in enumerate(zip(shard_ranges, shard_seeds), 1)
+    ]
     
-    # Final metadata (son shard'daki metadata'yı döndür)
-    metadata['totalShards'] = shard_index - 1
+    partials = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(generate_shard, *job) for job in jobs]
+            results = (future.result() for future in as_completed(futures))
+            for shard_index, shard_filename, shard_stats in results:
+                partials.append((shard_index, shard_filename, shard_stats))
+                print(f"  ✓ Shard {shard_index} saved: {shard_filename} ({shard_stats.users} users)")
+    else:
+        for job in jobs:
+            shard_index, shard_filename, shard_stats = generate_shard(*job)
+            partials.append((shard_index, shard_filename, shard_stats))
+            print(f"  ✓ Shard {shard_index} saved: {shard_filename} ({shard_stats.users} users)")
     
-    # Final dataset objesi (sadece özet için)
+    # Global metadata = shard kısmi istatistiklerinin birleşimi
+    partials.sort(key=lambda p: p[0])
+    stats = DatasetStats()
+    for _, _, shard_stats in partials:
+        stats.merge(shard_stats)
+    metadata = build_metadata(stats, num_users, cycles_per_user, seed, engine)
+    metadata['totalShards'] = len(partials)
+    metadata['format'] = shard_format
+    metadata['shardFiles'] = [filename for _, filename, _ in partials]
+    
+    with open(os.path.join(output_dir, DATASET_METADATA_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    
+    # Final dataset objesi (sadece özet için; stats = tüm shard'ların sayaçları)
     final_dataset = {
         'metadata': metadata,
+        'stats': stats,
         'data': []  # Streaming olduğu için boş
     }
     
-    print(f"\n✅ Generated {num_users} users, {total_cycles} cycles, {total_logs} logs, " +
-          f"{total_symptoms} symptoms, {total_moods} moods")
+    print(f"\n✅ Generated {num_users} users, {stats.total_cycles} cycles, {stats.total_logs} logs, " +
+          f"{stats.total_symptoms} symptoms, {stats.total_moods} moods")
     
     return final_dataset
 
 
-def print_summary(metadata: Dict[str, Any], all_symptoms: List[str], all_moods: List[str], all_severities: List[int]):
-    """Detaylı özet bastır"""
-    symptom_counts = Counter(all_symptoms)
-    mood_counts = Counter(all_moods)
-    severity_counts = Counter(all_severities)
+def print_summary(metadata: Dict[str, Any], stats: DatasetStats):
+    """Detaylı özet bastır (üretim sırasında tutulan sayaçlardan)"""
+    severity_counts = stats.severity.histogram
+    total_symptoms = stats.total_symptoms
+    total_moods = stats.total_moods
     
     print("\n" + "="*70)
     print("DATASET SUMMARY (v2.2)")
@@ -462,32 +1094,32 @@ def print_summary(metadata: Dict[str, Any], all_symptoms: List[str], all_moods:
     print(f"Logs:               {metadata['totalLogs']}")
     print(f"Symptoms:           {metadata['totalSymptoms']}")
     print(f"Moods:              {metadata['totalMoods']}")
-    print(f"\nAvg Cycle Length:   {metadata['avgCycleLength']} days")
-    print(f"Avg Period Length:  {metadata['avgPeriodLength']} days")
+    print(f"\nAvg Cycle Length:   {metadata['avgCycleLength']} ± {metadata['stdCycleLength']} days")
+    print(f"Avg Period Length:  {metadata['avgPeriodLength']} ± {metadata['stdPeriodLength']} days")
     print(f"Avg Logs/User:      {metadata['totalLogs'] / metadata['numUsers']:.1f}")
     print(f"Avg Logs/Cycle:     {metadata['totalLogs'] / metadata['totalCycles']:.1f}")
     print(f"\nAvg Symptoms/Log:   {metadata['avgSymptomsPerLog']}")
     print(f"Avg Severity:       {metadata['avgSeverity']}")
     
     # Severity dağılımı
-    if all_severities:
-        total = len(all_severities)
+    if total_symptoms:
+        total = total_symptoms
         print(f"\nSeverity Distribution:")
         print(f"  Hafif (1):     {severity_counts[1]:6d} ({severity_counts[1]/total*100:.1f}%)")
         print(f"  Orta (2):      {severity_counts[2]:6d} ({severity_counts[2]/total*100:.1f}%)")
         print(f"  Şiddetli (3):  {severity_counts[3]:6d} ({severity_counts[3]/total*100:.1f}%)")
     
     # Top 3 moods
-    if all_moods:
+    if total_moods:
         print(f"\nTop 3 Moods:")
-        for i, (mood, count) in enumerate(mood_counts.most_common(3), 1):
-            print(f"  {i}. {mood:12s} {count:6d} ({count/len(all_moods)*100:.1f}%)")
+        for i, (mood, count) in enumerate(stats.top_moods(3), 1):
+            print(f"  {i}. {mood:12s} {count:6d} ({count/total_moods*100:.1f}%)")
     
     # Top 3 symptoms
-    if all_symptoms:
+    if total_symptoms:
         print(f"\nTop 3 Symptoms:")
-        for i, (symptom, count) in enumerate(symptom_counts.most_common(3), 1):
-            print(f"  {i}. {symptom:18s} {count:6d} ({count/len(all_symptoms)*100:.1f}%)")
+        for i, (symptom, count) in enumerate(stats.top_symptoms(3), 1):
+            print(f"  {i}. {symptom:18s} {count:6d} ({count/total_symptoms*100:.1f}%)")
     
     print("="*70)
 
@@ -498,7 +1130,20 @@ if __name__ == '__main__':
     parser.add_argument('--users', type=int, default=4000, help='Number of users (default: 4000)')
     parser.add_argument('--cycles', type=int, default=12, help='Cycles per user (default: 12)')
     parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help='Generation engine: python (per-day loop) or numpy (vectorized) (default: python)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes for shard generation (default: 1)')
+    parser.add_argument('--format', choices=SHARD_FORMATS, default='json',
+                        help='Shard format: json (nested records), jsonl (one user per line) '
+                             'or npz (columnar tables) (default: json)')
+    parser.add_argument('--compress', choices=list(COMPRESSION_SUFFIXES), default='none',
+                        help='Compression for jsonl shards (default: none)')
+    parser.add_argument('--output-dir', type=str, default='ml',
+                        help='Directory for shard files (default: ml)')
     args = parser.parse_args()
+    if args.compress != 'none' and args.format != 'jsonl':
+        parser.error('--compress requires --format jsonl')
     
     print("="*70)
     print("CycleMate - Synthetic Data Generator v2.2")
@@ -512,38 +1157,19 @@ if __name__ == '__main__':
     final_dataset = generate_dataset(
         num_users=args.users,
         cycles_per_user=args.cycles,
-        seed=args.seed
+        seed=args.seed,
+        engine=args.engine,
+        workers=args.workers,
+        shard_format=args.format,
+        output_dir=args.output_dir,
+        compression=args.compress
     )
     
-    # Tüm shard'ları oku ve istatistik topla (özet için)
-    print("\nCollecting statistics from shards...")
-    all_symptoms_global = []
-    all_moods_global = []
-    all_severities_global = []
-    
-    for shard_num in range(1, final_dataset['metadata']['totalShards'] + 1):
-        shard_file = f"ml/synthetic_cycle_data_v2_2_part_{shard_num}.json"
-        with open(shard_file, 'r', encoding='utf-8') as f:
-            shard_data = json.load(f)
-            for user in shard_data['data']:
-                for log in user['logs']:
-                    if log.get('symptoms'):
-                        for symptom in log['symptoms']:
-                            all_symptoms_global.append(symptom['id'])
-                            all_severities_global.append(symptom['severity'])
-                    if log.get('mood'):
-                        all_moods_global.append(log['mood'])
-    
-    # ID validation
-    validate_ids({'data': shard_data['data']})
-    
-    # Özet bastır
-    print_summary(
-        final_dataset['metadata'],
-        all_symptoms_global,
-        all_moods_global,
-        all_severities_global
-    )
+    # ID validation (tüm shard'lar)
+    validate_ids(final_dataset['stats'])
+    
+    # Özet bastır (diske dokunmadan, üretim sayaçlarından)
+    print_summary(final_dataset['metadata'], final_dataset['stats'])
     
     # Süre
     elapsed = time.time() - start_time
@@ -0,0 +1,292 @@
+"""
+CycleMate - Pipeline Stage Instrumentation
+==========================================
+
+train_model.py ve train_cycle_ai_model.py aşamaları için ölçüm katmanı.
+- Aşama başına wall süresi, CPU süresi (process + beklenmiş alt process'ler), başlangıç/bitiş/peak RSS
+- İç içe aşamalar ('export/phase_classification' gibi) ve dışarıda ölçülmüş değerler (CV worker'ları)
+- Opsiyonel cProfile: en dıştaki her aşama için <dir>/NN_<aşama>.prof + pstats özeti (.txt)
+- Ortak RSS ölçümü (current/peak/anon RSS, arka plan RssSampler): eğitim ve benchmark script'leri bunu kullanır.
+  Linux'ta /proc, macOS'ta resource; ikisi de yoksa (Windows) RSS ve alt process CPU'su None ('n/a')
+
+Kullanım:
+    stages = StageRecorder(profile_dir='profiles')
+    with stages.stage('fit'):
+        model.fit(X, y)
+    results['pipeline_stages'] = stages.report()
+"""
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+PROFILE_TOP_FUNCTIONS = 30      # pstats özetinde cumulative süreye göre listelenen fonksiyon
+RSS_SAMPLE_INTERVAL = 0.05      # Açık ölçümlerin peak RSS'i için örnekleme aralığı (s)
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """/proc/self/status alanı (MB); /proc yoksa None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Process'in şimdiye kadarki en yüksek RSS değeri (MB). Linux'ta VmHWM: ru_maxrss fork+exec'te
+    parent'ın peak'ini taşır, alt process ölçümünü bozar. Ölçülemiyorsa (Windows) None.
+    """
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döndürür
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """Process'in anlık RSS değeri (MB); /proc yoksa şimdiye kadarki peak, o da yoksa None"""
+    rss = _proc_status_mb('VmRSS')
+    return rss if rss is not None else peak_rss_mb()
+
+
+def anon_rss_mb() -> Optional[float]:
+    """Anonim (dosya dışı) RSS (MB): memmap'lenmiş dosya sayfaları hariç, sadece Linux /proc"""
+    return _proc_status_mb('RssAnon')
+
+
+def max_mb(*values: Optional[float]) -> Optional[float]:
+    """Ölçülebilen RSS değerlerinin en yükseği; hiçbiri ölçülemediyse None"""
+    return max((value for value in values if value is not None), default=None)
+
+
+def format_mb(value: Optional[float], spec: str = '7.0f', unit: str = ' MB') -> str:
+    """RSS sütunu; ölçülemeyen değer aynı genişlikte 'n/a'"""
+    if value is None:
+        return f"{'n/a':>{int(spec.split('.')[0]) + len(unit)}s}"
+    return f"{value:{spec}}{unit}"
+
+
+def _children_cpu_seconds() -> Optional[float]:
+    """Beklenmiş (sonlanmış) alt process'lerin toplam user + system CPU süresi; resource yoksa None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class RssSampler:
+    """
+    measure()'ı (varsayılan current_rss_mb) arka plan thread'inde RSS_SAMPLE_INTERVAL aralıkla örnekler ve her
+    açık ölçüm (key) için görülen en yüksek değeri tutar. Thread ilk ölçüm açılınca başlar, açık ölçüm
+    kalmayınca biter. Değer process geneli olduğundan aynı anda açık ölçümler birbirinin belleğini de görür.
+    measure() None döndürüyorsa (Windows) örnekleme yapılmaz, start/stop None döndürür.
+    """
+
+    def __init__(self, measure: Callable[[], Optional[float]] = current_rss_mb,
+                 interval: float = RSS_SAMPLE_INTERVAL):
+        self.measure = measure
+        self.interval = interval
+        self._peaks: Dict[Any, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        rss = self.measure()
+        if rss is None:
+            return
+        with self._lock:
+            for key, peak in self._peaks.items():
+                if peak is None or rss > peak:
+                    self._peaks[key] = rss
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._peaks:
+                    self._thread = None
+                    return
+            self._sample()
+
+    def start(self, key: Any) -> Optional[float]:
+        """key ölçümünü aç; başlangıç değerini döndür"""
+        rss = self.measure()
+        with self._lock:
+            self._peaks[key] = rss
+            if self._thread is None and rss is not None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return rss
+
+    def stop(self, key: Any) -> Optional[float]:
+        """key ölçümünü kapat; açıkken görülen en yüksek değeri döndür"""
+        self._sample()
+        with self._lock:
+            return self._peaks.pop(key)
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[Dict[str, Optional[float]]]:
+        """with bloğu boyunca ölç: {'baseline_mb', 'peak_mb'} (peak_mb blok çıkışında yazılır)"""
+        key = object()
+        result = {'baseline_mb': self.start(key), 'peak_mb': None}
+        try:
+            yield result
+        finally:
+            result['peak_mb'] = self.stop(key)
+
+
+class StageRecorder:
+    """
+    Pipeline aşamalarını kaydeder. CPU süresi process'in tüm thread'lerini (OpenMP/BLAS dahil) ve
+    beklenmiş alt process'leri kapsar; hâlâ çalışan worker'lar (loky CV / search process'leri) sayılmaz.
+    Worker'da ölçülen değerler add() ile ayrı satır olarak eklenir ve toplama girmez: loky kullanan
+    aşamalarda CPU/wall oranı gerçek paralelliği göstermez. Peak RSS RssSampler ile örneklenir.
+    profile_dir verilirse en dıştaki her aşama cProfile ile profillenir (profiler'lar iç içe çalışamaz).
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None):
+        self.profile_dir = profile_dir
+        self.stages: List[Dict[str, Any]] = []
+        self._open: List[str] = []
+        self._rss = RssSampler()
+        self._profiled = 0
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def _profile_path(self, name: str) -> str:
+        self._profiled += 1
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+        return os.path.join(self.profile_dir, f'{self._profiled:02d}_{slug}')
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Aşamayı ölç; açık aşamanın içindeki aşama '<dış>/<ad>' olarak kaydedilir"""
+        full_name = '/'.join(self._open + [name])
+        entry: Dict[str, Any] = {'stage': full_name, 'depth': len(self._open)}
+        profiler = cProfile.Profile() if self.profile_dir and not self._open else None
+        self._open.append(name)
+        self.stages.append(entry)
+
+        rss_start = self._rss.start(id(entry))
+        wall, cpu, children = time.perf_counter(), time.process_time(), _children_cpu_seconds()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield entry
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            children_end = _children_cpu_seconds()
+            entry.update({
+                'wall_seconds': time.perf_counter() - wall,
+                'cpu_seconds': time.process_time() - cpu,
+                'children_cpu_seconds': children_end - children if children_end is not None else None,
+                'rss_start_mb': rss_start,
+                'rss_end_mb': current_rss_mb(),
+                'peak_rss_mb': self._rss.stop(id(entry)),
+            })
+            self._open.pop()
+            if profiler is not None:
+                entry['profile'] = self._dump_profile(profiler, full_name)
+
+    def _dump_profile(self, profiler: cProfile.Profile, name: str) -> str:
+        """<path>.prof (pstats/snakeviz ile açılır) + cumulative süreye göre özet <path>.txt"""
+        path = self._profile_path(name)
+        profiler.dump_stats(f'{path}.prof')
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(f'{path}.txt', 'w') as f:
+            f.write(summary.getvalue())
+        return f'{path}.prof'
+
+    @contextlib.contextmanager
+    def accumulate(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Aynı adla her girişte wall/CPU süresini tek kayda ekle (döngü içinde parça parça yapılan işler,
+        ör. blok bazlı feature extraction); RSS ve profil tutulmaz.
+        """
+        full_name = '/'.join(self._open + [name])
+        entry = next((entry for entry in self.stages if entry['stage'] == full_name and 'calls' in entry), None)
+        if entry is None:
+            entry = self.add(name, wall_seconds=0.0, cpu_seconds=0.0, calls=0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_seconds'] += time.perf_counter() - wall
+            entry['cpu_seconds'] += time.process_time() - cpu
+            entry['calls'] += 1
+
+    def iterate(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Iterable'ın eleman üretmek için harcadığı süreyi biriktir (lazy shard okuma gibi, bkz. accumulate)"""
+        iterator = iter(iterable)
+        while True:
+            with self.accumulate(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, name: str, **values: Any) -> Dict[str, Any]:
+        """
+        Dışarıda ölçülmüş değerleri (ör. CV worker'larındaki fit süreleri) açık aşamanın altına ekle;
+        kapanmış bir aşamanın altına eklemek için name 'cross_validation/fit' gibi tam yol olabilir.
+        """
+        full_name = '/'.join(self._open + [name])
+        entry = {'stage': full_name, 'depth': full_name.count('/'), **values}
+        self.stages.append(entry)
+        return entry
+
+    def report(self) -> Dict[str, Any]:
+        """training_results.json'a gömülecek özet: aşamalar + en dış aşamaların toplamı"""
+        top = [entry for entry in self.stages if entry['depth'] == 0 and 'wall_seconds' in entry]
+        return {
+            'stages': self.stages,
+            'total_wall_seconds': sum(entry['wall_seconds'] for entry in top),
+            'total_cpu_seconds': sum(entry.get('cpu_seconds', 0.0) + (entry.get('children_cpu_seconds') or 0.0)
+                                     for entry in top),
+            'cpu_scope': ('main process threads + reaped child processes; live loky worker CPU excluded'
+                          if resource is not None else 'main process threads only (no resource module)'),
+            'peak_rss_mb': max_mb(*(entry.get('peak_rss_mb') for entry in self.stages)),
+            'profile_dir': self.profile_dir,
+        }
+
+    def print_summary(self) -> None:
+        """Aşama tablosu (wall | CPU | CPU/wall | peak RSS)"""
+        print("\n⏱  PIPELINE STAGES (wall | cpu | cpu/wall | peak RSS):")
+        for entry in self.stages:
+            if 'wall_seconds' not in entry:
+                continue
+            peak = format_mb(entry['peak_rss_mb']) if 'peak_rss_mb' in entry else f"{'-':>10s}"
+            name = '  ' * entry['depth'] + entry['stage'].rsplit('/', 1)[-1]
+            if 'cpu_seconds' in entry:
+                cpu = entry['cpu_seconds'] + (entry.get('children_cpu_seconds') or 0.0)
+                ratio = cpu / entry['wall_seconds'] if entry['wall_seconds'] > 0 else 0.0
+                cpu_columns = f"{cpu:8.2f}s {ratio:5.2f}x"
+            else:
+                cpu_columns = f"{'-':>9s} {'-':>6s}"
+            print(f"   {name:32s} {entry['wall_seconds']:8.2f}s {cpu_columns} {peak}")
+        report = self.report()
+        print(f"   {'total':32s} {report['total_wall_seconds']:8.2f}s {report['total_cpu_seconds']:8.2f}s "
+              f"(cpu excludes running CV/search worker processes)")
+        if self.profile_dir:
+            print(f"   cProfile dumps: {self.profile_dir}/NN_<stage>.prof (+ .txt summary)")
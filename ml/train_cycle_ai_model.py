@@ -14,6 +14,13 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any
 import os
 import sys
+import tempfile
+import time
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from profiling import RssSampler, StageRecorder, format_mb, max_mb
 
 # ML imports
 try:
@@ -28,8 +35,21 @@ except ImportError:
 
 try:
     from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+    try:
+        from sklearn.ensemble import HistGradientBoostingRegressor
+    except ImportError:
+        HistGradientBoostingRegressor = None
+    try:
+        # HGB'nin kendi binning'i (private API): feature store aynı bin kenarlarını üretir
+        from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+    except ImportError:
+        _BinMapper = None
+    from threadpoolctl import threadpool_limits
     from sklearn.model_selection import train_test_split
     from sklearn.preprocessing import StandardScaler, LabelEncoder
+    from sklearn.neural_network import MLPClassifier, MLPRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.base import BaseEstimator, ClassifierMixin
     from sklearn.metrics import accuracy_score, mean_squared_error, classification_report
     SKLEARN_AVAILABLE = True
 except ImportError:
@@ -47,40 +67,87 @@ except ImportError:
     ONNX_AVAILABLE = False
     print("ONNX not available")
 
-# Synthetic data generator (simplified version)
-def generate_synthetic_training_data(num_users: int = 100, cycles_per_user: int = 6) -> Dict[str, Any]:
+# Sentetik eğitim verisi sabitleri
+SYMPTOMS = ['cramp', 'headache', 'backPain', 'jointPain', 'bloating', 'nausea',
+            'constipation', 'diarrhea', 'acne', 'breastTenderness', 'discharge',
+            'lowEnergy', 'sleepy', 'insomnia', 'appetite', 'cravings',
+            'anxious', 'irritable', 'focusIssues']
+MOODS = ['ecstatic', 'happy', 'calm', 'neutral', 'tired', 'sad', 'anxious', 'irritable', 'angry']
+HABITS = ['water', 'walk', 'rest', 'shower']
+
+# Cycle phases and characteristics
+PHASE_PROFILES = {
+    'menstrual': {
+        'duration': (3, 7),
+        'symptoms': ['cramp', 'lowEnergy', 'backPain', 'bloating'],
+        'moods': ['tired', 'neutral', 'sad'],
+        'energy_level': (0.2, 0.5),
+        'flow_prob': 0.7
+    },
+    'follicular': {
+        'duration': (10, 16),
+        'symptoms': ['lowEnergy', 'acne'],
+        'moods': ['happy', 'calm', 'neutral', 'ecstatic'],
+        'energy_level': (0.6, 0.9),
+        'flow_prob': 0.05
+    },
+    'ovulation': {
+        'duration': (1, 2),
+        'symptoms': ['cramp', 'discharge', 'breastTenderness'],
+        'moods': ['happy', 'ecstatic', 'calm'],
+        'energy_level': (0.8, 1.0),
+        'flow_prob': 0.03
+    },
+    'luteal': {
+        'duration': (9, 16),
+        'symptoms': ['bloating', 'breastTenderness', 'cravings', 'acne', 'lowEnergy', 'headache', 'anxious', 'irritable'],
+        'moods': ['anxious', 'irritable', 'tired', 'neutral', 'sad'],
+        'energy_level': (0.3, 0.7),
+        'flow_prob': 0.10  # PMS spotting can occur
+    }
+}
+
+# Kategori kodları (LabelEncoder ile aynı alfabetik sıra -> export edilen modellerle uyumlu)
+PHASE_CLASSES = sorted(PHASE_PROFILES)
+MOOD_CLASSES = sorted({mood for profile in PHASE_PROFILES.values() for mood in profile['moods']})
+PHASE_CLASS_INDEX = {phase: i for i, phase in enumerate(PHASE_CLASSES)}
+MOOD_CLASS_INDEX = {mood: i for i, mood in enumerate(MOOD_CLASSES)}
+
+# Symptom hedefleri satır başına bir uint32 bitmask: bit i = SYMPTOMS[i]
+SYMPTOM_BITS = np.left_shift(np.uint32(1), np.arange(len(SYMPTOMS), dtype=np.uint32))
+assert len(SYMPTOMS) <= 32, "Symptom bitmask needs one bit per symptom"
+SYMPTOM_BITS_BY_NAME = {symptom: int(bit) for symptom, bit in zip(SYMPTOMS, SYMPTOM_BITS)}
+
+TRAINING_DATA_ENGINES = ['python', 'numpy']
+CV_FOLDS = 5
+USER_BATCH_SIZE = 1000  # Vektörize motorda tek seferde üretilen kullanıcı sayısı
+OOC_CHUNK_ROWS = 65536  # Out-of-core modda diskten tek seferde okunan satır
+OOC_EPOCHS = 3          # Out-of-core artımlı modellerin train verisi üzerinden geçiş sayısı
+
+
+def generate_synthetic_training_data(num_users: int = 100, cycles_per_user: int = 6,
+                                     engine: str = 'numpy', seed: int = 42, out_dir: str = None) -> Dict[str, Any]:
     """
     @adet.md bilgilerini kullanarak sentetik eğitim verisi üret
+    
+    engine='numpy' kullanıcıları USER_BATCH_SIZE'lık gruplar halinde dizi işlemleriyle üretir;
+    engine='python' eski gün gün üretim (global np.random state'i kullanır).
+    Features float32; phase/mood hedefleri int8 kod (PHASE_CLASSES/MOOD_CLASSES), gün offset'leri
+    ve energy float32, ertesi gün semptomları uint32 bitmask (SYMPTOM_BITS).
+    out_dir verilirse (out-of-core, sadece numpy motoru) diziler out_dir'deki .npy dosyalarına
+    yazılır ve salt okunur memmap olarak döner.
     """
+    if engine not in TRAINING_DATA_ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {TRAINING_DATA_ENGINES}")
+    if engine == 'numpy':
+        return generate_synthetic_training_data_vectorized(num_users, cycles_per_user, np.random.default_rng(seed),
+                                                           out_dir=out_dir)
+    if out_dir is not None:
+        raise ValueError("Out-of-core data generation requires engine='numpy'")
+    
     print(f"Generating synthetic data for {num_users} users...")
     
-    # Cycle phases and characteristics
-    phases = {
-        'menstrual': {
-            'duration': (3, 7),
-            'symptoms': ['cramp', 'lowEnergy', 'backPain', 'bloating'],
-            'moods': ['tired', 'neutral', 'sad'],
-            'energy_level': (0.2, 0.5)
-        },
-        'follicular': {
-            'duration': (10, 16),
-            'symptoms': ['lowEnergy', 'acne'],
-            'moods': ['happy', 'calm', 'neutral', 'ecstatic'],
-            'energy_level': (0.6, 0.9)
-        },
-        'ovulation': {
-            'duration': (1, 2),
-            'symptoms': ['cramp', 'discharge', 'breastTenderness'],
-            'moods': ['happy', 'ecstatic', 'calm'],
-            'energy_level': (0.8, 1.0)
-        },
-        'luteal': {
-            'duration': (9, 16),
-            'symptoms': ['bloating', 'breastTenderness', 'cravings', 'acne', 'lowEnergy', 'headache', 'anxious', 'irritable'],
-            'moods': ['anxious', 'irritable', 'tired', 'neutral', 'sad'],
-            'energy_level': (0.3, 0.7)
-        }
-    }
+    phases = PHASE_PROFILES
     
     all_features = []
     all_targets = {
@@ -130,6 +197,9 @@ def generate_synthetic_training_data(num_users: int = 100, cycles_per_user: int
                 
                 # Generate targets
                 targets = generate_targets(current_day, day_in_cycle, cycle_length, phase, phases)
+                targets['phase'] = PHASE_CLASS_INDEX[targets['phase']]
+                targets['mood'] = MOOD_CLASS_INDEX[targets['mood']]
+                targets['symptoms'] = pack_symptom_mask(targets['symptoms'])
                 for key, value in targets.items():
                     all_targets[key].append(value)
                 
@@ -138,14 +208,217 @@ def generate_synthetic_training_data(num_users: int = 100, cycles_per_user: int
             
             current_date += timedelta(days=cycle_length)
     
+    for key in ['next_period', 'ovulation', 'fertile_window_start', 'fertile_window_end', 'energy_level']:
+        all_targets[key] = np.array(all_targets[key], dtype=np.float32)
+    for key in ['phase', 'mood']:
+        all_targets[key] = np.array(all_targets[key], dtype=np.int8)
+    all_targets['symptoms'] = np.array(all_targets['symptoms'], dtype=np.uint32)
+    
     return {
-        'features': np.array(all_features),
+        'features': np.array(all_features, dtype=np.float32),
         'targets': all_targets,
         'user_ids': np.array(all_user_ids),
         'feature_names': get_feature_names(),
         'target_names': list(all_targets.keys())
     }
 
+
+def generate_synthetic_training_data_vectorized(num_users: int, cycles_per_user: int,
+                                                rng: np.random.Generator,
+                                                batch_size: int = USER_BATCH_SIZE,
+                                                out_dir: str = None) -> Dict[str, Any]:
+    """
+    generate_synthetic_training_data'nın vektörize karşılığı (aynı çıktı yapısı ve feature kolonları).
+    Hedefler datetime yerine gün offset'leri üzerinden tamsayı aritmetiğiyle hesaplanır;
+    symptoms hedefi satır başına uint32 bitmask olarak döner.
+    """
+    print(f"Generating synthetic data for {num_users} users (vectorized)...")
+    
+    # Kullanıcı ortalamaları ve cycle uzunlukları önce çekilir: toplam satır sayısı bilinince
+    # çıktı dizileri bir kez ayrılır, gruplar doğrudan yerine yazılır (concatenate kopyası yok)
+    avg_cycle = rng.integers(21, 36, size=num_users)  # 21-35 days
+    avg_period = rng.integers(3, 8, size=num_users)   # 3-7 days
+    cycle_length = rng.integers(avg_cycle[:, None] - 3, avg_cycle[:, None] + 4, size=(num_users, cycles_per_user))
+    user_rows = cycle_length.sum(axis=1)
+    total_rows = int(user_rows.sum())
+    
+    def _allocate(name: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+        if out_dir is None:
+            return np.empty(shape, dtype=dtype)
+        return np.lib.format.open_memmap(os.path.join(out_dir, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+    
+    features = _allocate('features', (total_rows, len(get_feature_names())), np.float32)
+    targets = {
+        'next_period': _allocate('next_period', (total_rows,), np.float32),
+        'ovulation': _allocate('ovulation', (total_rows,), np.float32),
+        'fertile_window_start': _allocate('fertile_window_start', (total_rows,), np.float32),
+        'fertile_window_end': _allocate('fertile_window_end', (total_rows,), np.float32),
+        'phase': _allocate('phase', (total_rows,), np.int8),
+        'symptoms': _allocate('symptoms', (total_rows,), np.uint32),
+        'mood': _allocate('mood', (total_rows,), np.int8),
+        'energy_level': _allocate('energy_level', (total_rows,), np.float32)
+    }
+    user_ids = _allocate('user_ids', (total_rows,), np.int64)
+    user_ids[:] = np.repeat(np.arange(num_users), user_rows)
+    
+    row = 0
+    for first_user in range(0, num_users, batch_size):
+        users = slice(first_user, first_user + batch_size)
+        batch = _generate_user_batch(avg_cycle[users], avg_period[users], cycle_length[users], rng)
+        rows = slice(row, row + len(batch['features']))
+        features[rows] = batch['features']
+        for key, values in batch['targets'].items():
+            targets[key][rows] = values
+        row = rows.stop
+    
+    if out_dir is not None:
+        # Yazma bitti: dosyaları salt okunur memmap olarak yeniden aç (CV worker'larına dosya adıyla geçer)
+        features.flush()
+        features = np.load(features.filename, mmap_mode='r')
+        for key, values in targets.items():
+            values.flush()
+            targets[key] = np.load(values.filename, mmap_mode='r')
+        user_ids.flush()
+        user_ids = np.load(user_ids.filename, mmap_mode='r')
+    
+    return {
+        'features': features,
+        'targets': targets,
+        'user_ids': user_ids,
+        'feature_names': get_feature_names(),
+        'target_names': list(targets.keys())
+    }
+
+
+def _generate_user_batch(avg_cycle: np.ndarray, avg_period: np.ndarray, cycle_length: np.ndarray,
+                         rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Bir kullanıcı grubunun tüm günlerini tek seferde üret (extract_features + generate_targets).
+    cycle_length: (kullanıcı, cycle) gerçek cycle uzunlukları.
+    """
+    batch_users, cycles = cycle_length.shape
+    phase_names = list(PHASE_PROFILES)
+    energy_range = np.array([PHASE_PROFILES[p]['energy_level'] for p in phase_names])
+    flow_prob = np.array([PHASE_PROFILES[p]['flow_prob'] for p in phase_names])
+    # Ertesi gün semptomları sadece menstrual/luteal fazda devam eder (faz başına bitmask)
+    next_symptom_mask = np.array([
+        pack_symptom_mask(PHASE_PROFILES[p]['symptoms']) if p in ('menstrual', 'luteal') else 0
+        for p in phase_names
+    ], dtype=np.uint32)
+    phase_codes = np.array([PHASE_CLASS_INDEX[p] for p in phase_names], dtype=np.int8)
+    mood_counts = np.array([len(PHASE_PROFILES[p]['moods']) for p in phase_names])
+    mood_table = np.zeros((len(phase_names), mood_counts.max()), dtype=np.int8)
+    for i, p in enumerate(phase_names):
+        mood_table[i, :mood_counts[i]] = [MOOD_CLASS_INDEX[m] for m in PHASE_PROFILES[p]['moods']]
+    
+    # User history (generate_user_history)
+    hist_cycles = np.clip(rng.normal(28, 3, size=(batch_users, cycles)), 21, 35)
+    hist_periods = np.clip(rng.normal(5, 1.5, size=(batch_users, cycles)), 3, 8)
+    cycle_mean = hist_cycles.mean(axis=1)
+    cycle_std = hist_cycles.std(axis=1)
+    if cycles >= 3:
+        # Lineer regresyon eğimi (np.polyfit(x, y, 1)[0] ile aynı)
+        x = np.arange(cycles) - (cycles - 1) / 2
+        cycle_trend = (hist_cycles - cycle_mean[:, None]) @ x / (x @ x)
+    else:
+        cycle_trend = np.zeros(batch_users)
+    logging_rate = rng.uniform(0.6, 1.0, size=batch_users)
+    history = np.column_stack([
+        cycle_std / cycle_mean,
+        cycle_trend,
+        hist_cycles[:, -3:].mean(axis=1) / 35.0,
+        hist_cycles[:, -5:].mean(axis=1) / 35.0,
+        hist_cycles[:, -1] / 35.0,
+        hist_periods[:, -1] / 7.0,
+        hist_periods.mean(axis=1) / 7.0,
+        hist_periods.std(axis=1) / 3.0,
+        (hist_cycles[:, -1] - hist_periods[:, -1]) / 20.0,
+        logging_rate
+    ])
+    
+    # Her cycle'ın her günü bir satır
+    cycle_length = cycle_length.ravel()
+    n = int(cycle_length.sum())
+    row_cycle = np.repeat(np.arange(len(cycle_length)), cycle_length)
+    row_user = row_cycle // cycles
+    cycle_offset = np.cumsum(cycle_length) - cycle_length
+    day_in_cycle = np.arange(n) - cycle_offset[row_cycle] + 1
+    length = cycle_length[row_cycle]
+    period = avg_period[row_user]
+    
+    # Determine phase (0=menstrual, 1=follicular, 2=ovulation, 3=luteal)
+    phase = np.select(
+        [day_in_cycle <= period, day_in_cycle <= length - 14, day_in_cycle <= length - 12],
+        [0, 1, 2],
+        default=3
+    )
+    
+    # Features (get_feature_names sırası)
+    user_avg_cycle = cycle_mean[row_user]
+    angle = 2 * np.pi * day_in_cycle / user_avg_cycle
+    symptom_prob = rng.uniform(0.1, 0.4, size=(n, len(SYMPTOMS)))
+    symptom_present = rng.random((n, len(SYMPTOMS))) < symptom_prob
+    symptom_severity = np.where(symptom_present, rng.uniform(0, 3, size=(n, len(SYMPTOMS))), 0.0)
+    has_flow = rng.random(n) < flow_prob[phase]
+    
+    features = np.column_stack([
+        day_in_cycle / 35.0,
+        user_avg_cycle / 35.0,
+        cycle_std[row_user] / 10.0,
+        period / 7.0,
+        np.sin(angle),
+        np.cos(angle),
+        symptom_severity / 3.0,
+        (rng.random((n, len(MOODS))) < 0.2).astype(np.float64),
+        np.clip(rng.normal(energy_range[phase].mean(axis=1), 0.25), 0.0, 1.0),
+        has_flow.astype(np.float64),
+        np.where(has_flow, rng.uniform(0.3, 1.0, size=n), 0.0),
+        history[row_user],
+        (rng.random((n, len(HABITS))) < 0.4).astype(np.float64)
+    ]).astype(np.float32)
+    assert features.shape[1] == len(get_feature_names())
+    
+    # Targets: sonraki period'a kalan gün tamsayı aritmetiğiyle
+    days_to_period = (length - day_in_cycle).astype(np.float32)
+    targets = {
+        'next_period': days_to_period,
+        'ovulation': days_to_period - 14,
+        'fertile_window_start': days_to_period - 19,
+        'fertile_window_end': days_to_period - 13,
+        'phase': phase_codes[phase],
+        'symptoms': pack_symptom_matrix(rng.random((n, len(SYMPTOMS))) < 0.3) & next_symptom_mask[phase],
+        'mood': mood_table[phase, (rng.random(n) * mood_counts[phase]).astype(np.int64)],
+        'energy_level': rng.uniform(energy_range[phase, 0], energy_range[phase, 1]).astype(np.float32)
+    }
+    
+    return {
+        'features': features,
+        'targets': targets
+    }
+
+
+def pack_symptom_mask(symptoms: List[str]) -> int:
+    """Semptom isimlerini tek bir bitmask'e çevir (SYMPTOMS dışındakiler yok sayılır)"""
+    mask = 0
+    for symptom in symptoms:
+        if symptom in SYMPTOM_BITS_BY_NAME:
+            mask |= SYMPTOM_BITS_BY_NAME[symptom]
+    return mask
+
+
+def pack_symptom_matrix(matrix: np.ndarray) -> np.ndarray:
+    """(n, len(SYMPTOMS)) bool/0-1 matrisini (n,) uint32 bitmask dizisine paketle"""
+    packed = np.packbits(matrix.astype(bool, copy=False), axis=1, bitorder='little')
+    words = np.zeros((len(matrix), 4), dtype=np.uint8)
+    words[:, :packed.shape[1]] = packed
+    return words.view('<u4').ravel().astype(np.uint32, copy=False)
+
+
+def unpack_symptom_masks(masks: np.ndarray) -> np.ndarray:
+    """uint32 bitmask dizisini (n, len(SYMPTOMS)) uint8 multi-label matrisine aç"""
+    return ((np.asarray(masks, dtype=np.uint32)[:, None] & SYMPTOM_BITS) != 0).view(np.uint8)
+
+
 def extract_features(day_in_cycle: int, user_history: Dict, period_length: int, 
                     phase: str, phases: Dict) -> List[float]:
     """Feature extraction for a single day - NO LEAKAGE"""
@@ -226,6 +499,7 @@ def extract_features(day_in_cycle: int, user_history: Dict, period_length: int,
     
     return features
 
+
 def generate_user_history(cycles: int) -> Dict[str, float]:
     """Generate user historical statistics (NO LEAKAGE)"""
     # Generate historical cycle lengths
@@ -268,6 +542,7 @@ def generate_user_history(cycles: int) -> Dict[str, float]:
         'logging_rate': np.random.uniform(0.6, 1.0),  # User engagement rate
     }
 
+
 def generate_targets(current_day: datetime, day_in_cycle: int, cycle_length: int, 
                     phase: str, phases: Dict) -> Dict[str, Any]:
     """Generate targets for training"""
@@ -315,6 +590,7 @@ def generate_targets(current_day: datetime, day_in_cycle: int, cycle_length: int
     
     return targets
 
+
 def get_feature_names() -> List[str]:
     """Get feature names for interpretability"""
     features = []
@@ -353,10 +629,23 @@ def get_feature_names() -> List[str]:
     
     return features
 
+
+def _fixed_label_encoder(classes: List[str]) -> LabelEncoder:
+    """Sabit sınıf listesinden LabelEncoder (fit pass'i yok; export/metadata uyumluluğu için)"""
+    encoder = LabelEncoder()
+    encoder.classes_ = np.array(classes)
+    return encoder
+
+
 def prepare_data_for_training(data: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, np.ndarray], Any, Any, np.ndarray]:
-    """Prepare data for ML training"""
+    """
+    Prepare data for ML training
     
-    X = data['features']
+    Hedefler zaten kodlu gelir (phase/mood int8, gün offset'leri float32, symptoms uint32 bitmask);
+    string listesi ve LabelEncoder.fit_transform pass'i yok, encoder'lar sabit sınıf listelerinden kurulur.
+    """
+    
+    X = np.asanyarray(data['features'], dtype=np.float32)  # out-of-core memmap kopyalanmaz
     y = data['targets']
     
     # Assert feature count matches feature names
@@ -372,103 +661,580 @@ def prepare_data_for_training(data: Dict[str, Any]) -> Tuple[np.ndarray, Dict[st
     
     # Date targets (already in days from current day)
     for date_key in ['next_period', 'ovulation', 'fertile_window_start', 'fertile_window_end']:
-        processed_targets[date_key] = np.array(y[date_key])
-    
-    # Phase (categorical)
-    phase_encoder = LabelEncoder()
-    processed_targets['phase'] = phase_encoder.fit_transform(y['phase'])
-    
-    # Symptoms (multi-label)
-    all_symptoms = ['cramp', 'headache', 'backPain', 'jointPain', 'bloating', 'nausea',
-                    'constipation', 'diarrhea', 'acne', 'breastTenderness', 'discharge',
-                    'lowEnergy', 'sleepy', 'insomnia', 'appetite', 'cravings',
-                    'anxious', 'irritable', 'focusIssues']
+        processed_targets[date_key] = np.asanyarray(y[date_key], dtype=np.float32)
     
-    symptom_matrix = np.zeros((len(X), len(all_symptoms)))
-    for i, symptoms in enumerate(y['symptoms']):
-        for symptom in symptoms:
-            if symptom in all_symptoms:
-                symptom_matrix[i, all_symptoms.index(symptom)] = 1.0
+    # Phase (categorical, PHASE_CLASSES kodu)
+    phase_encoder = _fixed_label_encoder(PHASE_CLASSES)
+    processed_targets['phase'] = np.asanyarray(y['phase'], dtype=np.int8)
     
-    processed_targets['symptoms'] = symptom_matrix
+    # Symptoms (multi-label): uint32 bitmask -> (n, 19) uint8 matris
+    processed_targets['symptoms'] = unpack_symptom_masks(y['symptoms'])
     
-    # Mood (categorical)
-    mood_encoder = LabelEncoder()
-    processed_targets['mood'] = mood_encoder.fit_transform(y['mood'])
+    # Mood (categorical, MOOD_CLASSES kodu)
+    mood_encoder = _fixed_label_encoder(MOOD_CLASSES)
+    processed_targets['mood'] = np.asanyarray(y['mood'], dtype=np.int8)
     
     # Energy level (continuous)
-    processed_targets['energy_level'] = np.array(y['energy_level'])
+    processed_targets['energy_level'] = np.asanyarray(y['energy_level'], dtype=np.float32)
     
     return X, processed_targets, phase_encoder, mood_encoder, data['user_ids']
 
-def train_models(X: np.ndarray, y: Dict[str, np.ndarray], user_ids: np.ndarray, phase_encoder: Any, mood_encoder: Any) -> Dict[str, Any]:
-    """Train multiple models for different tasks"""
-    
-    if not SKLEARN_AVAILABLE:
-        raise ImportError("Scikit-learn is required for training")
-    
-    print("Training models...")
-    
-    # Ensure numpy is available
-    import numpy as np
+
+# (görev modeli -> hedef), pahalıdan ucuza: RF'ler önce planlanır
+TASK_TARGETS = {
+    'phase_classification': 'phase',
+    'mood_classification': 'mood',
+    'symptom_prediction': 'symptoms',
+    'energy_prediction': 'energy_level',
+    'period_prediction': 'next_period',
+    'ovulation_prediction': 'ovulation'
+}
+
+# Gün offset hedefleri next_period'dan sabit farkla türetilir (generate_targets):
+# ovulation = next_period - 14, fertile window = ovulation - 5 .. ovulation + 1
+DAY_OFFSET_TARGETS = {
+    'next_period': 0,
+    'ovulation': -14,
+    'fertile_window_start': -19,
+    'fertile_window_end': -13
+}
+
+# separate: period + ovulation için ayrı HGB; shared: tek period modeli + DAY_OFFSET_TARGETS
+REGRESSION_MODES = ['separate', 'shared']
+
+
+def task_model_names(regression_mode: str = 'separate') -> List[str]:
+    """Eğitilecek görev modelleri (shared modda ovulation modeli yok)"""
+    if regression_mode not in REGRESSION_MODES:
+        raise ValueError(f"Unknown regression mode '{regression_mode}', expected one of {REGRESSION_MODES}")
+    if regression_mode == 'shared':
+        return [name for name in TASK_TARGETS if name != 'ovulation_prediction']
+    return list(TASK_TARGETS)
+
+
+HGB_MAX_BINS = 255  # HGB varsayılanı; uint8 bin kodu 255 eksik değer bin'ine ayrılır
+
+
+class BinnedFeatureStore:
+    """
+    Features HGB'nin _BinMapper'ı ile bir kez uint8 bin kodlarına quantize edilir; bir fold'daki tüm HGB
+    fit'leri (early stopping holdout'u dahil) aynı kod matrisini ve bin kenarlarını paylaşır.
+    Bin kenarları sadece verilen satırlardan (fold train) öğrenilir, test kullanıcıları görülmez.
+    bin kodu = (x'ten küçük eşik sayısı), NaN -> missing_values_bin_idx.
+    """
     
-    # User-based split to prevent data leakage
-    from sklearn.model_selection import GroupKFold
+    def __init__(self, bin_mapper: Any, X_binned: np.ndarray):
+        self.bin_mapper = bin_mapper
+        self.X_binned = X_binned
+    
+    @classmethod
+    def build(cls, X: np.ndarray, rows: np.ndarray = None, max_bins: int = HGB_MAX_BINS,
+              subsample: int = 200000, random_state: int = 42) -> 'BinnedFeatureStore':
+        """
+        X[rows]'un (varsayılan: tüm satırlar) store'u: bin kenarlarını bu satırların en fazla subsample
+        kadarından öğren, satırları OOC_CHUNK_ROWS'luk parçalarla uint8'e çevir (X_binned satır i = rows[i]).
+        """
+        rows = np.arange(len(X)) if rows is None else np.asarray(rows)
+        rng = np.random.default_rng(random_state)
+        sample = np.sort(rng.choice(rows, subsample, replace=False)) if len(rows) > subsample else rows
+        bin_mapper = _BinMapper(n_bins=max_bins + 1, subsample=None, random_state=random_state).fit(X[sample])
+        
+        X_binned = np.empty((len(rows), X.shape[1]), dtype=np.uint8, order='F')
+        for start in range(0, len(rows), OOC_CHUNK_ROWS):
+            X_binned[start:start + OOC_CHUNK_ROWS] = bin_mapper.transform(X[rows[start:start + OOC_CHUNK_ROWS]])
+        return cls(bin_mapper, X_binned)
+    
+    def subset(self, indices: np.ndarray) -> 'BinnedFeatureStore':
+        """X_binned satırlarının alt kümesi (örn. early stopping fit kısmı), HGB'nin beklediği F-order"""
+        return BinnedFeatureStore(self.bin_mapper, np.asfortranarray(self.X_binned[indices]))
+    
+    @property
+    def bin_edges(self) -> List[np.ndarray]:
+        """Feature başına artan eşik dizisi"""
+        return self.bin_mapper.bin_thresholds_
+    
+    def export(self, path: str, feature_names: List[str]) -> None:
+        """Bin kenarlarını JSON olarak yaz (cihaz üstü feature hazırlığı aynı kodları üretsin)"""
+        with open(path, 'w') as f:
+            json.dump({
+                'max_bins': int(self.bin_mapper.n_bins - 1),
+                'missing_values_bin_idx': int(self.bin_mapper.missing_values_bin_idx_),
+                'rule': 'bin = number of thresholds strictly less than x; NaN -> missing_values_bin_idx',
+                'features': [
+                    {'name': name, 'thresholds': edges.astype(float).tolist()}
+                    for name, edges in zip(feature_names, self.bin_edges)
+                ]
+            }, f, indent=2)
+
+
+if SKLEARN_AVAILABLE and HistGradientBoostingRegressor is not None and _BinMapper is not None:
+    class PrebinnedHistGradientBoostingRegressor(HistGradientBoostingRegressor):
+        """
+        BinnedFeatureStore kodlarıyla eğitilebilen HGB: fit(X_binned, y, bin_mapper=store.bin_mapper)
+        kendi binning'ini atlar; early stopping için X_val de aynı store'un uint8 kodları olmalıdır.
+        Tahmin ham (float) features üzerinden, paylaşılan bin eşikleriyle yapılır.
+        bin_mapper verilmezse HistGradientBoostingRegressor ile aynıdır.
+        """
+        
+        def fit(self, X, y, sample_weight=None, *, bin_mapper=None, **fit_params):
+            self._shared_bin_mapper = bin_mapper
+            try:
+                return super().fit(X, y, sample_weight, **fit_params)
+            finally:
+                del self._shared_bin_mapper
+        
+        def _preprocess_X(self, X, *, reset):
+            if getattr(self, '_shared_bin_mapper', None) is not None:
+                if X.dtype != np.uint8 or X.shape[1] != len(self._shared_bin_mapper.bin_thresholds_):
+                    raise ValueError("Pre-binned fit expects the uint8 codes of the given bin_mapper")
+                if not reset:
+                    return X  # X_val
+                self.is_categorical_ = None
+                self._preprocessor = None
+                self._is_categorical_remapped = None
+                self.n_features_in_ = X.shape[1]
+                return X, None
+            return super()._preprocess_X(X, reset=reset)
+        
+        def _bin_data(self, X, *args, is_training_data):
+            # sklearn 1.7: (X, is_training_data), >=1.8: (X, sample_weight, is_training_data)
+            if getattr(self, '_shared_bin_mapper', None) is None:
+                return super()._bin_data(X, *args, is_training_data=is_training_data)
+            self._bin_mapper = self._shared_bin_mapper
+            return np.asfortranarray(X) if is_training_data else np.ascontiguousarray(X)
+    
+else:
+    PrebinnedHistGradientBoostingRegressor = None
+
+
+@functools.lru_cache(maxsize=None)
+def _prebinned_supported() -> bool:
+    """
+    Ezilen private hook'lar (_preprocess_X, _bin_data) bu sklearn sürümünde hâlâ çağrılıyor mu: ilk çağrıda
+    küçük bir deneme fit'i (process başına bir kez). False ise HGB'ler düz HistGradientBoostingRegressor'dır.
+    """
+    if PrebinnedHistGradientBoostingRegressor is None:
+        return False
+    X_probe = np.random.default_rng(0).random((64, 2)).astype(np.float32)
+    try:
+        store = BinnedFeatureStore.build(X_probe, max_bins=15)
+        model = PrebinnedHistGradientBoostingRegressor(max_iter=2, early_stopping=False)
+        model.fit(store.X_binned, X_probe[:, 0], bin_mapper=store.bin_mapper)
+        return model._bin_mapper is store.bin_mapper and model.predict(X_probe).shape == (64,)
+    except Exception:
+        return False
+
+# Görev modeli aileleri: --search arama uzayını aile bazında seçer
+MODEL_FAMILIES = {
+    name: 'hgb' if name in ('period_prediction', 'ovulation_prediction') else 'rf'
+    for name in TASK_TARGETS
+}
+
+
+def _make_task_model(name: str, n_threads: int, model_params: Dict[str, Dict[str, Any]] = None) -> Any:
+    """
+    Görev modelini oluştur; RF thread sayısı n_jobs ile, HGB'ninki fit sırasında OpenMP limitiyle verilir.
+    model_params ({görev: {...}}, örn. --search'ün task_params'ı) görevin varsayılan hiperparametrelerini ezer.
+    """
+    task_params = (model_params or {}).get(name, {})
+    if name in ('period_prediction', 'ovulation_prediction'):
+        if HistGradientBoostingRegressor is not None:
+            # Pre-binned hook'lar bu sklearn sürümünde yoksa düz HGB (kendi binning'i ile)
+            model_class = PrebinnedHistGradientBoostingRegressor if _prebinned_supported() else HistGradientBoostingRegressor
+            return model_class(
+                max_iter=100,
+                max_depth=8,
+                learning_rate=0.1,
+                l2_regularization=0.1,
+                random_state=42
+            ).set_params(**task_params)
+        # Fallback to GradientBoostingRegressor if HistGradientBoostingRegressor not available
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(
+            n_estimators=100,
+            max_depth=8,
+            learning_rate=0.1,
+            random_state=42
+        )
+    if name == 'phase_classification':
+        return RandomForestClassifier(
+            n_estimators=50,
+            max_depth=12,
+            n_jobs=n_threads,
+            random_state=42
+        ).set_params(**task_params)
+    if name == 'mood_classification':
+        return RandomForestClassifier(
+            n_estimators=50,
+            max_depth=12,
+            class_weight='balanced',  # Handle class imbalance
+            n_jobs=n_threads,
+            random_state=42
+        ).set_params(**task_params)
+    if name == 'symptom_prediction':
+        # Multi-output: (n, 19) uint8 hedef matrisi tek RF ile (etiket başına bir çıktı)
+        return RandomForestClassifier(
+            n_estimators=50,
+            max_depth=12,
+            n_jobs=n_threads,
+            random_state=42
+        ).set_params(**task_params)
+    return RandomForestRegressor(
+        n_estimators=50,
+        max_depth=12,
+        n_jobs=n_threads,
+        random_state=42
+    ).set_params(**task_params)
+
+
+# Out-of-core modda diskteki X_train'den parça parça (partial_fit) eğitilen görevler;
+# period/ovulation HGB'leri bellek içi fit'te kalır
+INCREMENTAL_TASKS = ['phase_classification', 'mood_classification', 'symptom_prediction', 'energy_prediction']
+
+
+def _make_incremental_model(name: str) -> Any:
+    """Out-of-core görev modeli: partial_fit destekleyen MLP (StandardScaler ile Pipeline'a sarılır)"""
+    if name == 'energy_prediction':
+        return MLPRegressor(hidden_layer_sizes=(64, 32), random_state=42)
+    return MLPClassifier(hidden_layer_sizes=(64, 32), random_state=42)
+
+
+def _fit_incremental_model(name: str, X_train: np.ndarray, y_fit: np.ndarray) -> Any:
+    """
+    X_train'i (memmap) OOC_CHUNK_ROWS'luk parçalarla oku: önce StandardScaler.partial_fit, sonra
+    OOC_EPOCHS geçiş boyunca karışık parça sırasıyla MLP.partial_fit. Bellekte tek parça tutulur.
+    """
+    chunks = [slice(start, min(start + OOC_CHUNK_ROWS, len(X_train)))
+              for start in range(0, len(X_train), OOC_CHUNK_ROWS)]
+    scaler = StandardScaler()
+    for chunk in chunks:
+        scaler.partial_fit(X_train[chunk])
+    
+    model = _make_incremental_model(name)
+    fit_params = {}
+    if name == 'phase_classification':
+        fit_params['classes'] = np.arange(len(PHASE_CLASSES))
+    elif name == 'mood_classification':
+        fit_params['classes'] = np.arange(len(MOOD_CLASSES))
+        # class_weight='balanced' karşılığı satır ağırlıkları
+        counts = np.bincount(y_fit, minlength=len(MOOD_CLASSES))
+        class_weight = len(y_fit) / (len(MOOD_CLASSES) * np.maximum(counts, 1))
+    elif name == 'symptom_prediction':
+        fit_params['classes'] = np.arange(len(SYMPTOMS))
+    
+    rng = np.random.default_rng(42)
+    for _ in range(OOC_EPOCHS):
+        for i in rng.permutation(len(chunks)):
+            chunk = chunks[i]
+            if name == 'mood_classification':
+                fit_params['sample_weight'] = class_weight[y_fit[chunk]]
+            model.partial_fit(scaler.transform(X_train[chunk]), y_fit[chunk], **fit_params)
+    
+    return Pipeline([('scaler', scaler), ('mlp', model)])
+
+
+# Early stopping: HGB için fold train kullanıcılarının bir kısmı validation holdout'u olur (satır değil
+# kullanıcı; aynı kullanıcının satırları hem train hem validation'da olursa kayıp iyimser kalır).
+# RF'ler holdout kullanmaz: ağaç sayısı tüm train satırlarında out-of-bag kaybıyla seçilir (tek fit)
+EARLY_STOPPING_USER_FRACTION = 0.1
+RF_GROWTH_STEP = 10      # warm_start ile adım başına eklenen ağaç (üst sınır n_estimators)
+RF_PLATEAU_TOL = 0.002   # OOB kaybı göreli olarak bundan az iyileşirse son adım atılır ve büyüme durur
+
+
+def _validation_split(train_idx: np.ndarray, groups: np.ndarray,
+                      fraction: float = EARLY_STOPPING_USER_FRACTION) -> Tuple[np.ndarray, np.ndarray]:
+    """train_idx'i kullanıcı bazında (fit, validation) kısımlarına ayır; train_idx içindeki pozisyonları döndürür"""
+    from sklearn.model_selection import GroupShuffleSplit
     
-    # Use GroupKFold for user-based splitting
-    gkf = GroupKFold(n_splits=5)
+    return next(GroupShuffleSplit(n_splits=1, test_size=fraction, random_state=42)
+                .split(train_idx, groups=groups[train_idx]))
+
+
+def _accumulate_oob(name: str, model: Any, X_train: np.ndarray, start: int,
+                    sums: np.ndarray, counts: np.ndarray) -> None:
+    """
+    estimators_[start:] ağaçlarının out-of-bag tahminlerini sums/counts'a ekle. sklearn'ün oob_score'u her
+    warm_start adımında tüm ağaçları baştan tahmin eder ve etiketlerin sınıf sayısı farklı olan multi-label
+    modellerde (tek sınıflı semptom) hata verir; burada her ağaç bir kez ve etiket başına P(1) ile tahmin edilir
+    """
+    for tree, in_bag in zip(model.estimators_[start:], model.estimators_samples_[start:]):
+        oob = np.bincount(in_bag, minlength=len(X_train)) == 0
+        X_oob = X_train[oob]
+        if isinstance(model, RandomForestRegressor):
+            pred = tree.predict(X_oob)
+        elif name == 'symptom_prediction':
+            # etiket başına P(semptom=1); tek sınıflı etiketler 0/1 sabit (symptom_probabilities gibi)
+            pred = np.stack([proba[:, list(classes).index(1)] if 1 in classes else np.zeros(len(X_oob))
+                             for proba, classes in zip(tree.predict_proba(X_oob), model.classes_)], axis=1)
+        else:
+            pred = tree.predict_proba(X_oob)
+        sums[oob] += pred
+        counts[oob] += 1
+
+
+def _oob_loss(name: str, model: Any, y_fit: np.ndarray, sums: np.ndarray, counts: np.ndarray) -> float:
+    """
+    Biriken OOB tahminlerinden kayıp: regresyonda MSE, sınıflandırmada (multi-label dahil) Brier skoru;
+    henüz hiçbir ağacın OOB'u olmamış satırlar atlanır
+    """
+    valid = counts > 0
+    pred = sums[valid] / counts[valid].reshape(-1, *[1] * (sums.ndim - 1))
+    if isinstance(model, RandomForestRegressor) or name == 'symptom_prediction':
+        return float(np.mean((pred - y_fit[valid]) ** 2))
+    onehot = y_fit[valid][:, None] == model.classes_[None, :]
+    return float(np.mean(np.sum((pred - onehot) ** 2, axis=1)))
+
+
+def _grow_forest(name: str, model: Any, X_train: np.ndarray, y_fit: np.ndarray) -> List[float]:
+    """
+    RF'yi warm_start ile RF_GROWTH_STEP ağaçlık adımlarla n_estimators'a kadar büyüt; her adımdan sonra
+    tüm train satırlarında OOB kaybı ölçülür (holdout ve yeniden fit yok). Son adım kaybı RF_PLATEAU_TOL'den
+    az iyileştirdiyse o adımın ağaçları atılır ve büyüme durur. Adım başına OOB kayıplarını döndürür.
+    """
+    import warnings
+    
+    max_trees = model.n_estimators
+    model.set_params(warm_start=True, n_estimators=min(RF_GROWTH_STEP, max_trees))
+    sums = counts = None
+    losses = []
+    with warnings.catch_warnings():
+        # class_weight='balanced' + warm_start uyarısı: her adım aynı veriyle fit edilir
+        warnings.filterwarnings('ignore', message='class_weight presets', category=UserWarning)
+        while True:
+            grown = len(getattr(model, 'estimators_', []))
+            model.fit(X_train, y_fit)
+            if sums is None:
+                # regresyon: y şekli; sınıflandırma: sınıf başına olasılık; symptom: etiket başına P(1)
+                shape = y_fit.shape if isinstance(model, RandomForestRegressor) else (len(X_train), len(model.classes_))
+                sums, counts = np.zeros(shape), np.zeros(len(X_train))
+            _accumulate_oob(name, model, X_train, grown, sums, counts)
+            losses.append(_oob_loss(name, model, y_fit, sums, counts))
+            if len(losses) > 1 and losses[-2] - losses[-1] < RF_PLATEAU_TOL * losses[-2]:
+                kept = model.n_estimators - RF_GROWTH_STEP
+                del model.estimators_[kept:]
+                model.n_estimators = kept
+                break
+            if model.n_estimators >= max_trees:
+                break
+            model.set_params(n_estimators=min(model.n_estimators + RF_GROWTH_STEP, max_trees))
+    model.set_params(warm_start=False)
+    return losses
+
+
+def _fitted_estimators(model: Any) -> int:
+    """Fit sonrası ağaç sayısı (RF) / boosting iterasyonu (HGB); diğer modellerde None"""
+    if hasattr(model, 'n_iter_') and isinstance(model, HistGradientBoostingRegressor):
+        return int(model.n_iter_)
+    if hasattr(model, 'estimators_') and isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+        return len(model.estimators_)
+    return None
+
+
+def _fixed_size_params(model: Any) -> Dict[str, Any]:
+    """HGB early stopping'inin seçtiği iterasyonu sabitleyen parametreler (tüm train satırlarında yeniden fit için)"""
+    return {'max_iter': int(model.n_iter_), 'early_stopping': False}
+
+
+def _fit_task_model(name: str, X_train: np.ndarray, y_train: Dict[str, np.ndarray], n_threads: int,
+                    monitor: RssSampler, incremental: bool = False,
+                    feature_store: BinnedFeatureStore = None,
+                    model_params: Dict[str, Dict[str, Any]] = None,
+                    validation: Dict[str, Any] = None,
+                    grow_forests: bool = False) -> Tuple[Any, Dict[str, float]]:
+    """
+    Tek görev modelini verilen thread bütçesiyle tüm train satırlarında eğit; süre, fit süresince process
+    CPU süresi ve RSS peak'ini ölç (fit_process_*: eşzamanlı fit'lerle paylaşılan process geneli değer,
+    model başına değil).
+    feature_store verilirse HGB'ler X_train yerine store'un uint8 kodlarıyla eğitilir (binning tekrarlanmaz).
+    validation ({'X', 'y', 'X_binned'}: kullanıcı bazlı holdout) verilirse HGB bu holdout'ta early stopping yapar.
+    grow_forests=True ise RF'ler _grow_forest ile OOB kaybı platoya ulaşana kadar büyür.
+    """
+    y_fit = y_train[TASK_TARGETS[name]]
+    incremental = incremental and name in INCREMENTAL_TASKS
+    
+    rss_before = monitor.start(name)
+    start, cpu_start = time.perf_counter(), time.process_time()
+    with threadpool_limits(limits=n_threads):
+        if incremental:
+            model = _fit_incremental_model(name, X_train, y_fit)
+        else:
+            model = _make_task_model(name, n_threads, model_params)
+            max_estimators = model.get_params().get('max_iter', model.get_params().get('n_estimators'))
+            y_val = validation['y'][TASK_TARGETS[name]] if validation is not None else None
+            if isinstance(model, HistGradientBoostingRegressor):
+                fit_params = {}
+                if validation is not None:
+                    model.set_params(early_stopping=True)
+                    X_val = validation['X_binned'] if feature_store is not None else validation['X']
+                    fit_params = {'X_val': X_val, 'y_val': y_val}
+                if feature_store is not None:
+                    model.fit(feature_store.X_binned, y_fit, bin_mapper=feature_store.bin_mapper, **fit_params)
+                else:
+                    model.fit(X_train, y_fit, **fit_params)
+            elif grow_forests and isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+                _grow_forest(name, model, X_train, y_fit)
+            else:
+                model.fit(X_train, y_fit)
+    fit_seconds = time.perf_counter() - start
+    # process_time process geneli: RSS gibi eşzamanlı fit'lerin CPU'sunu da içerir
+    fit_process_cpu_seconds = time.process_time() - cpu_start
+    peak_rss = monitor.stop(name)
+    
+    return model, {
+        'learner': type(model[-1] if incremental else model).__name__,
+        'fit_rows': len(X_train),
+        'validation_rows': len(validation['X']) if validation is not None else 0,
+        'fitted_estimators': None if incremental else _fitted_estimators(model),
+        'max_estimators': None if incremental else max_estimators,
+        'fit_seconds': fit_seconds,
+        'fit_process_cpu_seconds': fit_process_cpu_seconds,
+        'fit_threads': n_threads,
+        'fit_process_peak_rss_mb': peak_rss,
+        'fit_process_rss_delta_mb': peak_rss - rss_before if peak_rss is not None else None
+    }
+
+
+def fit_task_models(X_train: np.ndarray, y_train: Dict[str, np.ndarray], thread_budget: int,
+                    names: List[str] = None, incremental: bool = False,
+                    feature_store: BinnedFeatureStore = None,
+                    model_params: Dict[str, Dict[str, Any]] = None,
+                    validation: Dict[str, Any] = None,
+                    grow_forests: bool = False) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """
+    Görev modellerini eşzamanlı eğit.
+    Aynı anda en fazla thread_budget model çalışır ve (eşzamanlı model × model thread'i) <= thread_budget;
+    artan thread'ler listede önce gelen (pahalı RF) modellere verilir.
+    incremental=True (out-of-core): INCREMENTAL_TASKS memmap X_train'den partial_fit ile eğitilir.
+    feature_store: X_train satırlarının BinnedFeatureStore'u (HGB'ler paylaşır).
+    model_params: görev bazında hiperparametreler (_make_task_model).
+    validation: HGB early stopping holdout'u, grow_forests: RF'lerin OOB ile büyütülmesi (_fit_task_model).
+    """
+    names = names or list(TASK_TARGETS)
+    concurrency = max(1, min(len(names), thread_budget))
+    base_threads, extra_threads = divmod(max(thread_budget, concurrency), concurrency)
+    threads = {name: base_threads + (1 if i < extra_threads else 0) for i, name in enumerate(names)}
+    
+    outputs = {}
+    monitor = RssSampler()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(_fit_task_model, name, X_train, y_train, threads[name], monitor, incremental,
+                            feature_store, model_params, validation, grow_forests): name
+            for name in names
+        }
+        for future in as_completed(futures):
+            outputs[futures[future]] = future.result()
     
-    # For now, use first fold (later: average over all folds for better reliability)
-    # TODO: Implement 5-fold cross-validation with mean/std reporting
-    train_idx, test_idx = next(gkf.split(X, groups=user_ids))
+    models = {name: outputs[name][0] for name in names}
+    fit_stats = {name: outputs[name][1] for name in names}
+    return models, fit_stats
+
+
+def _memmap_rows(X: np.ndarray, indices: np.ndarray, directory: str, name: str) -> np.ndarray:
+    """X[indices]'i OOC_CHUNK_ROWS'luk parçalarla diske yaz, salt okunur memmap döndür (bellekte kopya yok)"""
+    path = os.path.join(directory, f'{name}.npy')
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=X.dtype, shape=(len(indices),) + X.shape[1:])
+    for start in range(0, len(indices), OOC_CHUNK_ROWS):
+        out[start:start + OOC_CHUNK_ROWS] = X[indices[start:start + OOC_CHUNK_ROWS]]
+    out.flush()
+    del out
+    return np.load(path, mmap_mode='r')
+
+
+def _feature_importance(model: Any) -> List[float]:
+    """Ağaç modellerinin feature importance'ı; out-of-core MLP pipeline'larında None"""
+    importances = getattr(model, 'feature_importances_', None)
+    return importances.tolist() if importances is not None else None
+
+
+def _fit_fold_models(X: np.ndarray, y: Dict[str, np.ndarray], train_idx: np.ndarray,
+                     test_idx: np.ndarray, thread_budget: int = 1,
+                     regression_mode: str = 'separate',
+                     fold_dir: str = None,
+                     prebinned: bool = False,
+                     model_params: Dict[str, Dict[str, Any]] = None,
+                     groups: np.ndarray = None,
+                     stage_times: Dict[str, float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Bir CV fold'u için görev modellerini eğit ve fold'un test kısmında değerlendir.
+    fold_dir verilirse (out-of-core) X_train bellek yerine fold_dir'de memmap olarak tutulur.
+    prebinned=True ise fold'un train satırlarından bir BinnedFeatureStore kurulur (bin kenarları test
+    kullanıcılarını görmez) ve HGB'ler bu uint8 kodlarla eğitilir.
+    groups (satır başına user id) verilirse early stopping açıktır: RF'ler fold'un bütün train satırlarında
+    tek fit'te OOB kaybıyla büyütülür. HGB'ler için train kullanıcılarının EARLY_STOPPING_USER_FRACTION'ı
+    holdout'a ayrılır, iterasyon kalan kullanıcılarda seçilir ve HGB bu sabit boyutla bütün train
+    satırlarında yeniden eğitilir (holdout kaybolmaz; HGB fit'i RF'lere göre ucuzdur).
+    stage_times verilirse fold'un binning, fit ve değerlendirme wall/CPU süreleri içine yazılır.
+    """
+    from sklearn.metrics import (mean_absolute_error, balanced_accuracy_score, f1_score, hamming_loss,
+                                 average_precision_score)
+    
+    binning_start, binning_cpu_start = time.perf_counter(), time.process_time()
+    train_store = BinnedFeatureStore.build(X, train_idx) if prebinned else None
+    binning_seconds, binning_cpu_seconds = time.perf_counter() - binning_start, time.process_time() - binning_cpu_start
+    
+    names = task_model_names(regression_mode)
+    fit_start, fit_cpu_start = time.perf_counter(), time.process_time()
+    sizing_stats = {}
+    sized = [name for name in names if MODEL_FAMILIES[name] == 'hgb' and HistGradientBoostingRegressor is not None]
+    if groups is not None and sized:
+        # 1) HGB boyut seçimi: fit kullanıcılarında eğit, holdout kullanıcılarında early stopping
+        #    (RF'ler 2. adımda OOB ile büyür, partial_fit modelleri boyut seçmez)
+        fit_pos, val_pos = _validation_split(train_idx, groups)
+        fit_idx, val_idx = train_idx[fit_pos], train_idx[val_pos]
+        validation = {
+            'X': X[val_idx],
+            'y': {key: val[val_idx] for key, val in y.items()},
+            'X_binned': train_store.X_binned[val_pos] if train_store is not None else None
+        }
+        X_fit = X[fit_idx] if fold_dir is None else _memmap_rows(X, fit_idx, fold_dir, 'X_fit')
+        sizing_models, sizing_stats = fit_task_models(
+            X_fit, {key: val[fit_idx] for key, val in y.items()}, thread_budget, sized,
+            feature_store=train_store.subset(fit_pos) if train_store is not None else None,
+            model_params=model_params, validation=validation)
+        del X_fit, validation
+        
+        # 2) Seçilen iterasyon sabitlenir (early stopping kapalı); holdout kullanıcıları da eğitime döner
+        model_params = dict(model_params or {})
+        for name, model in sizing_models.items():
+            model_params[name] = {**model_params.get(name, {}), **_fixed_size_params(model)}
+        del sizing_models
     
-    X_train = X[train_idx]
+    X_train = X[train_idx] if fold_dir is None else _memmap_rows(X, train_idx, fold_dir, 'X_train')
     X_test = X[test_idx]
     
     y_train = {key: val[train_idx] for key, val in y.items()}
     y_test = {key: val[test_idx] for key, val in y.items()}
     
-    print(f"✓ Train size: {len(X_train):,} | Test size: {len(X_test):,}")
-    
-    # Scale features (for compatibility, but HGB/RF don't need it)
-    # Keeping scaler for potential future linear models
-    scaler = StandardScaler()
-    scaler.fit(X_train)  # Fit but don't transform for tree-based models
-    
     # For HGB and RF, use unscaled features (tree-based models are scale-invariant)
-    X_train_scaled = X_train  # No scaling needed
     X_test_scaled = X_test    # No scaling needed
     
-    models = {}
+    models, fit_stats = fit_task_models(X_train, y_train, thread_budget, names,
+                                        incremental=fold_dir is not None, feature_store=train_store,
+                                        model_params=model_params, grow_forests=groups is not None)
+    del train_store
+    for name, sizing in sizing_stats.items():
+        # Model başına süre/RSS iki fit'in toplamı/maksimumu; boyut seçimi ayrıca raporlanır
+        refit = fit_stats[name]
+        fit_stats[name] = dict(refit,
+                               validation_rows=sizing['validation_rows'],
+                               max_estimators=sizing['max_estimators'],
+                               sizing_fit_rows=sizing['fit_rows'],
+                               sizing_seconds=sizing['fit_seconds'],
+                               fit_seconds=sizing['fit_seconds'] + refit['fit_seconds'],
+                               fit_process_cpu_seconds=(sizing['fit_process_cpu_seconds']
+                                                        + refit['fit_process_cpu_seconds']),
+                               fit_process_peak_rss_mb=max_mb(sizing['fit_process_peak_rss_mb'],
+                                                               refit['fit_process_peak_rss_mb']),
+                               fit_process_rss_delta_mb=max_mb(sizing['fit_process_rss_delta_mb'],
+                                                                refit['fit_process_rss_delta_mb']))
+    eval_start, eval_cpu_start = time.perf_counter(), time.process_time()
     results = {}
     
-    # 1. Period Prediction (Regression) - Using GradientBoosting
-    print("\n=== Training Period Prediction (GradientBoosting) ===")
-    try:
-        from sklearn.ensemble import HistogramGradientBoostingRegressor
-        period_model = HistogramGradientBoostingRegressor(
-            max_iter=100,
-            max_depth=8,
-            learning_rate=0.1,
-            l2_regularization=0.1,
-            random_state=42
-        )
-    except ImportError:
-        # Fallback to GradientBoostingRegressor if HistogramGradientBoostingRegressor not available
-        from sklearn.ensemble import GradientBoostingRegressor
-        period_model = GradientBoostingRegressor(
-            n_estimators=100,
-            max_depth=8,
-            learning_rate=0.1,
-            random_state=42
-        )
-    period_model.fit(X_train_scaled, y_train['next_period'])
-    
+    # 1. Period Prediction (Regression) - Using HistGradientBoosting
+    period_model = models['period_prediction']
     period_pred = period_model.predict(X_test_scaled)
     period_mse = mean_squared_error(y_test['next_period'], period_pred)
-    
-    models['period_prediction'] = period_model
-    from sklearn.metrics import mean_absolute_error
     period_mae = mean_absolute_error(y_test['next_period'], period_pred)
     
     # Naive baseline: user_avg_cycle - day_in_cycle
@@ -495,31 +1261,12 @@ def train_models(X: np.ndarray, y: Dict[str, np.ndarray], user_ids: np.ndarray,
         # HGB doesn't have feature_importances_ - skip or use permutation_importance
     }
     
-    # 2. Ovulation Prediction (Regression) - Using GradientBoosting
-    print("\n=== Training Ovulation Prediction (GradientBoosting) ===")
-    try:
-        ovulation_model = HistogramGradientBoostingRegressor(
-            max_iter=100,
-            max_depth=8,
-            learning_rate=0.1,
-            l2_regularization=0.1,
-            random_state=42
-        )
-    except NameError:
-        # Fallback to GradientBoostingRegressor
-        from sklearn.ensemble import GradientBoostingRegressor
-        ovulation_model = GradientBoostingRegressor(
-            n_estimators=100,
-            max_depth=8,
-            learning_rate=0.1,
-            random_state=42
-        )
-    ovulation_model.fit(X_train_scaled, y_train['ovulation'])
-    
-    ovulation_pred = ovulation_model.predict(X_test_scaled)
+    # 2. Ovulation Prediction (Regression) - Using HistGradientBoosting (shared: period - 14)
+    if regression_mode == 'shared':
+        ovulation_pred = period_pred + DAY_OFFSET_TARGETS['ovulation']
+    else:
+        ovulation_pred = models['ovulation_prediction'].predict(X_test_scaled)
     ovulation_mse = mean_squared_error(y_test['ovulation'], ovulation_pred)
-    
-    models['ovulation_prediction'] = ovulation_model
     ovulation_mae = mean_absolute_error(y_test['ovulation'], ovulation_pred)
     
     # Within 2 days accuracy for ovulation
@@ -538,132 +1285,1080 @@ def train_models(X: np.ndarray, y: Dict[str, np.ndarray], user_ids: np.ndarray,
         'naive_mae': ovulation_naive_mae,
         'naive_within_2d': ovulation_naive_within_2d,
         'improvement_vs_naive': (ovulation_naive_mae - ovulation_mae) / ovulation_naive_mae * 100,
+        'source': 'period_prediction - 14 days' if regression_mode == 'shared' else 'ovulation_prediction',
         # HGB doesn't have feature_importances_
     }
     
-    # 3. Phase Classification
-    print("\n=== Training Phase Classification (RandomForest) ===")
-    phase_model = RandomForestClassifier(
-        n_estimators=50, 
-        max_depth=12,
-        max_samples=200000,
-        random_state=42
-    )
-    phase_model.fit(X_train_scaled, y_train['phase'])
+    # Fertile window (ovulation tahmininden -5 / +1 gün)
+    fertile_results = {}
+    for key in ['fertile_window_start', 'fertile_window_end']:
+        fertile_pred = ovulation_pred + DAY_OFFSET_TARGETS[key] - DAY_OFFSET_TARGETS['ovulation']
+        fertile_results[f'{key}_mae'] = mean_absolute_error(y_test[key], fertile_pred)
+        fertile_results[f'{key}_within_2d'] = np.mean(np.abs(fertile_pred - y_test[key]) <= 2.0)
+    results['fertile_window'] = fertile_results
     
+    # 3. Phase Classification
+    phase_model = models['phase_classification']
     phase_pred = phase_model.predict(X_test_scaled)
     phase_accuracy = accuracy_score(y_test['phase'], phase_pred)
     
     # Balanced accuracy
-    from sklearn.metrics import balanced_accuracy_score
     phase_balanced_acc = balanced_accuracy_score(y_test['phase'], phase_pred)
     
-    models['phase_classification'] = phase_model
     results['phase_classification'] = {
         'accuracy': phase_accuracy,
         'balanced_accuracy': phase_balanced_acc,
         'classification_report': str(classification_report(y_test['phase'], phase_pred)),  # String for JSON
-        'feature_importance': phase_model.feature_importances_.tolist()  # RF has feature_importances_
+        'feature_importance': _feature_importance(phase_model)  # RF has feature_importances_
     }
     
     # 4. Mood Classification
-    print("\n=== Training Mood Classification (RandomForest) ===")
-    # Alt örnekleme ile bellek sorunu çöz
-    subset_size = min(250000, len(X_train_scaled))
-    subset_indices = np.random.choice(len(X_train_scaled), subset_size, replace=False)
-    
-    mood_model = RandomForestClassifier(
-        n_estimators=50, 
-        max_depth=12,
-        max_samples=200000,
-        class_weight='balanced',  # Handle class imbalance
-        random_state=42
-    )
-    mood_model.fit(X_train_scaled[subset_indices], y_train['mood'][subset_indices])
-    
+    mood_model = models['mood_classification']
     mood_pred = mood_model.predict(X_test_scaled)
     mood_accuracy = accuracy_score(y_test['mood'], mood_pred)
     
     # Also calculate F1-macro for better evaluation
-    from sklearn.metrics import f1_score
     mood_f1 = f1_score(y_test['mood'], mood_pred, average='macro')
     
-    models['mood_classification'] = mood_model
     results['mood_classification'] = {
         'accuracy': mood_accuracy,
         'f1_macro': mood_f1,
         'classification_report': str(classification_report(y_test['mood'], mood_pred)),  # String for JSON
-        'feature_importance': mood_model.feature_importances_.tolist()  # RF has feature_importances_
+        'feature_importance': _feature_importance(mood_model)  # RF has feature_importances_
     }
     
-    # Save encoders
-    models['phase_encoder'] = phase_encoder
-    models['mood_encoder'] = mood_encoder
-    
-    # 5. Energy Level Prediction (Regression)
-    print("Training energy level prediction model...")
-    energy_model = RandomForestRegressor(
-        n_estimators=50, 
-        max_depth=12,
-        max_samples=200000,
-        random_state=42
-    )
-    energy_model.fit(X_train_scaled, y_train['energy_level'])
+    # 5. Next-day Symptom Prediction (multi-label)
+    symptom_model = models['symptom_prediction']
+    symptom_pred = symptom_model.predict(X_test_scaled)
+    symptom_proba = symptom_probabilities(symptom_model, X_test_scaled)
+    symptom_true = y_test['symptoms']
+    
+    # Etiket olasılıkları 0.3'ü geçmediği için eşiklenmiş F1 düşük kalır; olasılık metrikleri esas
+    results['symptom_prediction'] = {
+        'average_precision_micro': average_precision_score(symptom_true, symptom_proba, average='micro'),
+        'brier_score': float(np.mean((symptom_proba - symptom_true) ** 2)),
+        'f1_micro': f1_score(symptom_true, symptom_pred, average='micro', zero_division=0),
+        'f1_macro': f1_score(symptom_true, symptom_pred, average='macro', zero_division=0),
+        'hamming_loss': hamming_loss(symptom_true, symptom_pred),
+        'subset_accuracy': accuracy_score(symptom_true, symptom_pred),
+        'label_prevalence': symptom_true.mean(axis=0).tolist(),
+        'feature_importance': _feature_importance(symptom_model)
+    }
     
+    # 6. Energy Level Prediction (Regression)
+    energy_model = models['energy_prediction']
     energy_pred = energy_model.predict(X_test_scaled)
     energy_mse = mean_squared_error(y_test['energy_level'], energy_pred)
     
-    models['energy_prediction'] = energy_model
     results['energy_prediction'] = {
         'mse': energy_mse,
         'rmse': np.sqrt(energy_mse),
-        'feature_importance': energy_model.feature_importances_.tolist()  # RF has feature_importances_
+        'feature_importance': _feature_importance(energy_model)  # RF has feature_importances_
+    }
+    
+    for name, stats in fit_stats.items():
+        results[name].update(stats)
+    
+    if stage_times is not None:
+        stage_times.update({
+            'binning_seconds': binning_seconds,
+            'binning_cpu_seconds': binning_cpu_seconds,
+            'fit_seconds': eval_start - fit_start,
+            'fit_cpu_seconds': eval_cpu_start - fit_cpu_start,
+            'eval_seconds': time.perf_counter() - eval_start,
+            'eval_cpu_seconds': time.process_time() - eval_cpu_start
+        })
+    
+    return models, results
+
+
+def symptom_probabilities(model: Any, X: np.ndarray) -> np.ndarray:
+    """Multi-output RF'den (n, len(SYMPTOMS)) P(semptom=1) matrisi; tek sınıflı etiketler 0/1 sabit"""
+    label_probas = model.predict_proba(X)
+    if isinstance(label_probas, np.ndarray):
+        # Multi-label MLP (out-of-core): doğrudan (n, len(SYMPTOMS))
+        return label_probas.astype(np.float32)
+    proba = np.zeros((len(X), len(SYMPTOMS)), dtype=np.float32)
+    for j, (classes, label_proba) in enumerate(zip(model.classes_, label_probas)):
+        if 1 in classes:
+            proba[:, j] = label_proba[:, list(classes).index(1)]
+    return proba
+
+
+def _run_cv_fold(fold: int, X: np.ndarray, y: Dict[str, np.ndarray], train_idx: np.ndarray,
+                 test_idx: np.ndarray, keep_models: bool, thread_budget: int,
+                 regression_mode: str, out_of_core_dir: str = None,
+                 prebinned: bool = False,
+                 model_params: Dict[str, Dict[str, Any]] = None,
+                 groups: np.ndarray = None) -> Tuple[Any, Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """(worker) Fold'u eğit; modeller sadece keep_models ise geri gönderilir"""
+    start = time.perf_counter()
+    stage_times = {}
+    if out_of_core_dir is None:
+        models, results = _fit_fold_models(X, y, train_idx, test_idx, thread_budget, regression_mode,
+                                           prebinned=prebinned, model_params=model_params, groups=groups,
+                                           stage_times=stage_times)
+    else:
+        with tempfile.TemporaryDirectory(prefix=f'fold{fold + 1}_', dir=out_of_core_dir) as fold_dir:
+            models, results = _fit_fold_models(X, y, train_idx, test_idx, thread_budget, regression_mode, fold_dir,
+                                               prebinned, model_params, groups, stage_times)
+    timing = {
+        'fold': fold + 1,
+        'train_size': int(len(train_idx)),
+        'test_size': int(len(test_idx)),
+        'seconds': time.perf_counter() - start,
+        **stage_times,
+        'thread_budget': thread_budget,
+        'pid': os.getpid()
     }
+    return (models if keep_models else None), results, timing
+
+
+def _memmap_array(array: np.ndarray, directory: str, name: str) -> np.ndarray:
+    """Diziyi diske yaz ve salt okunur memmap olarak aç (worker'lara kopyalanmadan paylaşılır)"""
+    if isinstance(array, np.memmap) and array.mode == 'r':
+        # Out-of-core: dizi zaten diskte
+        return array
+    path = os.path.join(directory, f'{name}.joblib')
+    joblib.dump(np.ascontiguousarray(array), path)
+    return joblib.load(path, mmap_mode='r')
+
+
+def _aggregate_fold_results(fold_results: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Fold metriklerini görev bazında birleştir: sayısal metrikler mean + <metric>_std, diğerleri ilk fold'dan"""
+    aggregated = {}
+    for task, first in fold_results[0].items():
+        summary = {}
+        for key, value in first.items():
+            if isinstance(value, (float, int, np.number)) and not isinstance(value, bool):
+                values = [float(fold[task][key]) for fold in fold_results]
+                summary[key] = float(np.mean(values))
+                summary[f'{key}_std'] = float(np.std(values))
+            else:
+                summary[key] = value
+        aggregated[task] = summary
+    return aggregated
+
+
+def train_models(X: np.ndarray, y: Dict[str, np.ndarray], user_ids: np.ndarray, phase_encoder: Any, mood_encoder: Any,
+                 cv_jobs: int = -1, threads: int = None, regression_mode: str = 'separate',
+                 out_of_core_dir: str = None, model_params: Dict[str, Dict[str, Any]] = None,
+                 early_stopping: bool = True, stages: StageRecorder = None) -> Dict[str, Any]:
+    """
+    Train multiple models for different tasks
+    
+    CV_FOLDS kullanıcı bazlı fold'un hepsi eğitilip değerlendirilir (joblib/loky, cv_jobs process);
+    X ve hedefler memmap ile paylaşılır. Metrikler fold ortalaması (+ _std), export edilen modeller fold 1'in.
+    threads (varsayılan: tüm çekirdekler) eşzamanlı fold'lara bölünür; her fold kendi payıyla
+    görev modellerini fit_task_models ile eşzamanlı eğitir.
+    regression_mode='shared' ovulation/fertile window'u tek period modelinden sabit offset'lerle türetir.
+    Tüm modeller fold'un bütün train satırlarını görür (alt örnekleme / max_samples yok);
+    out_of_core_dir verilirse fold train matrisleri orada memmap tutulur ve INCREMENTAL_TASKS
+    partial_fit ile parça parça eğitilir.
+    Her fold kendi train satırlarından bir BinnedFeatureStore (uint8) kurar; fold'un HGB'leri onu paylaşır,
+    bin kenarları test kullanıcılarını görmez. Export edilen bin kenarları fold 1'inkilerdir.
+    model_params (örn. hyperparameter_search'ün task_params'ı) görev bazında varsayılan hiperparametreleri ezer.
+    early_stopping: her fold'da train kullanıcılarının bir kısmı holdout olur; HGB iterasyon sayısı ve
+    RF ağaç sayısı (max_iter / n_estimators üst sınır) bu holdout'taki kayba göre belirlenir, modeller
+    sonra bu boyutla fold'un tüm train satırlarında yeniden eğitilir.
+    stages verilirse split / cross_validation aşamaları ve fold ortalaması feature_store / model
+    fit / evaluate süreleri (loky worker'larında ölçülür) ona kaydedilir.
+    """
+    
+    if not SKLEARN_AVAILABLE:
+        raise ImportError("Scikit-learn is required for training")
+    stages = stages or StageRecorder()
+    
+    print("Training models...")
+    
+    # User-based split to prevent data leakage
+    from sklearn.model_selection import GroupKFold
+    from joblib import Parallel, delayed, effective_n_jobs
+    
+    with stages.stage('split'):
+        gkf = GroupKFold(n_splits=CV_FOLDS)
+        splits = list(gkf.split(X, groups=user_ids))
+        print(f"✓ {CV_FOLDS}-fold GroupKFold | Train size: {len(splits[0][0]):,} | "
+              f"Test size: {len(splits[0][1]):,} (fold 1)")
+        
+        # Scale features (for compatibility, but HGB/RF don't need it)
+        # Keeping scaler for potential future linear models
+        scaler = StandardScaler()
+        for start in range(0, len(splits[0][0]), OOC_CHUNK_ROWS):  # Fit but don't transform for tree-based models
+            scaler.partial_fit(X[splits[0][0][start:start + OOC_CHUNK_ROWS]])
+    
+    # Toplam thread bütçesi eşzamanlı çalışan fold'lar arasında paylaştırılır (oversubscription yok)
+    total_threads = threads or os.cpu_count() or 1
+    concurrent_folds = min(CV_FOLDS, effective_n_jobs(cv_jobs))
+    fold_threads = max(1, total_threads // concurrent_folds)
+    print(f"✓ Thread budget: {total_threads} total | {concurrent_folds} concurrent folds x {fold_threads} threads")
+    
+    # HGB feature store: binning model başına değil fold başına bir kez (fold'un train satırlarından)
+    prebinned = _prebinned_supported()
+    if not prebinned and HistGradientBoostingRegressor is not None:
+        print("⚠️  Pre-binned HGB hooks not supported by this scikit-learn version, using plain HistGradientBoosting")
+    
+    start = time.perf_counter()
+    with stages.stage('cross_validation'), tempfile.TemporaryDirectory(prefix='cyclemate_cv_') as mmap_dir:
+        X_shared = _memmap_array(X, mmap_dir, 'X')
+        y_shared = {key: _memmap_array(val, mmap_dir, f'y_{key}') for key, val in y.items()}
+        groups_shared = _memmap_array(user_ids, mmap_dir, 'user_ids') if early_stopping else None
+        
+        fold_outputs = Parallel(n_jobs=cv_jobs, backend='loky', max_nbytes=None)(
+            delayed(_run_cv_fold)(fold, X_shared, y_shared, train_idx, test_idx, fold == 0, fold_threads,
+                                  regression_mode, out_of_core_dir, prebinned, model_params, groups_shared)
+            for fold, (train_idx, test_idx) in enumerate(splits)
+        )
+        del X_shared, y_shared, groups_shared
+    cv_wall = time.perf_counter() - start
+    
+    fold_timings = [timing for _, _, timing in fold_outputs]
+    for timing in fold_timings:
+        print(f"  Fold {timing['fold']}/{CV_FOLDS}: {timing['seconds']:.1f}s "
+              f"(train {timing['train_size']:,} | test {timing['test_size']:,})")
+    print(f"✓ Cross-validation wall time: {cv_wall:.1f}s (cv_jobs={cv_jobs})")
+    
+    models = fold_outputs[0][0]
+    results = _aggregate_fold_results([fold_results for _, fold_results, _ in fold_outputs])
+    
+    # Export edilen HGB'lerin (fold 1) paylaştığı bin kenarları; X_binned worker'da kalır
+    feature_store, store_info = None, None
+    if prebinned:
+        feature_store = BinnedFeatureStore(models['period_prediction']._bin_mapper, None)
+        train_rows = len(splits[0][0])
+        store_info = {
+            'max_bins': HGB_MAX_BINS,
+            'bin_edges_from': 'fold train rows (fold 1 edges exported)',
+            'binning_seconds': float(np.mean([timing['binning_seconds'] for timing in fold_timings])),
+            'binned_mb': train_rows * X.shape[1] / (1024 * 1024),
+            'float32_mb': train_rows * X.shape[1] * 4 / (1024 * 1024)
+        }
+        print(f"✓ Feature store per fold: uint8 {store_info['binned_mb']:.0f} MB (float32 {store_info['float32_mb']:.0f} MB) "
+              f"of fold train rows, binned in {store_info['binning_seconds']:.1f}s (fold mean)")
+        stages.add('cross_validation/feature_store', wall_seconds=store_info['binning_seconds'],
+                   cpu_seconds=float(np.mean([timing['binning_cpu_seconds'] for timing in fold_timings])),
+                   source='fold mean (worker)')
+    
+    # Worker'larda ölçülen süreler (fold ortalaması). CPU ve peak RSS worker process'inindir ve eşzamanlı
+    # fit'ler arasında paylaşılır: model satırlarına değil, fit aşamasına yazılır
+    stages.add('cross_validation/fit',
+               wall_seconds=float(np.mean([timing['fit_seconds'] for timing in fold_timings])),
+               cpu_seconds=float(np.mean([timing['fit_cpu_seconds'] for timing in fold_timings])),
+               peak_rss_mb=max_mb(*(results[model_name]['fit_process_peak_rss_mb']
+                                     for model_name in task_model_names(regression_mode))),
+               source='fold mean (worker)')
+    for model_name in task_model_names(regression_mode):
+        stages.add(f'cross_validation/fit/{model_name}', wall_seconds=results[model_name]['fit_seconds'],
+                   threads=results[model_name]['fit_threads'], source='fold mean (worker)')
+    stages.add('cross_validation/evaluate',
+               wall_seconds=float(np.mean([timing['eval_seconds'] for timing in fold_timings])),
+               cpu_seconds=float(np.mean([timing['eval_cpu_seconds'] for timing in fold_timings])),
+               source='fold mean (worker)')
+    
+    # Export aşaması için fold 1 örnekleri (damıtma: train, bütçe/parity ölçümü: modelin görmediği test)
+    rng = np.random.default_rng(42)
+    train_sample, holdout_sample = (np.sort(rng.choice(idx, min(EXPORT_SAMPLE_ROWS, len(idx)), replace=False))
+                                    for idx in splits[0])
+    export_data = {
+        'X_train': np.asarray(X[train_sample]),
+        'X_holdout': np.asarray(X[holdout_sample]),
+        'y_holdout': {key: np.asarray(val[holdout_sample]) for key, val in y.items()}
+    }
+    
+    # Save encoders
+    models['phase_encoder'] = phase_encoder
+    models['mood_encoder'] = mood_encoder
     
     return {
         'models': models,
         'scaler': scaler,
         'results': results,
         'feature_names': get_feature_names(),
-        'total_samples': len(X)
+        'total_samples': len(X),
+        'regression_mode': regression_mode,
+        'out_of_core': out_of_core_dir is not None,
+        'model_params': model_params or {},
+        'early_stopping': {
+            'holdout_user_fraction': EARLY_STOPPING_USER_FRACTION,
+            'hgb': 'user holdout, refit on full train',
+            'rf': 'out-of-bag growth on full train (single fit)',
+            'rf_growth_step': RF_GROWTH_STEP,
+            'rf_plateau_tol': RF_PLATEAU_TOL
+        } if early_stopping else None,
+        'feature_store': feature_store,
+        'feature_store_info': store_info,
+        'export_data': export_data,
+        'cv': {
+            'folds': CV_FOLDS,
+            'jobs': cv_jobs,
+            'threads_per_fold': fold_threads,
+            'wall_seconds': cv_wall,
+            'fold_timings': fold_timings
+        }
     }
 
+
+def append_day_offsets_output(onnx_model: Any) -> None:
+    """
+    Period modeline (N, 4) 'day_offsets' çıktısı ekle: DAY_OFFSET_TARGETS sırasıyla
+    next_period, ovulation, fertile_window_start, fertile_window_end (tek inference çağrısı).
+    """
+    from onnx import TensorProto, helper, numpy_helper
+    
+    graph = onnx_model.graph
+    offsets = np.array([list(DAY_OFFSET_TARGETS.values())], dtype=np.float32)
+    graph.initializer.append(numpy_helper.from_array(offsets, name='day_offset_values'))
+    graph.node.append(helper.make_node(
+        'Add', [graph.output[0].name, 'day_offset_values'], ['day_offsets'], name='DayOffsets'
+    ))
+    graph.output.append(helper.make_tensor_value_info('day_offsets', TensorProto.FLOAT, [None, len(DAY_OFFSET_TARGETS)]))
+
+
+def hgb_to_onnx(model: Any, n_features: int) -> Any:
+    """
+    HistGradientBoostingRegressor'ı doğrudan TreeEnsembleRegressor olarak yaz. skl2onnx 1.20'nin HGB
+    dönüştürücüsü yaprak düğümlerde bool missing_value_tracks_true üretir ve onnx bunu reddeder.
+    _predictors düğümleri: x <= num_threshold sola, NaN missing_go_to_left yönüne; yaprak değerleri
+    learning rate uygulanmış halde toplanır (SUM) ve _baseline_prediction eklenir. Çıktı: variable (N, 1).
+    """
+    from onnx import TensorProto, helper, numpy_helper
+    
+    if model.n_trees_per_iteration_ != 1 or getattr(model, 'is_categorical_', None) is not None:
+        raise ValueError("hgb_to_onnx supports single-output regressors without categorical features")
+    
+    columns = {key: [] for key in ['treeids', 'nodeids', 'featureids', 'leaf', 'values', 'true', 'false',
+                                   'missing', 'weights']}
+    for tree_id, (predictor,) in enumerate(model._predictors):
+        nodes = predictor.nodes
+        leaf = nodes['is_leaf'].astype(bool)
+        # HGB x'i float64'e çevirip x <= eşik karşılaştırır; float32 x için eşiğin altındaki en büyük float32 eşdeğer
+        thresholds = nodes['num_threshold']
+        thresholds32 = thresholds.astype(np.float32)
+        thresholds32 = np.where(thresholds32 > thresholds, np.nextafter(thresholds32, np.float32(-np.inf)), thresholds32)
+        
+        columns['treeids'].append(np.full(len(nodes), tree_id))
+        columns['nodeids'].append(np.arange(len(nodes)))
+        columns['featureids'].append(np.where(leaf, 0, nodes['feature_idx']))
+        columns['leaf'].append(leaf)
+        columns['values'].append(np.where(leaf, 0, thresholds32))
+        columns['true'].append(np.where(leaf, 0, nodes['left']))
+        columns['false'].append(np.where(leaf, 0, nodes['right']))
+        columns['missing'].append(np.where(leaf, 0, nodes['missing_go_to_left']))
+        columns['weights'].append(nodes['value'])
+    columns = {key: np.concatenate(values) for key, values in columns.items()}
+    leaf = columns['leaf']
+    
+    node = helper.make_node(
+        'TreeEnsembleRegressor', ['float_input'], ['variable'], domain='ai.onnx.ml', name='TreeEnsembleRegressor',
+        n_targets=1,
+        aggregate_function='SUM',
+        base_values=[float(np.ravel(model._baseline_prediction)[0])],
+        nodes_treeids=columns['treeids'].tolist(),
+        nodes_nodeids=columns['nodeids'].tolist(),
+        nodes_featureids=columns['featureids'].tolist(),
+        nodes_modes=np.where(leaf, 'LEAF', 'BRANCH_LEQ').tolist(),
+        nodes_values_as_tensor=numpy_helper.from_array(columns['values'].astype(np.float32)),
+        nodes_truenodeids=columns['true'].tolist(),
+        nodes_falsenodeids=columns['false'].tolist(),
+        nodes_missing_value_tracks_true=columns['missing'].astype(int).tolist(),
+        target_treeids=columns['treeids'][leaf].tolist(),
+        target_nodeids=columns['nodeids'][leaf].tolist(),
+        target_ids=[0] * int(leaf.sum()),
+        target_weights_as_tensor=numpy_helper.from_array(columns['weights'][leaf].astype(np.float32)),
+        post_transform='NONE'
+    )
+    graph = helper.make_graph(
+        [node], 'hist_gradient_boosting',
+        [helper.make_tensor_value_info('float_input', TensorProto.FLOAT, [None, n_features])],
+        [helper.make_tensor_value_info('variable', TensorProto.FLOAT, [None, 1])]
+    )
+    onnx_model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 17),
+                                                         helper.make_opsetid('ai.onnx.ml', 3)])
+    onnx_model.ir_version = 8
+    return onnx_model
+
+
+def convert_task_model(model_name: str, model: Any, n_features: int) -> Any:
+    """
+    Görev modelini ONNX'e çevir (export_to_onnx ve --search maliyet ölçümü aynı dönüşümü kullanır).
+    HGB (pre-binned dahil) -> hgb_to_onnx; RF, GBR ve out-of-core MLP pipeline'ları -> skl2onnx.
+    Multi-output/multi-label: ZipMap tek boyutlu olasılık bekler, kapatılır.
+    """
+    from onnx import helper
+    
+    if HistGradientBoostingRegressor is not None and isinstance(model, HistGradientBoostingRegressor):
+        return hgb_to_onnx(model, n_features)
+    
+    initial_type = [('float_input', FloatTensorType([None, n_features]))]
+    estimator = model[-1] if isinstance(model, Pipeline) else model
+    multi_label = model_name == 'symptom_prediction'
+    options = {id(estimator): {'zipmap': False}} if multi_label else None
+    onnx_model = convert_sklearn(model, initial_types=initial_type, target_opset=17, options=options)
+    if multi_label and isinstance(estimator, MLPClassifier):
+        # skl2onnx multi-label MLP'nin etiket çıktısını (N,) bildirir; gerçek şekil (N, n_labels).
+        # Çok sınıflı MLP'de n_outputs_ sınıf sayısıdır ama etiket gerçekten (N,) döner
+        label = onnx_model.graph.output[0]
+        label.CopyFrom(helper.make_tensor_value_info(label.name, label.type.tensor_type.elem_type,
+                                                     [None, estimator.n_outputs_]))
+    return onnx_model
+
+
+def onnx_session(payload: bytes) -> Any:
+    """Cihazdaki gibi tek thread'li onnxruntime CPU oturumu"""
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(payload, options, providers=['CPUExecutionProvider'])
+
+
+def onnx_row_latency_us(session: Any, X_sample: np.ndarray) -> float:
+    """Tek satırlık inference gecikmesi: X_sample satırları üzerinden medyan (µs)"""
+    input_name = session.get_inputs()[0].name
+    rows = np.ascontiguousarray(X_sample, dtype=np.float32)
+    session.run(None, {input_name: rows[:1]})  # Warm-up
+    timings = []
+    for i in range(len(rows)):
+        start = time.perf_counter()
+        session.run(None, {input_name: rows[i:i + 1]})
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e6)
+
+
+# Export bütçesi: uygulamaya gömülen modeller için boyut / tek satır gecikmesi / doğruluk kaybı sınırı.
+# Bütçeli modellerde export_to_onnx aday ONNX varyantları üretir ve bütçeye uyan en küçüğünü yazar.
+EXPORT_BUDGETS = {
+    'phase_classification': {'max_kb': 1024, 'max_latency_us': 200, 'max_accuracy_drop': 0.005}
+}
+# Ship edilmeyen görev modelleri: eğitilir ve değerlendirilir ama export_to_onnx (ayrı/fused) yazmaz.
+# symptom RF'si varsayılan eşikte F1 ~0 veriyor ve tek başına diğer head'lerin toplamından büyük (~11 MB,
+# ~550 µs/satır); kullanılabilir bir karar eşiği (veya bütçe varyantı) olana kadar dışarıda kalır.
+UNSHIPPED_TASKS = ['symptom_prediction']
+EXPORT_SAMPLE_ROWS = 50000          # train_models'ın export aşaması için ayırdığı fold 1 train/test satırı
+EXPORT_TREE_COUNTS = [5, 10, 20]    # Budanmış orman adaylarındaki ağaç sayıları (+ tüm ağaçlar)
+EXPORT_TREE_DEPTHS = [None, 10, 8, 6]
+DISTILL_HIDDEN_LAYERS = (32,)
+
+
+class ExportBudgetError(RuntimeError):
+    """Hiçbir export varyantı modelin boyut/gecikme/doğruluk bütçesine sığmadı"""
+
+
+def forest_to_onnx(forest: Any, n_features: int, trees: List[int] = None, max_depth: int = None) -> Any:
+    """
+    RandomForestClassifier'ı doğrudan TreeEnsembleClassifier olarak yaz; tahminler skl2onnx çıktısıyla aynı,
+    dosya daha küçük: eşik ve sınıf ağırlıkları paketli float32 tensor, opsiyonel hitrates /
+    missing_value_tracks_true yok, yapraklarda sadece sıfır olmayan sınıf olasılıkları.
+    trees: tutulacak ağaçlar (budama), max_depth: ağaçları bu derinlikte kes (kesilen düğüm kendi
+    sınıf dağılımıyla yaprak olur). Çıktılar: output_label (int64), output_probability (N, n_classes).
+    """
+    from onnx import TensorProto, helper, numpy_helper
+    
+    trees = list(range(len(forest.estimators_))) if trees is None else list(trees)
+    columns = {key: [] for key in ['treeids', 'featureids', 'leaf', 'values', 'true', 'false',
+                                   'class_treeids', 'class_nodeids', 'class_ids', 'class_weights']}
+    for out_id, t in enumerate(trees):
+        tree = forest.estimators_[t].tree_
+        depth = np.zeros(tree.node_count, dtype=np.int32)
+        for node in range(tree.node_count):  # Preorder: ebeveyn çocuklarından önce gelir
+            if tree.children_left[node] != -1:
+                depth[tree.children_left[node]] = depth[tree.children_right[node]] = depth[node] + 1
+        nodes = np.flatnonzero(depth <= max_depth) if max_depth is not None else np.arange(tree.node_count)
+        new_id = np.full(tree.node_count + 1, -1)
+        new_id[nodes] = np.arange(len(nodes))
+        leaf = tree.children_left[nodes] == -1
+        if max_depth is not None:
+            leaf |= depth[nodes] == max_depth
+        
+        # sklearn x <= eşik (float64) karşılaştırır; x float32 olduğundan eşiğin altındaki en büyük float32 aynı sonucu verir
+        thresholds = tree.threshold[nodes]
+        thresholds32 = thresholds.astype(np.float32)
+        thresholds32 = np.where(thresholds32 > thresholds, np.nextafter(thresholds32, np.float32(-np.inf)), thresholds32)
+        
+        columns['treeids'].append(np.full(len(nodes), out_id))
+        columns['featureids'].append(np.where(leaf, 0, tree.feature[nodes]))
+        columns['leaf'].append(leaf)
+        columns['values'].append(np.where(leaf, 0, thresholds32))
+        columns['true'].append(np.where(leaf, 0, new_id[tree.children_left[nodes]]))
+        columns['false'].append(np.where(leaf, 0, new_id[tree.children_right[nodes]]))
+        
+        leaf_values = tree.value[nodes[leaf], 0]
+        proba = leaf_values / leaf_values.sum(axis=1, keepdims=True) / len(trees)  # Ağaç ortalaması
+        leaf_rows, class_ids = np.nonzero(proba)
+        columns['class_treeids'].append(np.full(len(leaf_rows), out_id))
+        columns['class_nodeids'].append(np.flatnonzero(leaf)[leaf_rows])
+        columns['class_ids'].append(class_ids)
+        columns['class_weights'].append(proba[leaf_rows, class_ids])
+    columns = {key: np.concatenate(values) for key, values in columns.items()}
+    node_ids = np.concatenate([np.arange(np.sum(columns['treeids'] == t)) for t in range(len(trees))])
+    
+    node = helper.make_node(
+        'TreeEnsembleClassifier', ['float_input'], ['output_label', 'output_probability'],
+        domain='ai.onnx.ml', name='TreeEnsembleClassifier',
+        classlabels_int64s=forest.classes_.astype(np.int64).tolist(),
+        class_treeids=columns['class_treeids'].tolist(),
+        class_nodeids=columns['class_nodeids'].tolist(),
+        class_ids=columns['class_ids'].tolist(),
+        class_weights_as_tensor=numpy_helper.from_array(columns['class_weights'].astype(np.float32)),
+        nodes_treeids=columns['treeids'].tolist(),
+        nodes_nodeids=node_ids.tolist(),
+        nodes_featureids=columns['featureids'].tolist(),
+        nodes_modes=np.where(columns['leaf'], 'LEAF', 'BRANCH_LEQ').tolist(),
+        nodes_values_as_tensor=numpy_helper.from_array(columns['values'].astype(np.float32)),
+        nodes_truenodeids=columns['true'].tolist(),
+        nodes_falsenodeids=columns['false'].tolist(),
+        post_transform='NONE'
+    )
+    graph = helper.make_graph(
+        [node], 'forest',
+        [helper.make_tensor_value_info('float_input', TensorProto.FLOAT, [None, n_features])],
+        [helper.make_tensor_value_info('output_label', TensorProto.INT64, [None]),
+         helper.make_tensor_value_info('output_probability', TensorProto.FLOAT, [None, len(forest.classes_)])]
+    )
+    onnx_model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 17),
+                                                         helper.make_opsetid('ai.onnx.ml', 3)])
+    onnx_model.ir_version = 8
+    return onnx_model
+
+
+if SKLEARN_AVAILABLE:
+    class PrunedForestClassifier(ClassifierMixin, BaseEstimator):
+        """
+        forest_to_onnx(forest, n_features, trees, max_depth) varyantının sklearn karşılığı: seçilen ağaçlar,
+        max_depth'te kesilmiş (kesilen düğüm kendi sınıf dağılımıyla yaprak), olasılık ağaç ortalaması.
+        Budanmış export'un parity'si öğretmen orman yerine bununla kontrol edilir.
+        """
+        
+        def __init__(self, forest: Any = None, trees: List[int] = None, max_depth: int = None):
+            self.forest = forest
+            self.trees = trees
+            self.max_depth = max_depth
+        
+        @property
+        def classes_(self) -> np.ndarray:
+            return self.forest.classes_
+        
+        def predict_proba(self, X: np.ndarray) -> np.ndarray:
+            X = np.asarray(X, dtype=np.float32)
+            rows = np.arange(len(X))
+            trees = list(range(len(self.forest.estimators_))) if self.trees is None else list(self.trees)
+            proba = np.zeros((len(X), len(self.classes_)))
+            for t in trees:
+                tree = self.forest.estimators_[t].tree_
+                node = np.zeros(len(X), dtype=np.intp)
+                for _ in range(tree.max_depth if self.max_depth is None else min(self.max_depth, tree.max_depth)):
+                    left = tree.children_left[node]
+                    go_left = X[rows, tree.feature[node]] <= tree.threshold[node]
+                    node = np.where(left == -1, node, np.where(go_left, left, tree.children_right[node]))
+                values = tree.value[node, 0]
+                proba += values / values.sum(axis=1, keepdims=True)
+            return proba / len(trees)
+        
+        def predict(self, X: np.ndarray) -> np.ndarray:
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _forest_order(forest: Any, X_select: np.ndarray, y_select: np.ndarray) -> List[int]:
+    """
+    Ordered aggregation: ağaçları, seçim kümesinde ortalama olasılığın Brier skorunu en çok düşürene göre
+    açgözlü sırala; ilk k ağaç en iyi k ağaçlık alt orman olur (katkısı düşük ağaçlar sona kalır).
+    """
+    probas = np.stack([tree.predict_proba(X_select) for tree in forest.estimators_])
+    onehot = y_select[:, None] == forest.classes_[None, :]
+    order, total = [], np.zeros(probas.shape[1:])
+    remaining = list(range(len(probas)))
+    while remaining:
+        scores = [np.mean(np.sum(((total + probas[t]) / (len(order) + 1) - onehot) ** 2, axis=1)) for t in remaining]
+        best = remaining.pop(int(np.argmin(scores)))
+        order.append(best)
+        total += probas[best]
+    return order
+
+
+def distill_mlp(teacher: Any, X_train: np.ndarray) -> Pipeline:
+    """Öğretmen modelin etiketleriyle küçük bir StandardScaler + MLP öğrenci eğit"""
+    student = Pipeline([
+        ('scaler', StandardScaler()),
+        ('mlp', MLPClassifier(hidden_layer_sizes=DISTILL_HIDDEN_LAYERS, early_stopping=True, random_state=42))
+    ])
+    return student.fit(X_train, teacher.predict(X_train))
+
+
+def float16_initializers(onnx_model: Any, min_size: int = 16) -> Any:
+    """
+    Büyük float32 initializer'ları (MLP ağırlıkları) float16 sakla, grafiğin başında Cast ile float32'ye aç.
+    Ağaç eşikleri için uygun değil: onnxruntime TreeEnsemble eşiklerinin giriş tipiyle aynı olmasını ister.
+    """
+    from onnx import TensorProto, helper, numpy_helper
+    
+    graph = onnx_model.graph
+    casts = []
+    for initializer in list(graph.initializer):
+        array = numpy_helper.to_array(initializer)
+        if initializer.data_type != TensorProto.FLOAT or array.size < min_size:
+            continue
+        half = numpy_helper.from_array(array.astype(np.float16), name=f'{initializer.name}_fp16')
+        graph.initializer.remove(initializer)
+        graph.initializer.append(half)
+        casts.append(helper.make_node('Cast', [half.name], [initializer.name], to=TensorProto.FLOAT,
+                                      name=f'{initializer.name}_cast'))
+    for i, cast in enumerate(casts):
+        graph.node.insert(i, cast)
+    return onnx_model
+
+
+def _evaluate_export_variant(onnx_model: Any, estimator: Any, X_eval: np.ndarray, y_eval: np.ndarray,
+                             reference: np.ndarray) -> Dict[str, float]:
+    """
+    ONNX varyantını onnxruntime'da çalıştır: boyut, tek satır gecikmesi, accuracy / balanced accuracy,
+    öğretmen (reference) etiketleriyle uyum ve varyantın kendi sklearn karşılığıyla (estimator) parity uyumu.
+    """
+    from sklearn.metrics import balanced_accuracy_score
+    
+    payload = onnx_model.SerializeToString()
+    session = onnx_session(payload)
+    labels = session.run([session.get_outputs()[0].name], {session.get_inputs()[0].name: X_eval})[0].reshape(-1)
+    return {
+        'onnx_kb': len(payload) / 1024,
+        'latency_us_per_row': onnx_row_latency_us(session, X_eval[:SEARCH_LATENCY_ROWS]),
+        'accuracy': float(np.mean(labels == y_eval)),
+        'balanced_accuracy': float(balanced_accuracy_score(y_eval, labels)),
+        'agreement': float(np.mean(labels == reference)),
+        'parity_agreement': float(np.mean(labels == estimator.predict(X_eval)))
+    }
+
+
+def apply_export_budget(model_name: str, model: Any, n_features: int, export_data: Dict[str, Any],
+                        budget: Dict[str, float]) -> Tuple[Any, Dict[str, Any], Any]:
+    """
+    Sınıflandırıcıyı bütçeye göre export et. Adaylar (her biri kendi sklearn karşılığıyla):
+    - skl2onnx: mevcut dönüşüm (referans accuracy), model
+    - forest-<k>t[-d<D>]: forest_to_onnx ile ordered aggregation sırasının ilk k ağacı, D derinlikte kesilmiş;
+      PrunedForestClassifier
+    - mlp-distilled[-fp16]: ormandan damıtılmış MLP (fp16: ağırlıklar float16); öğrenci Pipeline
+    export_data'nın holdout satırlarının ilk yarısı ağaç sıralaması, ikinci yarısı değerlendirme içindir.
+    Bütçe kapısı: boyut ve gecikme sınırına uyan, accuracy'si referanstan en fazla max_accuracy_drop düşük
+    ve kendi sklearn karşılığıyla parity uyumu EXPORT_PARITY_MIN_AGREEMENT'a ulaşan en küçük aday seçilir;
+    hiçbiri uymazsa ExportBudgetError. (ONNX, rapor, seçilen varyantın sklearn karşılığı) döndürür;
+    export_to_onnx parity'yi bu karşılıkla kontrol eder.
+    """
+    import copy
+    
+    target = TASK_TARGETS[model_name]
+    X_holdout = np.ascontiguousarray(export_data['X_holdout'], dtype=np.float32)
+    y_holdout = np.asarray(export_data['y_holdout'][target])
+    half = len(X_holdout) // 2
+    X_eval, y_eval = X_holdout[half:], y_holdout[half:]
+    
+    # varyant adı -> (ONNX, ONNX'in yeniden üretmesi gereken sklearn tahmincisi)
+    variants = {'skl2onnx': (convert_task_model(model_name, model, n_features), model)}
+    if isinstance(model, RandomForestClassifier):
+        order = _forest_order(model, X_holdout[:half], y_holdout[:half])
+        full_depth = max(tree.tree_.max_depth for tree in model.estimators_)
+        for k in sorted({k for k in EXPORT_TREE_COUNTS if k < len(order)} | {len(order)}):
+            for depth in EXPORT_TREE_DEPTHS:
+                if depth is None or depth < full_depth:
+                    name = f'forest-{k}t' + (f'-d{depth}' if depth is not None else '')
+                    variants[name] = (forest_to_onnx(model, n_features, order[:k], depth),
+                                      PrunedForestClassifier(model, order[:k], depth))
+        student = distill_mlp(model, np.asarray(export_data['X_train'], dtype=np.float32))
+        student_onnx = convert_sklearn(
+            student, initial_types=[('float_input', FloatTensorType([None, n_features]))], target_opset=17,
+            options={id(student[-1]): {'zipmap': False}})
+        variants['mlp-distilled'] = (student_onnx, student)
+        variants['mlp-distilled-fp16'] = (float16_initializers(copy.deepcopy(student_onnx)), student)
+    elif isinstance(model, Pipeline):
+        variants['skl2onnx-fp16'] = (float16_initializers(copy.deepcopy(variants['skl2onnx'][0])), model)
+    
+    reference = model.predict(X_eval)
+    rows = [dict(variant=name, **_evaluate_export_variant(onnx_model, estimator, X_eval, y_eval, reference))
+            for name, (onnx_model, estimator) in variants.items()]
+    baseline = rows[0]['accuracy']
+    for row in rows:
+        row['within_budget'] = bool(row['onnx_kb'] <= budget['max_kb']
+                                    and row['latency_us_per_row'] <= budget['max_latency_us']
+                                    and row['accuracy'] >= baseline - budget['max_accuracy_drop']
+                                    and row['parity_agreement'] >= EXPORT_PARITY_MIN_AGREEMENT)
+    
+    print(f"   {model_name} export budget: <= {budget['max_kb']:.0f} KB, <= {budget['max_latency_us']:.0f} us/row, "
+          f"accuracy drop <= {budget['max_accuracy_drop']:.3f} ({len(X_eval):,} holdout rows)")
+    print(f"   {'variant':22s} {'KB':>8s} {'us/row':>8s} {'accuracy':>9s} {'agreement':>10s} {'parity':>8s}")
+    for row in rows:
+        print(f"   {row['variant']:22s} {row['onnx_kb']:8.0f} {row['latency_us_per_row']:8.1f} {row['accuracy']:9.4f} "
+              f"{row['agreement']:10.4f} {row['parity_agreement']:8.4f} {'✓' if row['within_budget'] else ''}")
+    
+    feasible = [row for row in rows if row['within_budget']]
+    if not feasible:
+        raise ExportBudgetError(f"No {model_name} export variant fits the budget {budget}")
+    chosen = min(feasible, key=lambda row: row['onnx_kb'])
+    print(f"   -> {chosen['variant']} ({chosen['onnx_kb']:.0f} KB, accuracy {chosen['accuracy']:.4f} vs {baseline:.4f}, "
+          f"balanced accuracy {chosen['balanced_accuracy']:.4f} vs {rows[0]['balanced_accuracy']:.4f})")
+    
+    onnx_model, estimator = variants[chosen['variant']]
+    return onnx_model, {
+        'budget': budget,
+        'chosen': chosen['variant'],
+        'baseline_accuracy': baseline,
+        'eval_rows': len(X_eval),
+        'variants': rows,
+        # Yazılan modelin holdout metrikleri (CV metrikleri öğretmen modele aittir)
+        'shipped': {
+            'variant': chosen['variant'],
+            'learner': type(estimator[-1] if isinstance(estimator, Pipeline) else estimator).__name__,
+            'holdout_rows': len(X_eval),
+            'accuracy': chosen['accuracy'],
+            'balanced_accuracy': chosen['balanced_accuracy'],
+            'teacher_accuracy': baseline,
+            'teacher_balanced_accuracy': rows[0]['balanced_accuracy']
+        }
+    }, estimator
+
+
+EXPORT_PARITY_ROWS = 2000            # Parity kontrolünün çalıştığı holdout satırı
+EXPORT_PARITY_ATOL = 1e-3            # Regresyon: onnxruntime ile sklearn arasındaki en büyük mutlak fark
+EXPORT_PARITY_MIN_AGREEMENT = 0.999  # Sınıflandırma: yazılan ONNX ile sklearn karşılığının etiket uyumu
+
+
+class OnnxExportError(RuntimeError):
+    """Bir veya daha fazla model ONNX'e çevrilemedi ya da parity kontrolünden geçmedi"""
+
+
+def check_onnx_parity(model: Any, payload: Any, X_batch: np.ndarray,
+                      min_agreement: float = EXPORT_PARITY_MIN_AGREEMENT, output_name: str = None) -> Dict[str, Any]:
+    """
+    Yazılacak ONNX'i onnxruntime'da çalıştır ve çıktısını (varsayılan: ilk çıktı) sklearn predict ile
+    karşılaştır. payload serileştirilmiş model ya da açık bir onnxruntime oturumu olabilir.
+    """
+    from sklearn.base import is_classifier
+    
+    session = onnx_session(payload) if isinstance(payload, bytes) else payload
+    output_name = output_name or session.get_outputs()[0].name
+    output = session.run([output_name], {session.get_inputs()[0].name: X_batch})[0]
+    expected = model.predict(X_batch)
+    output = output.reshape(expected.shape)
+    if is_classifier(model):
+        agreement = float(np.mean(output == expected))
+        return {'rows': len(X_batch), 'label_agreement': agreement, 'min_agreement': min_agreement,
+                'passed': agreement >= min_agreement}
+    max_diff = float(np.max(np.abs(output - expected)))
+    return {'rows': len(X_batch), 'max_abs_diff': max_diff, 'atol': EXPORT_PARITY_ATOL,
+            'passed': max_diff <= EXPORT_PARITY_ATOL}
+
+
+def check_output_shapes(onnx_model: Any, session: Any, X_batch: np.ndarray) -> None:
+    """
+    Tüm tensor çıktıların graph'ta bildirilen şeklini (rank ve sabit boyutlar) onnxruntime'ın döndürdüğü
+    şekille karşılaştır; uyuşmazlıkta OnnxExportError. onnxruntime get_outputs()'ta kendi çıkardığı şekli
+    gösterir, bu yüzden bildirilen şekil model dosyasından okunur (uygulama buffer'ları ona göre ayırır).
+    """
+    declared = {out.name: [dim.dim_value if dim.HasField('dim_value') else None
+                           for dim in out.type.tensor_type.shape.dim]
+                for out in onnx_model.graph.output if out.type.HasField('tensor_type')}
+    values = session.run(list(declared), {session.get_inputs()[0].name: X_batch})
+    mismatches = [f"{name}: declared {shape}, got {list(value.shape)}"
+                  for (name, shape), value in zip(declared.items(), values)
+                  if len(shape) != value.ndim
+                  or any(dim is not None and dim != actual for dim, actual in zip(shape, value.shape))]
+    if mismatches:
+        raise OnnxExportError(f"declared ONNX output shapes do not match runtime: {mismatches}")
+
+
+# Fused export: tüm görev head'leri tek graph'ta (tek input, tek session, tek run()).
+# İlk çıktı head adını alır, sınıflandırıcı olasılıkları '<head>_probabilities', diğer çıktılar (day_offsets) adını korur.
+# Encoder'lı sınıflandırıcılarda sınıf indeksi '<head>_id', LabelEncoder ile string etiket '<head>' olur.
+EXPORT_MODES = ['separate', 'fused', 'both']
+FUSED_MODEL_FILE = 'cycle_models.onnx'
+FUSED_HEADS = {
+    'phase_classification': 'phase',
+    'mood_classification': 'mood',
+    'symptom_prediction': 'symptoms',
+    'energy_prediction': 'energy',
+    'period_prediction': 'period_days',
+    'ovulation_prediction': 'ovulation_days',
+}
+FUSED_ENCODERS = {'phase_classification': 'phase_encoder', 'mood_classification': 'mood_encoder'}
+FUSED_LATENCY_ROWS = 200            # Tek satır gecikmesi için ölçülen satır
+FUSED_LOAD_REPEATS = 5              # Session oluşturma süresi: medyan
+
+
+def fused_output_name(task: str) -> str:
+    """Görev modelinin ilk çıktısının fused graph'taki adı (parity bu çıktıyla kontrol edilir)"""
+    head = FUSED_HEADS[task]
+    return f'{head}_id' if task in FUSED_ENCODERS else head
+
+
+def fuse_onnx_models(task_models: Dict[str, Any], labels: Dict[str, Tuple[np.ndarray, np.ndarray]] = None) -> Any:
+    """
+    Görev başına ONNX modellerini tek graph'ta birleştir. Her graph '<görev>/' önekiyle eklenir, input'ları
+    tek 'float_input'a bağlanır. ZipMap düğümleri atılır (olasılıklar (N, C) tensor kalır).
+    labels[görev] = (sınıf id'leri, string etiketler): ai.onnx.ml LabelEncoder ile '<head>' string çıktısı.
+    """
+    import copy
+    from onnx import TensorProto, compose, helper
+    
+    labels = labels or {}
+    nodes, initializers, value_infos, outputs = [], [], [], []
+    opsets, ir_version, graph_input = {}, 0, None
+    for task, onnx_model in task_models.items():
+        graph = compose.add_prefix_graph(onnx_model.graph, f'{task}/')
+        graph_input = graph_input or onnx_model.graph.input[0]
+        for opset in onnx_model.opset_import:
+            opsets[opset.domain] = max(opsets.get(opset.domain, 0), opset.version)
+        ir_version = max(ir_version, onnx_model.ir_version)
+        
+        # ZipMap çıktısı -> ZipMap girdisi (olasılık tensor'ü)
+        zipmaps = {node.output[0]: node for node in graph.node if node.op_type == 'ZipMap'}
+        name_map = {graph.input[0].name: graph_input.name}
+        head = FUSED_HEADS[task]
+        classifier = bool(zipmaps) or task in FUSED_ENCODERS or task == 'symptom_prediction'
+        for i, output in enumerate(graph.output):
+            source = zipmaps[output.name].input[0] if output.name in zipmaps else output.name
+            if i == 0:
+                name = fused_output_name(task)
+            elif i == 1 and classifier:
+                # Yalnızca sınıflandırıcı olasılıkları; regresyon head'lerinin ek çıktıları (day_offsets) adını korur
+                name = f'{head}_probabilities'
+            else:
+                name = output.name.split('/', 1)[1]
+            name_map[source] = name
+            if output.name in zipmaps:
+                n_classes = len(helper.get_attribute_value(
+                    next(attr for attr in zipmaps[output.name].attribute if attr.name.startswith('classlabels'))))
+                outputs.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, [None, n_classes]))
+            else:
+                renamed = copy.deepcopy(output)
+                renamed.name = name
+                outputs.append(renamed)
+        
+        for node in graph.node:
+            if node.op_type == 'ZipMap':
+                continue
+            node.input[:] = [name_map.get(name, name) for name in node.input]
+            node.output[:] = [name_map.get(name, name) for name in node.output]
+            nodes.append(node)
+        initializers.extend(graph.initializer)
+        value_infos.extend(info for info in graph.value_info if info.name not in name_map)
+        
+        if task in labels:
+            class_ids, class_names = labels[task]
+            nodes.append(helper.make_node(
+                'LabelEncoder', [fused_output_name(task)], [head], domain='ai.onnx.ml', name=f'{task}/LabelEncoder',
+                keys_int64s=[int(class_id) for class_id in class_ids],
+                values_strings=[str(class_name) for class_name in class_names],
+                default_string='unknown'
+            ))
+            outputs.append(helper.make_tensor_value_info(head, TensorProto.STRING, [None]))
+    
+    # LabelEncoder keys_int64s / values_strings ai.onnx.ml opset 2 ister
+    if labels:
+        opsets['ai.onnx.ml'] = max(opsets.get('ai.onnx.ml', 0), 2)
+    graph = helper.make_graph(nodes, 'cycle_models', [graph_input], outputs, initializer=initializers,
+                              value_info=value_infos)
+    fused = helper.make_model(graph, opset_imports=[helper.make_opsetid(domain, version)
+                                                    for domain, version in opsets.items()])
+    fused.ir_version = ir_version
+    return fused
+
+
+def compare_fused_latency(payloads: Dict[str, bytes], fused_payload: bytes, X_sample: np.ndarray) -> Dict[str, Any]:
+    """
+    Ayrı oturumlar vs fused tek oturum: session oluşturma süresi (medyan, tüm modeller toplamı) ve
+    tek satır inference'ı (her satırda ayrı oturumların hepsi sırayla / fused tek run(), medyan).
+    """
+    def load_ms(items: List[bytes]) -> float:
+        timings = []
+        for _ in range(FUSED_LOAD_REPEATS):
+            start = time.perf_counter()
+            for payload in items:
+                onnx_session(payload)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1e3)
+    
+    def row_latency_us(sessions: List[Any]) -> float:
+        rows = np.ascontiguousarray(X_sample[:FUSED_LATENCY_ROWS], dtype=np.float32)
+        feeds = [session.get_inputs()[0].name for session in sessions]
+        for session, input_name in zip(sessions, feeds):
+            session.run(None, {input_name: rows[:1]})  # Warm-up
+        timings = []
+        for i in range(len(rows)):
+            start = time.perf_counter()
+            for session, input_name in zip(sessions, feeds):
+                session.run(None, {input_name: rows[i:i + 1]})
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1e6)
+    
+    separate = list(payloads.values())
+    report = {
+        'models': list(payloads),
+        'separate': {'sessions': len(separate), 'kb': sum(len(payload) for payload in separate) / 1024,
+                     'load_ms': load_ms(separate),
+                     'latency_us_per_row': row_latency_us([onnx_session(payload) for payload in separate])},
+        'fused': {'sessions': 1, 'kb': len(fused_payload) / 1024, 'load_ms': load_ms([fused_payload]),
+                  'latency_us_per_row': row_latency_us([onnx_session(fused_payload)])},
+    }
+    print(f"   {'export':10s} {'sessions':>8s} {'size':>10s} {'load':>10s} {'µs/row':>9s}")
+    for mode in ['separate', 'fused']:
+        row = report[mode]
+        print(f"   {mode:10s} {row['sessions']:8d} {row['kb']:7.0f} KB {row['load_ms']:7.1f} ms "
+              f"{row['latency_us_per_row']:9.1f}")
+    return report
+
+
+def _export_fused(models: Dict[str, Any], exported: Dict[str, Any], estimators: Dict[str, Any],
+                  X_parity: np.ndarray, output_dir: str) -> Dict[str, Any]:
+    """
+    export_to_onnx'in çevirdiği görev modellerini birleştir, head başına parity kontrol et ve yaz.
+    estimators: her head'in yeniden ürettiği sklearn tahmincisi (bütçe varyantı seçildiyse onun karşılığı);
+    parity ayrı export'taki gibi EXPORT_PARITY_MIN_AGREEMENT / EXPORT_PARITY_ATOL eşiğindedir.
+    """
+    labels = {}
+    for task, encoder_name in FUSED_ENCODERS.items():
+        if task in exported and encoder_name in models['models']:
+            class_ids = estimators[task].classes_
+            labels[task] = (class_ids, models['models'][encoder_name].inverse_transform(class_ids))
+    fused = fuse_onnx_models(exported, labels)
+    onnx.checker.check_model(fused)
+    payload = fused.SerializeToString()
+    
+    parity = {}
+    if X_parity is not None:
+        session = onnx_session(payload)
+        check_output_shapes(fused, session, X_parity)
+        for task in exported:
+            parity[task] = check_onnx_parity(estimators[task], session, X_parity,
+                                             output_name=fused_output_name(task))
+            if not parity[task]['passed']:
+                raise OnnxExportError(f"fused parity check failed for {task}: {parity[task]}")
+        for task, (class_ids, class_names) in labels.items():
+            ids, names = session.run([fused_output_name(task), FUSED_HEADS[task]],
+                                     {session.get_inputs()[0].name: X_parity})
+            expected = class_names[np.searchsorted(class_ids, ids)]
+            if not np.array_equal(names, expected):
+                raise OnnxExportError(f"fused label output '{FUSED_HEADS[task]}' does not match the encoder")
+    
+    fused_path = os.path.join(output_dir, FUSED_MODEL_FILE)
+    with open(fused_path, 'wb') as f:
+        f.write(payload)
+    print(f"✅ Exported fused graph to {fused_path} ({len(payload) / 1024:.0f} KB, {len(exported)} heads, "
+          f"outputs {[output.name for output in fused.graph.output]})")
+    report = {'path': fused_path, 'outputs': [output.name for output in fused.graph.output], 'parity': parity}
+    if X_parity is not None:
+        report['latency'] = compare_fused_latency({task: onnx_model.SerializeToString()
+                                                   for task, onnx_model in exported.items()}, payload, X_parity)
+    return report
+
+
+def shipped_task_names(regression_mode: str = 'separate') -> List[str]:
+    """Export edilen görev modelleri: task_model_names'ten UNSHIPPED_TASKS çıkarılmış"""
+    return [name for name in task_model_names(regression_mode) if name not in UNSHIPPED_TASKS]
+
+
 def export_to_onnx(models: Dict[str, Any], scaler: StandardScaler, 
-                   feature_names: List[str], output_dir: str = 'models'):
-    """Export trained models to ONNX format"""
+                   feature_names: List[str], output_dir: str = 'models',
+                   budgets: Dict[str, Dict[str, float]] = None, export_mode: str = 'separate',
+                   stages: StageRecorder = None, tasks: List[str] = None):
+    """
+    Export trained models to ONNX format
+    
+    Her görev modeli kendi dönüştürücüsüyle (convert_task_model; budgets'takiler apply_export_budget ile)
+    çevrilir, onnx.checker'dan geçer ve yazılmadan önce export_data holdout'unda onnxruntime çıktısı yazılan
+    varyantın sklearn karşılığının (bütçe seçtiyse budanmış orman / öğrenci MLP) tahminleriyle
+    EXPORT_PARITY_MIN_AGREEMENT eşiğinde karşılaştırılır (check_onnx_parity). joblib fallback yok: dönüşüm ya da parity başarısız
+    olan modeller toplanır ve sonunda OnnxExportError yükselir; bütçe tutmazsa ExportBudgetError.
+    Raporlar models['export_report'] (bütçe) ve models['export_parity']'ye yazılır.
+    export_mode 'fused'/'both': görev modelleri ayrıca tek graph'ta birleştirilir (FUSED_MODEL_FILE; head
+    başına parity, ayrı vs fused yükleme/gecikme raporu models['fused_export']). 'fused' ayrı dosya yazmaz.
+    stages verilirse model başına dönüşüm (+ bütçe varyantları) ve fused graph aşama olarak kaydedilir.
+    tasks: export edilen görevler (varsayılan shipped_task_names; UNSHIPPED_TASKS ayrı ve fused export'a girmez).
+    """
+    budgets = EXPORT_BUDGETS if budgets is None else budgets
+    tasks = shipped_task_names(models['regression_mode']) if tasks is None else tasks
+    stages = stages or StageRecorder()
+    if export_mode not in EXPORT_MODES:
+        raise ValueError(f"Unknown export mode '{export_mode}', expected one of {EXPORT_MODES}")
     
     if not ONNX_AVAILABLE:
-        print("⚠️  ONNX not available, skipping export")
-        return
+        raise ImportError("onnx, onnxruntime and skl2onnx are required for export")
     
     os.makedirs(output_dir, exist_ok=True)
     
-    print("\n5. Exporting models to ONNX...")
-    print("⚠️  Note: HGB models may fail ONNX conversion - joblib fallback will be used")
-    
-    # Export each model
-    for model_name, model in models['models'].items():
+    # Define input type
+    initial_type = [('float_input', FloatTensorType([None, len(feature_names)]))]
+    X_parity = None
+    if models.get('export_data') is not None:
+        X_parity = np.ascontiguousarray(models['export_data']['X_holdout'][-EXPORT_PARITY_ROWS:], dtype=np.float32)
+    else:
+        print("⚠️  No export_data holdout: parity checks skipped")
+    
+    # Export each task model
+    models['export_report'], models['export_parity'], models['fused_export'] = {}, {}, None
+    failures, exported, estimators = {}, {}, {}
+    skipped = [name for name in task_model_names(models['regression_mode']) if name not in tasks]
+    if skipped:
+        print(f"ℹ️  Not exported (not shipped): {', '.join(skipped)}")
+    for model_name in tasks:
+        model = models['models'][model_name]
+        with stages.stage(model_name):
+            try:
+                # Convert to ONNX (bütçe seçtiyse parity, öğretmen yerine yazılan varyantın karşılığıyla)
+                if model_name in budgets and models.get('export_data') is not None:
+                    with stages.stage('budget'):
+                        onnx_model, report, model = apply_export_budget(model_name, model, len(feature_names),
+                                                                        models['export_data'], budgets[model_name])
+                    models['export_report'][model_name] = report
+                else:
+                    onnx_model = convert_task_model(model_name, model, len(feature_names))
+                if model_name == 'period_prediction' and models.get('regression_mode') == 'shared':
+                    append_day_offsets_output(onnx_model)
+                onnx.checker.check_model(onnx_model)
+                payload = onnx_model.SerializeToString()
+                
+                # Parity: onnxruntime vs sklearn (holdout)
+                parity = None
+                if X_parity is not None:
+                    session = onnx_session(payload)
+                    check_output_shapes(onnx_model, session, X_parity)
+                    parity = check_onnx_parity(model, session, X_parity)
+                    models['export_parity'][model_name] = parity
+                    if not parity['passed']:
+                        raise OnnxExportError(f"parity check failed: {parity}")
+                
+                exported[model_name], estimators[model_name] = onnx_model, model
+                if export_mode == 'fused':
+                    continue
+                
+                # Save model
+                model_path = os.path.join(output_dir, f'{model_name}.onnx')
+                with open(model_path, 'wb') as f:
+                    f.write(payload)
+                
+                if parity is None:
+                    check = "parity not checked"
+                elif 'label_agreement' in parity:
+                    check = f"label agreement {parity['label_agreement']:.4f}"
+                else:
+                    check = f"max |diff| {parity['max_abs_diff']:.2e}"
+                print(f"✅ Exported {model_name} to {model_path} ({len(payload) / 1024:.0f} KB, {check})")
+                
+            except ExportBudgetError:
+                raise
+            except Exception as e:
+                # Dönüştürücü hataları tüm node attribute dizilerini içerebilir; ilk satır yeterli
+                failures[model_name] = f"{type(e).__name__}: {str(e).splitlines()[0][:300]}"
+                print(f"❌ Failed to export {model_name} to ONNX: {failures[model_name]}")
+    
+    if export_mode != 'separate' and not failures:
         try:
-            # Define input type
-            initial_type = [('float_input', FloatTensorType([None, len(feature_names)]))]
-            
-            # Convert to ONNX
-            onnx_model = convert_sklearn(model, initial_types=initial_type, target_opset=17)
-            
-            # Save model
-            model_path = os.path.join(output_dir, f'{model_name}.onnx')
-            with open(model_path, 'wb') as f:
-                f.write(onnx_model.SerializeToString())
-            
-            print(f"✅ Exported {model_name} to {model_path}")
-            
+            with stages.stage('fused'):
+                models['fused_export'] = _export_fused(models, exported, estimators, X_parity, output_dir)
         except Exception as e:
-            print(f"❌ Failed to export {model_name} to ONNX: {e}")
-            # Fallback: save as joblib
-            import joblib
-            joblib_path = os.path.join(output_dir, f'{model_name}.joblib')
-            joblib.dump(model, joblib_path)
-            print(f"💾 Saved {model_name} as joblib fallback to {joblib_path}")
+            failures['fused'] = f"{type(e).__name__}: {str(e).splitlines()[0][:300]}"
+            print(f"❌ Failed to export fused graph: {failures['fused']}")
+    
+    # HGB bin kenarları (cihaz üstü feature hazırlığı aynı uint8 kodları üretebilsin)
+    if models.get('feature_store') is not None:
+        bins_path = os.path.join(output_dir, 'feature_bins.json')
+        models['feature_store'].export(bins_path, feature_names)
+        print(f"✅ Exported HGB bin edges to {bins_path}")
     
     # Export scaler (NOTE: Not used for tree-based models, but kept for compatibility)
     # Since we're using unscaled features, scaler export is optional
@@ -674,23 +2369,245 @@ def export_to_onnx(models: Dict[str, Any], scaler: StandardScaler,
             f.write(scaler_onnx.SerializeToString())
         print(f"✅ Exported scaler to {scaler_path} (⚠️  NOT used for tree models in production)")
     except Exception as e:
-        print(f"ℹ️  Scaler export skipped: {e}")
-    
-    # Export encoders as joblib (not ONNX)
+        failures['scaler'] = f"{type(e).__name__}: {str(e).splitlines()[0][:300]}"
+        print(f"❌ Failed to export scaler to ONNX: {failures['scaler']}")
+    
+    # Export encoders as joblib (not ONNX; sınıf listeleri training_results.json'da)
+    for encoder_name in ['phase_encoder', 'mood_encoder']:
+        if encoder_name in models['models']:
+            encoder_path = os.path.join(output_dir, f'{encoder_name}.joblib')
+            joblib.dump(models['models'][encoder_name], encoder_path)
+            print(f"✅ Exported {encoder_name} to {encoder_path}")
+    
+    if failures:
+        raise OnnxExportError(f"ONNX export failed for {', '.join(failures)}: {failures}")
+
+
+# --search: aile başına tek temsilci görevde successive halving (seçilen ayar SEARCH_PARAM_TASKS görevlerine uygulanır)
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [10, 25, 50, 100],
+        'max_depth': [6, 8, 10, 12, 16],
+        'min_samples_leaf': [1, 5, 20, 50]
+    },
+    'hgb': {
+        'max_iter': [50, 100, 200],
+        'max_depth': [4, 6, 8, None],
+        'max_leaf_nodes': [15, 31, 63],
+        'learning_rate': [0.05, 0.1, 0.2]
+    }
+}
+SEARCH_TASKS = {'rf': 'phase_classification', 'hgb': 'period_prediction'}
+# Seçilen ayarın uygulandığı görevler: sadece aranan görev ve hedefi onun sabit kaydırması olan ovulation
+# (next_period - 14). mood/symptom/energy RF'leri aramada değerlendirilmediği için varsayılanda kalır.
+SEARCH_PARAM_TASKS = {'rf': ['phase_classification'], 'hgb': ['period_prediction', 'ovulation_prediction']}
+SEARCH_QUALITY_METRICS = {'rf': 'accuracy', 'hgb': 'within_2d_accuracy'}
+SEARCH_CANDIDATES = 12     # İlk basamaktaki aday sayısı (aile başına)
+SEARCH_ETA = 3             # Her basamakta adayların 1/eta'sı kalır, kullanıcı sayısı eta katına çıkar
+SEARCH_FOLDS = 3           # Basamak başına user-grouped fold
+SEARCH_LATENCY_ROWS = 200  # Tek satırlık ONNX inference gecikmesinin ölçüldüğü satır sayısı
+
+
+def measure_onnx_cost(model_name: str, model: Any, X_sample: np.ndarray) -> Dict[str, Any]:
+    """
+    Modelin cihaz üstü maliyeti: ONNX boyutu (KB) ve tek thread'de tek satırlık inference gecikmesi
+    (X_sample satırları üzerinden medyan, µs). Dönüşüm başarısızsa {'error': ...}.
+    """
     try:
-        if 'phase_encoder' in models:
-            phase_encoder_path = os.path.join(output_dir, 'phase_encoder.joblib')
-            joblib.dump(models['phase_encoder'], phase_encoder_path)
-            print(f"✅ Exported phase_encoder to {phase_encoder_path}")
-        
-        if 'mood_encoder' in models:
-            mood_encoder_path = os.path.join(output_dir, 'mood_encoder.joblib')
-            joblib.dump(models['mood_encoder'], mood_encoder_path)
-            print(f"✅ Exported mood_encoder to {mood_encoder_path}")
+        onnx_model = convert_task_model(model_name, model, X_sample.shape[1])
     except Exception as e:
-        print(f"Failed to export encoders: {e}")
+        # skl2onnx hata mesajı tüm node attribute dizilerini içerebilir; ilk satır yeterli
+        return {'error': f'{type(e).__name__}: {str(e).splitlines()[0][:200]}'}
+    payload = onnx_model.SerializeToString()
+    return {
+        'onnx_kb': len(payload) / 1024,
+        'latency_us_per_row': onnx_row_latency_us(onnx_session(payload), X_sample)
+    }
+
+
+def _search_fold(family: str, params: Dict[str, Any], X: np.ndarray, y_target: np.ndarray,
+                 train_rows: np.ndarray, test_rows: np.ndarray, measure_cost: bool,
+                 feature_store: BinnedFeatureStore = None) -> Dict[str, Any]:
+    """
+    (worker) Adayı tek fold'da tek thread ile eğit ve puanla; measure_cost ise ONNX maliyetini de ölç.
+    feature_store (fold train satırlarının store'u, satır i = train_rows[i]) verilirse HGB bu kodlarla eğitilir.
+    """
+    task = SEARCH_TASKS[family]
+    with threadpool_limits(limits=1):
+        start = time.perf_counter()
+        model = _make_task_model(task, 1, {task: params})
+        if feature_store is not None:
+            model.fit(feature_store.X_binned, y_target[train_rows], bin_mapper=feature_store.bin_mapper)
+        else:
+            model.fit(X[train_rows], y_target[train_rows])
+        fit_seconds = time.perf_counter() - start
+        
+        X_test, y_test = X[test_rows], y_target[test_rows]
+        y_pred = model.predict(X_test)
+        if family == 'hgb':
+            quality = float(np.mean(np.abs(y_pred - y_test) <= 2.0))
+        else:
+            quality = accuracy_score(y_test, y_pred)
+        cost = measure_onnx_cost(task, model, X_test[:SEARCH_LATENCY_ROWS]) if measure_cost else None
+    return {'quality': quality, 'fit_seconds': fit_seconds, 'cost': cost}
+
+
+def _search_objective(quality: float, cost: Dict[str, Any], size_weight: float, latency_weight: float) -> float:
+    """Ortak amaç: kalite - size_weight * ONNX MB - latency_weight * µs/satır (maliyet ölçülemezse sadece kalite)"""
+    if cost is None or 'error' in cost:
+        return quality
+    return quality - size_weight * cost['onnx_kb'] / 1024 - latency_weight * cost['latency_us_per_row']
+
+
+def hyperparameter_search(X: np.ndarray, y: Dict[str, np.ndarray], user_ids: np.ndarray,
+                          budget_seconds: float = 600, n_jobs: int = -1, size_weight: float = 0.01,
+                          latency_weight: float = 0.0001, n_candidates: int = SEARCH_CANDIDATES,
+                          seed: int = 42) -> Dict[str, Any]:
+    """
+    Model aileleri (rf, hgb) için successive halving hiperparametre araması.
+    
+    SEARCH_SPACES'ten n_candidates aday örneklenir; basamak k'da adaylar kullanıcıların
+    1/eta^(son-k)'sı üzerinde SEARCH_FOLDS user-grouped fold'da (joblib/loky, n_jobs process,
+    aday × fold işleri, model başına 1 thread) eğitilir. Kalite fold ortalaması, maliyet fold 1
+    modelinin ONNX boyutu ve tek satır gecikmesi; en iyi 1/eta aday bir sonraki basamağa geçer.
+    Zaman bütçesi aileler arasında paylaştırılır. Kalan süre son basamağın süresinden azsa yeni basamak
+    başlamaz; basamak içinde süre her aday grubundan (worker sayısı / fold kadar aday) sonra kontrol edilir
+    ve aşıldıysa basamak yarıda kesilir. Seçim son tamamlanan basamağın en iyisidir.
+    HGB adayları basamak fold'u başına bir kez kurulan BinnedFeatureStore'u paylaşır (pre-binned hook'lar
+    desteklenmiyorsa düz HGB kendi binning'iyle eğitilir).
+    Seçilen ayar sadece aranan görev(ler)e uygulanır (task_params, bkz. SEARCH_PARAM_TASKS).
+    """
+    if not SKLEARN_AVAILABLE:
+        raise ImportError("Scikit-learn is required for hyperparameter search")
+    
+    from sklearn.model_selection import GroupKFold, ParameterSampler
+    from joblib import Parallel, delayed, effective_n_jobs
+    
+    families = [family for family in SEARCH_SPACES
+                if family != 'hgb' or HistGradientBoostingRegressor is not None]
+    n_rungs = int(np.floor(np.log(n_candidates) / np.log(SEARCH_ETA) + 1e-9)) + 1
+    users = np.random.default_rng(seed).permutation(np.unique(user_ids))
+    print(f"✓ Search: successive halving | {n_candidates} candidates | eta={SEARCH_ETA} | {n_rungs} rungs | "
+          f"budget {budget_seconds:.0f}s | {effective_n_jobs(n_jobs)} jobs")
+    
+    start = time.perf_counter()
+    batch_size = max(1, int(np.ceil(effective_n_jobs(n_jobs) / SEARCH_FOLDS)))
+    report = {}
+    with tempfile.TemporaryDirectory(prefix='cyclemate_search_') as mmap_dir:
+        X_shared = _memmap_array(X, mmap_dir, 'X')
+        for i, family in enumerate(families):
+            task = SEARCH_TASKS[family]
+            target = TASK_TARGETS[task]
+            y_shared = _memmap_array(y[target], mmap_dir, f'y_{target}')
+            remaining = budget_seconds - (time.perf_counter() - start)
+            deadline = time.perf_counter() + remaining / (len(families) - i)
+            
+            candidates = list(ParameterSampler(SEARCH_SPACES[family], n_candidates, random_state=seed))
+            rungs, rung_seconds, stopped_by_budget = [], 0.0, False
+            for rung in range(n_rungs):
+                if rungs and deadline - time.perf_counter() < rung_seconds:
+                    stopped_by_budget = True
+                    break
+                rung_start = time.perf_counter()
+                
+                # Basamaklar iç içe kullanıcı alt kümeleri kullanır (büyük basamak öncekini kapsar)
+                n_users = max(SEARCH_FOLDS, len(users) // SEARCH_ETA ** (n_rungs - 1 - rung))
+                rows = np.flatnonzero(np.isin(user_ids, users[:n_users]))
+                folds = list(GroupKFold(n_splits=SEARCH_FOLDS).split(rows, groups=user_ids[rows]))
+                # HGB: fold'un train satırları adaylar için tekrar tekrar değil, fold başına bir kez bin'lenir
+                stores = [None] * len(folds)
+                if family == 'hgb' and _prebinned_supported():
+                    for fold, (train, _) in enumerate(folds):
+                        store = BinnedFeatureStore.build(X, rows[train])
+                        stores[fold] = BinnedFeatureStore(
+                            store.bin_mapper, _memmap_array(store.X_binned, mmap_dir, f'X_binned_{rung}_{fold}'))
+                
+                # Adaylar worker'ları dolduracak gruplar halinde değerlendirilir; süre her gruptan sonra
+                # kontrol edilir, böylece tek basamak bütçeyi en fazla bir grup süresi kadar aşar
+                scored = []
+                for b in range(0, len(candidates), batch_size):
+                    if (scored or rungs) and time.perf_counter() > deadline:
+                        stopped_by_budget = True
+                        break
+                    batch = candidates[b:b + batch_size]
+                    outputs = Parallel(n_jobs=n_jobs, backend='loky', max_nbytes=None)(
+                        delayed(_search_fold)(family, params, X_shared, y_shared, rows[train], rows[test], fold == 0,
+                                              stores[fold])
+                        for params in batch for fold, (train, test) in enumerate(folds)
+                    )
+                    for c, params in enumerate(batch):
+                        fold_outputs = outputs[c * SEARCH_FOLDS:(c + 1) * SEARCH_FOLDS]
+                        qualities = [output['quality'] for output in fold_outputs]
+                        cost = fold_outputs[0]['cost']
+                        scored.append({
+                            'params': params,
+                            'quality': float(np.mean(qualities)),
+                            'quality_std': float(np.std(qualities)),
+                            'fit_seconds': float(np.mean([output['fit_seconds'] for output in fold_outputs])),
+                            **cost,
+                            'objective': _search_objective(float(np.mean(qualities)), cost, size_weight, latency_weight)
+                        })
+                if not scored:
+                    break
+                scored.sort(key=lambda candidate: candidate['objective'], reverse=True)
+                rung_seconds = time.perf_counter() - rung_start
+                rungs.append({
+                    'rung': rung + 1,
+                    'users': int(n_users),
+                    'rows': int(len(rows)),
+                    'seconds': rung_seconds,
+                    'complete': len(scored) == len(candidates),
+                    'candidates': scored
+                })
+                best = scored[0]
+                print(f"  [{family}] rung {rung + 1}/{n_rungs}: {len(scored)}/{len(candidates)} candidates x "
+                      f"{n_users:,} users in {rung_seconds:.1f}s | best {SEARCH_QUALITY_METRICS[family]} "
+                      f"{best['quality']:.4f} objective {best['objective']:.4f}")
+                if stopped_by_budget:
+                    break
+                
+                candidates = [candidate['params'] for candidate in scored[:max(1, int(np.ceil(len(scored) / SEARCH_ETA)))]]
+            
+            # Yarım kalan basamak adayların sadece bir kısmını görmüştür; tamamlanmış son basamağın en iyisi seçilir
+            complete = [r for r in rungs if r['complete']]
+            best = (complete or rungs)[-1]['candidates'][0]
+            report[family] = {
+                'task': task,
+                'quality_metric': SEARCH_QUALITY_METRICS[family],
+                'stopped_by_budget': stopped_by_budget,
+                'best': best,
+                'rungs': rungs
+            }
+            print(f"✓ [{family}] chosen: {best['params']}" + (" (stopped by time budget)" if stopped_by_budget else ""))
+            del y_shared
+        del X_shared
+    
+    return {
+        'method': 'successive_halving',
+        'eta': SEARCH_ETA,
+        'folds': SEARCH_FOLDS,
+        'candidates': n_candidates,
+        'jobs': n_jobs,
+        'budget_seconds': budget_seconds,
+        'elapsed_seconds': time.perf_counter() - start,
+        'objective': 'quality - size_weight * onnx_mb - latency_weight * latency_us_per_row',
+        'size_weight': size_weight,
+        'latency_weight': latency_weight,
+        'best_params': {family: family_report['best']['params'] for family, family_report in report.items()},
+        'task_params': {task: report[family]['best']['params']
+                        for family in report for task in SEARCH_PARAM_TASKS[family]},
+        'families': report
+    }
+
 
-def save_training_results(results: Dict[str, Any], output_path: str = 'training_results.json', sample_count: int = None):
+def _model_info(model: Any, keys: List[str]) -> Dict[str, Any]:
+    """Eğitilmiş modelin training_results'a yazılan hiperparametreleri"""
+    params = model.get_params()
+    return {key: params[key] for key in keys if key in params}
+
+
+def save_training_results(results: Dict[str, Any], output_path: str = 'training_results.json', sample_count: int = None,
+                          num_users: int = 10000, cycles_per_user: int = 6):
     """Save training results to JSON"""
     
     # Convert numpy arrays to lists for JSON serialization
@@ -702,42 +2619,83 @@ def save_training_results(results: Dict[str, Any], output_path: str = 'training_
             for key, value in result.items()
         }
     
+    # CV metrikleri eğitilen (öğretmen) modelindir; bütçe başka bir varyant yazdıysa bu etiketlenir ve
+    # yazılan varyantın holdout metrikleri metadata.shipped_models'a girer
+    shipped_models = {}
+    for model_name, report in (results.get('export_report') or {}).items():
+        shipped_models[model_name] = report['shipped']
+        serializable_results[model_name]['metrics_model'] = 'teacher' if report['chosen'] != 'skl2onnx' else 'shipped'
+        serializable_results[model_name]['shipped_variant'] = report['chosen']
+    
     # Add metadata
     metadata = {
         'model_version': '2.0.0',
         'training_date': datetime.now().isoformat(),
         'random_seed': 42,
         'feature_version': 'v2_advanced_stats',
-        'cv_folds': 5,
-        'cv_note': 'Using first fold only - TODO: average over all folds',
+        'cv_folds': results['cv']['folds'],
+        'cv_note': 'Metrics are means over user-grouped GroupKFold folds (<metric>_std = std across folds); exported models are trained on fold 1',
+        'regression_mode': results['regression_mode'],
+        'day_offset_targets': DAY_OFFSET_TARGETS,
+        'cv_jobs': results['cv']['jobs'],
+        'cv_threads_per_fold': results['cv']['threads_per_fold'],
+        'cv_wall_seconds': results['cv']['wall_seconds'],
+        'cv_fold_timings': results['cv']['fold_timings'],
+        'pipeline_stages': results.get('pipeline_stages'),
         'inference_note': 'Scaler is fitted but NOT used for tree-based models. Use unscaled features in production.',
         'feature_names': results['feature_names'],
         'feature_count': len(results['feature_names']),
         'model_info': {
             'period_ovulation': {
                 'algorithm': 'HistogramGradientBoosting',
-                'max_iter': 100,
-                'max_depth': 8,
-                'learning_rate': 0.1,
-                'l2_regularization': 0.1,
-                'random_state': 42
+                **_model_info(results['models']['period_prediction'],
+                              ['max_iter', 'max_depth', 'max_leaf_nodes', 'learning_rate', 'l2_regularization',
+                               'early_stopping', 'random_state']),
+                'fitted_iterations': _fitted_estimators(results['models']['period_prediction']),
+                'source': 'search' if 'period_prediction' in results['model_params'] else 'defaults'
             },
-            'phase_mood_energy': {
-                'algorithm': 'RandomForest',
-                'n_estimators': 50,
-                'max_depth': 12,
-                'max_samples': 200000,
-                'random_state': 42
-            }
+            **({
+                'phase': {
+                    'algorithm': 'RandomForest',
+                    **_model_info(results['models']['phase_classification'],
+                                  ['n_estimators', 'max_depth', 'min_samples_leaf', 'max_samples', 'random_state']),
+                    'source': 'search' if 'phase_classification' in results['model_params'] else 'defaults'
+                },
+                # RF araması sadece phase üzerinde değerlendirilir; bu görevler her zaman varsayılanda
+                'mood_symptom_energy': {
+                    'algorithm': 'RandomForest',
+                    **_model_info(results['models']['energy_prediction'],
+                                  ['n_estimators', 'max_depth', 'min_samples_leaf', 'max_samples', 'random_state']),
+                    'source': 'defaults'
+                }
+            } if not results['out_of_core'] else {
+                'phase_mood_symptom_energy': {
+                    'algorithm': 'StandardScaler + MLP (partial_fit, out-of-core)',
+                    'hidden_layer_sizes': [64, 32],
+                    'chunk_rows': OOC_CHUNK_ROWS,
+                    'epochs': OOC_EPOCHS,
+                    'random_state': 42
+                }
+            })
         },
+        'hyperparameter_search': results.get('search'),
+        'early_stopping': results['early_stopping'],
+        'export_budget': results.get('export_report'),
+        'shipped_models': shipped_models,
+        'export_parity': results.get('export_parity'),
+        'fused_export': results.get('fused_export'),
+        'out_of_core': results['out_of_core'],
+        'feature_store': dict(results['feature_store_info'], bin_edges_file='feature_bins.json')
+                         if results.get('feature_store_info') else None,
         'data_generation': {
-            'num_users': 10000,
-            'cycles_per_user': 6,
+            'num_users': num_users,
+            'cycles_per_user': cycles_per_user,
             'total_samples': sample_count if sample_count is not None else results.get('total_samples', 'unknown')
         },
         'classes': {
             'phase_classes': results['models']['phase_encoder'].classes_.tolist() if 'phase_encoder' in results['models'] else [],
-            'mood_classes': results['models']['mood_encoder'].classes_.tolist() if 'mood_encoder' in results['models'] else []
+            'mood_classes': results['models']['mood_encoder'].classes_.tolist() if 'mood_encoder' in results['models'] else [],
+            'symptom_labels': SYMPTOMS
         }
     }
     
@@ -751,8 +2709,54 @@ def save_training_results(results: Dict[str, Any], output_path: str = 'training_
     
     print(f"Training results saved to {output_path}")
 
+
 def main():
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description="CycleMate AI Model Training")
+    parser.add_argument("--users", type=int, default=10000, help="Number of synthetic users")
+    parser.add_argument("--cycles", type=int, default=6, help="Cycles per user")
+    parser.add_argument("--cv-jobs", type=int, default=-1,
+                        help="Parallel CV fold processes (-1 = all cores, 1 = sequential; each job holds its own fold copy)")
+    parser.add_argument("--regression-mode", choices=REGRESSION_MODES, default="separate",
+                        help="shared: one period model, ovulation/fertile window via fixed day offsets")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Total CPU thread budget shared by CV folds and task models (default: all cores)")
+    parser.add_argument("--out-of-core", metavar="DIR", default=None,
+                        help="Write features/targets as float32 .npy memmaps to DIR and train phase/mood/symptom/energy "
+                             "incrementally from disk")
+    parser.add_argument("--search", action="store_true",
+                        help="Successive-halving hyperparameter search (user-grouped folds) before training; "
+                             "the chosen config is used only for the searched tasks (HGB: period/ovulation, RF: phase) "
+                             "and written to training_results.json")
+    parser.add_argument("--search-budget", type=float, default=600,
+                        help="Search time budget in seconds (checked before each rung and after each candidate batch)")
+    parser.add_argument("--search-jobs", type=int, default=-1,
+                        help="Parallel search processes (-1 = all cores); each candidate fit uses one thread")
+    parser.add_argument("--search-size-weight", type=float, default=0.01,
+                        help="Objective penalty per MB of ONNX model (quality units)")
+    parser.add_argument("--search-latency-weight", type=float, default=0.0001,
+                        help="Objective penalty per microsecond of single-row ONNX inference (quality units)")
+    parser.add_argument("--phase-max-kb", type=float, default=EXPORT_BUDGETS['phase_classification']['max_kb'],
+                        help="Size budget for phase_classification.onnx (KB)")
+    parser.add_argument("--phase-max-latency-us", type=float,
+                        default=EXPORT_BUDGETS['phase_classification']['max_latency_us'],
+                        help="Single-row inference budget for phase_classification.onnx (microseconds)")
+    parser.add_argument("--phase-max-accuracy-drop", type=float,
+                        default=EXPORT_BUDGETS['phase_classification']['max_accuracy_drop'],
+                        help="Allowed holdout accuracy drop vs the plain skl2onnx export")
+    parser.add_argument("--export-mode", choices=EXPORT_MODES, default='separate',
+                        help="separate: one ONNX file per task; fused: one multi-head graph "
+                             f"({FUSED_MODEL_FILE}) with label outputs; both: write both")
+    parser.add_argument("--no-early-stopping", action="store_true",
+                        help="Train fixed-size models (max_iter / n_estimators) without the user-grouped holdout")
+    parser.add_argument("--profile", metavar="DIR", nargs="?", const="profiles", default=None,
+                        help="Dump cProfile stats per top-level stage to DIR (default: profiles/); only the main "
+                             "thread is profiled, model fits (CV workers / fit threads) show up as waits and are "
+                             "timed per model in the stage table instead")
+    args = parser.parse_args()
+    if args.out_of_core:
+        os.makedirs(args.out_of_core, exist_ok=True)
+    stages = StageRecorder(profile_dir=args.profile)
     
     # Set seeds for reproducibility
     np.random.seed(42)
@@ -765,21 +2769,41 @@ def main():
     
     # Generate synthetic data
     print("\n1. Generating synthetic training data...")
-    data = generate_synthetic_training_data(num_users=10000, cycles_per_user=6)
+    # Sentetik üretim feature matrisini de doğrudan kurar: ayrı bir feature extraction aşaması yok
+    with stages.stage('load_features'):
+        data = generate_synthetic_training_data(num_users=args.users, cycles_per_user=args.cycles, engine='numpy',
+                                                seed=42, out_dir=args.out_of_core)
     print(f"Generated {len(data['features'])} training samples")
     print(f"Feature dimension: {data['features'].shape[1]}")
     
     # Prepare data
     print("\n2. Preparing data for training...")
-    X, y, phase_encoder, mood_encoder, user_ids = prepare_data_for_training(data)
+    with stages.stage('prepare'):
+        X, y, phase_encoder, mood_encoder, user_ids = prepare_data_for_training(data)
     print(f"Features shape: {X.shape}")
     print(f"Targets: {list(y.keys())}")
     unique_users = np.unique(user_ids).size
     print(f"User IDs: {unique_users} unique users")
     
+    # Hyperparameter search (optional)
+    search = None
+    if args.search:
+        print("\n3a. Searching hyperparameters...")
+        with stages.stage('search'):
+            search = hyperparameter_search(X, y, user_ids, budget_seconds=args.search_budget,
+                                           n_jobs=args.search_jobs, size_weight=args.search_size_weight,
+                                           latency_weight=args.search_latency_weight)
+        print(f"✓ Search finished in {search['elapsed_seconds']:.1f}s: {search['best_params']}")
+    
     # Train models
     print("\n3. Training models...")
-    training_results = train_models(X, y, user_ids, phase_encoder, mood_encoder)
+    with stages.stage('train'):
+        training_results = train_models(X, y, user_ids, phase_encoder, mood_encoder,
+                                        cv_jobs=args.cv_jobs, threads=args.threads,
+                                        regression_mode=args.regression_mode, out_of_core_dir=args.out_of_core,
+                                        model_params=search['task_params'] if search else None,
+                                        early_stopping=not args.no_early_stopping, stages=stages)
+    training_results['search'] = search
     
     # Print results summary
     print("\n" + "=" * 70)
@@ -790,7 +2814,7 @@ def main():
     period_res = training_results['results']['period_prediction']
     print(f"\n📅 PERIOD PREDICTION:")
     print(f"   RMSE: {period_res['rmse']:.2f} days | MAE: {period_res['mae']:.2f} days")
-    print(f"   ±2d Accuracy: {period_res['within_2d_accuracy']*100:.1f}%")
+    print(f"   ±2d Accuracy: {period_res['within_2d_accuracy']*100:.1f}% (±{period_res['within_2d_accuracy_std']*100:.1f} across folds)")
     print(f"   Naive Baseline: RMSE {period_res['naive_rmse']:.2f} | MAE {period_res['naive_mae']:.2f}")
     print(f"   🎯 Improvement vs Naive: {period_res['improvement_vs_naive']:.1f}%")
     
@@ -800,24 +2824,53 @@ def main():
     print(f"   RMSE: {ovulation_res['rmse']:.2f} days | MAE: {ovulation_res['mae']:.2f} days")
     print(f"   ±2d Accuracy: {ovulation_res['within_2d_accuracy']*100:.1f}%")
     print(f"   🎯 Improvement vs Naive: {ovulation_res['improvement_vs_naive']:.1f}%")
+    print(f"   Source: {ovulation_res['source']}")
+    
+    # Fertile window summary
+    fertile_res = training_results['results']['fertile_window']
+    print(f"\n🌸 FERTILE WINDOW (from ovulation):")
+    print(f"   Start MAE: {fertile_res['fertile_window_start_mae']:.2f} days | "
+          f"±2d: {fertile_res['fertile_window_start_within_2d']*100:.1f}%")
+    print(f"   End MAE: {fertile_res['fertile_window_end_mae']:.2f} days | "
+          f"±2d: {fertile_res['fertile_window_end_within_2d']*100:.1f}%")
     
     # Phase summary
     phase_res = training_results['results']['phase_classification']
     print(f"\n🌙 PHASE CLASSIFICATION:")
-    print(f"   Accuracy: {phase_res['accuracy']*100:.1f}%")
+    print(f"   Accuracy: {phase_res['accuracy']*100:.1f}% (±{phase_res['accuracy_std']*100:.1f} across folds)")
     print(f"   Balanced Accuracy: {phase_res['balanced_accuracy']*100:.1f}%")
     
     # Mood summary
     mood_res = training_results['results']['mood_classification']
     print(f"\n😊 MOOD CLASSIFICATION:")
-    print(f"   Accuracy: {mood_res['accuracy']*100:.1f}%")
+    print(f"   Accuracy: {mood_res['accuracy']*100:.1f}% (±{mood_res['accuracy_std']*100:.1f} across folds)")
     print(f"   F1-Macro: {mood_res['f1_macro']*100:.1f}%")
     
+    # Symptom summary
+    symptom_res = training_results['results']['symptom_prediction']
+    print(f"\n🩹 NEXT-DAY SYMPTOMS (multi-label):")
+    print(f"   Average Precision (micro): {symptom_res['average_precision_micro']*100:.1f}% | "
+          f"Brier: {symptom_res['brier_score']:.4f}")
+    print(f"   F1-Micro: {symptom_res['f1_micro']*100:.1f}% | F1-Macro: {symptom_res['f1_macro']*100:.1f}%")
+    print(f"   Hamming Loss: {symptom_res['hamming_loss']:.4f} | Subset Accuracy: {symptom_res['subset_accuracy']*100:.1f}%")
+    
     # Energy summary
     energy_res = training_results['results']['energy_prediction']
     print(f"\n⚡ ENERGY PREDICTION:")
     print(f"   RMSE: {energy_res['rmse']:.4f}")
     
+    # Model fit summary (fold ortalaması)
+    print("\n⏱  MODEL FIT (learner | rows | trees/iters | threads | seconds | process CPU during fit | "
+          "process peak RSS):")
+    learner_width = max(len(training_results['results'][model_name]['learner'])
+                        for model_name in task_model_names(training_results['regression_mode']))
+    for model_name in task_model_names(training_results['regression_mode']):
+        res = training_results['results'][model_name]
+        size = (f"{res['fitted_estimators']:5.0f}/{res['max_estimators']:<4.0f}" if res['fitted_estimators'] is not None
+                else f"{'-':>10s}")
+        print(f"   {model_name:22s} {res['learner']:{learner_width}s} {res['fit_rows']:10,.0f} | {size} | {res['fit_threads']:4.0f} | "
+              f"{res['fit_seconds']:7.1f}s | {res['fit_process_cpu_seconds']:7.1f}s | {format_mb(res['fit_process_peak_rss_mb'])}")
+    
     print("\n" + "=" * 70)
     
     # Detailed results
@@ -834,12 +2887,20 @@ def main():
                     print(f"  {metric}: {value}")
     
     # Export models
-    print("\n5. Exporting models...")
-    export_to_onnx(training_results, training_results['scaler'], training_results['feature_names'])
+    print("\n5. Exporting models to ONNX...")
+    with stages.stage('export'):
+        export_to_onnx(training_results, training_results['scaler'], training_results['feature_names'],
+                       budgets={'phase_classification': {'max_kb': args.phase_max_kb,
+                                                         'max_latency_us': args.phase_max_latency_us,
+                                                         'max_accuracy_drop': args.phase_max_accuracy_drop}},
+                       export_mode=args.export_mode, stages=stages)
+    
+    stages.print_summary()
+    training_results['pipeline_stages'] = stages.report()
     
     # Save results
     print("\n6. Saving results...")
-    save_training_results(training_results, sample_count=X.shape[0])
+    save_training_results(training_results, sample_count=X.shape[0], num_users=args.users, cycles_per_user=args.cycles)
     
     print("\n" + "=" * 70)
     print("✅ TRAINING COMPLETE!")
@@ -852,5 +2913,6 @@ def main():
     print(f"⚠️  Do NOT apply scaler during inference for HGB/RF models.")
     print("\n🚀 Models are ready for deployment!")
 
+
 if __name__ == "__main__":
     main()
@@ -3,17 +3,25 @@ CycleMate - ML Model Training Script v2.2
 ==========================================
 
 Sentetik cycle data'dan model eğitir ve ONNX formatında export eder.
-- Multi-shard data loading
+- Multi-shard data loading (JSON, JSON Lines veya kolonsal .npz shard'lar)
+- Lazy (shard shard) yükleme + önceden ayrılmış float32 feature matrix
+- Vektörize (blok bazlı) feature extraction
+- Log başına cycleIndex ile cycle eşleme (eski shard'lar için searchsorted)
 - Feature extraction from cycle data
 - Neural network training
-- ONNX conversion + quantization
+- ONNX conversion + graph optimization + quantization (dynamic / kalibrasyonlu static INT8 / fp16)
+- Accuracy / boyut / gecikme raporu, model.onnx'i kapılar (gate)
+- Aşama başına wall / CPU / peak RSS ölçümü (profiling.StageRecorder, --profile ile cProfile)
 """
 
 import argparse
+import glob
 import json
+import shutil
 import time
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from collections import Counter
 
 import numpy as np
@@ -25,22 +33,50 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
 
+from profiling import StageRecorder
+from generate_synthetic_data import (
+    read_npz_shard, cycle_arrays_to_record, iter_jsonl_shard, shard_sidecar_path
+)
+
+import onnx
+import onnxruntime
+from onnx import TensorProto, helper, numpy_helper
+
 # Quantization optional (onnxruntime-tools gerekebilir)
 try:
-    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from onnxruntime.quantization import (
+        quantize_dynamic, quantize_static, QuantType, QuantFormat, CalibrationDataReader
+    )
     QUANTIZATION_AVAILABLE = True
 except ImportError:
-    try:
-        from onnxruntime.tools.quantization import quantize_dynamic, QuantType
-        QUANTIZATION_AVAILABLE = True
-    except ImportError:
-        QUANTIZATION_AVAILABLE = False
-        print("⚠️  onnxruntime quantization not available, skipping quantization")
+    CalibrationDataReader = object
+    QUANTIZATION_AVAILABLE = False
+    print("⚠️  onnxruntime quantization not available, only fp32/fp16 exports")
 
 
 # Paths
 DEFAULT_OUTPUT = Path(__file__).resolve().parents[1] / "assets" / "models" / "model.onnx"
 TMP_MODEL = Path(__file__).resolve().parent / "model_fp32.onnx"
+DEFAULT_REPORT = Path(__file__).resolve().parent / "model_export_report.json"
+
+# Export varyantları: fp32 graph optimizasyondan geçer, INT8/fp16 varyantları optimize graph'tan üretilir.
+# auto: accuracy kaybı sınırı içindeki en küçük varyant; açık mod sınırı aşarsa model.onnx yazılmaz.
+QUANTIZATION_MODES = {
+    'auto': None,
+    'static': 'int8-static',
+    'dynamic': 'int8-dynamic',
+    'fp16': 'fp16',
+    'none': 'fp32',
+}
+GRAPH_OPTIMIZATION_LEVELS = {
+    'none': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,        # Sadece standart op'lar (taşınabilir)
+    'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,  # com.microsoft fused op'ları ekler
+}
+DEFAULT_MAX_ACCURACY_DROP = 0.005   # fp32 ONNX'e göre test accuracy kaybı sınırı
+CALIBRATION_ROWS = 2048             # Static INT8: aktivasyon aralıkları için eğitim matrisinden örnek
+CALIBRATION_BATCH = 256
+LATENCY_ROWS = 200                  # Tek satır inference gecikmesi: medyan
 
 # Semptom ve mood listeleri (generate_synthetic_data.py ile aynı)
 SYMPTOMS = [
@@ -53,6 +89,29 @@ SYMPTOMS = [
 
 MOODS = ['ecstatic', 'happy', 'calm', 'neutral', 'tired', 'sad', 'anxious', 'irritable', 'angry']
 
+PHASES = ['menstrual', 'follicular', 'ovulation', 'luteal']
+FLOWS = ['light', 'medium', 'heavy']
+
+# Feature kolon düzeni (extract_features_from_log ile aynı sıra)
+COL_DAY = 0
+COL_PHASE = COL_DAY + 1
+COL_SYMPTOM = COL_PHASE + len(PHASES)
+COL_SEVERITY = COL_SYMPTOM + len(SYMPTOMS)
+COL_MOOD = COL_SEVERITY + 1
+COL_FLOW = COL_MOOD + len(MOODS)
+COL_CYCLE_LENGTH = COL_FLOW + len(FLOWS)
+COL_PERIOD_LENGTH = COL_CYCLE_LENGTH + 1
+N_FEATURES = COL_PERIOD_LENGTH + 1
+
+# Batch extractor için indeks haritaları
+PHASE_INDEX = {p: i for i, p in enumerate(PHASES)}
+SYMPTOM_INDEX = {s: i for i, s in enumerate(SYMPTOMS)}
+MOOD_INDEX = {m: i for i, m in enumerate(MOODS)}
+FLOW_INDEX = {f: i for i, f in enumerate(FLOWS)}
+
+# prepare_training_data'da tek seferde işlenen log sayısı
+FEATURE_BATCH_SIZE = 8192
+
 # Tip kategorileri (basitleştirilmiş)
 TIP_CATEGORIES = {
     'menstrual_relief': 0,    # Menstrual ağrı rahatlatma
@@ -62,31 +121,70 @@ TIP_CATEGORIES = {
 }
 
 
-def load_shard_files(pattern: str = "ml/synthetic_cycle_data_v2_2_part_*.json") -> List[Dict[str, Any]]:
-    """Tüm shard dosyalarını yükle"""
-    shard_files = sorted(Path(".").glob(pattern))
+def find_shard_files(pattern: str) -> List[Path]:
+    """Pattern'e uyan shard dosyalarını bul"""
+    shard_files = sorted(Path(f) for f in glob.glob(pattern))
     
     if not shard_files:
         raise FileNotFoundError(f"Shard dosyaları bulunamadı: {pattern}")
     
     print(f"Found {len(shard_files)} shard files")
-    
-    all_users = []
+    return shard_files
+
+
+def iter_shard_users(shard_files: List[Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Kullanıcıları shard shard (lazy) döndür (.json, .jsonl[.gz|.zst] veya kolonsal .npz)
+    Bellekte aynı anda en fazla bir shard tutulur; jsonl satır satır okunur.
+    """
     for shard_file in shard_files:
         print(f"  Loading {shard_file.name}...")
-        with open(shard_file, 'r', encoding='utf-8') as f:
-            shard_data = json.load(f)
-            all_users.extend(shard_data['data'])
-    
+        if shard_file.suffix == '.npz':
+            _, shard_users = read_npz_shard(str(shard_file))
+            for user in shard_users:
+                yield cycle_arrays_to_record(user)
+        elif '.jsonl' in shard_file.suffixes:
+            yield from iter_jsonl_shard(str(shard_file))
+        else:
+            with open(shard_file, 'r', encoding='utf-8') as f:
+                shard_users = json.load(f)['data']
+            yield from shard_users
+        shard_users = None  # Sonraki shard yüklenmeden önce bırak
+
+
+def count_shard_logs(shard_files: List[Path]) -> Optional[int]:
+    """
+    Shard metadata'sından toplam log sayısı (feature matrix'i önceden ayırmak için).
+    Metadata'yı ucuza okunamayan (.json veya sidecar'ı olmayan .jsonl) shard varsa None.
+    """
+    total = 0
+    for shard_file in shard_files:
+        if shard_file.suffix == '.npz':
+            with np.load(shard_file) as shard:
+                total += json.loads(str(shard['metadata']))['totalLogs']
+        elif '.jsonl' in shard_file.suffixes:
+            try:
+                with open(shard_sidecar_path(str(shard_file)), 'r', encoding='utf-8') as f:
+                    total += json.load(f)['totalLogs']
+            except FileNotFoundError:
+                return None
+        else:
+            return None
+    return total
+
+
+def load_shard_files(pattern: str = "ml/synthetic_cycle_data_v2_2_part_*.json") -> List[Dict[str, Any]]:
+    """Tüm shard dosyalarını tek listeye yükle (küçük veri / geriye uyumluluk için)"""
+    all_users = list(iter_shard_users(find_shard_files(pattern)))
     print(f"✓ Loaded {len(all_users)} total users")
     return all_users
 
 
 def extract_features_from_log(log: Dict[str, Any], cycle_info: Dict[str, Any]) -> List[float]:
     """
-    Bir log'dan feature vector oluştur
+    Bir log'dan feature vector oluştur (referans implementasyon; eğitim extract_features_batch kullanır)
     
-    Features (35 boyutlu):
+    Features (39 boyutlu):
     - dayInCycle (normalized): 1
     - phase (one-hot): 4
     - symptoms (multi-hot): 19
@@ -162,51 +260,168 @@ def determine_tip_label(log: Dict[str, Any], phase: str) -> int:
     return TIP_CATEGORIES['general_wellness']
 
 
-def prepare_training_data(users: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+def _scatter_one_hot(X: np.ndarray, offset: int, codes: np.ndarray) -> None:
+    """codes >= 0 olan satırlarda X[row, offset + code] = 1 (bilinmeyen değer = -1, atlanır)"""
+    rows = np.flatnonzero(codes >= 0)
+    X[rows, offset + codes[rows]] = 1.0
+
+
+def extract_features_batch(
+    logs: List[Dict[str, Any]],
+    cycle_infos: List[Dict[str, Any]]
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Tüm kullanıcılardan feature matrix ve labels oluştur
+    Log bloğundan feature matrix (float32) ve tip label'ları üret.
+    
+    extract_features_from_log + determine_tip_label ile bire bir aynı sonuç; kategoriler
+    indeks haritalarıyla koda çevrilip tek seferde scatter edilir.
     """
-    print("\nExtracting features from logs...")
+    n = len(logs)
+    X = np.zeros((n, N_FEATURES), dtype=np.float32)
+    if n == 0:
+        return X, np.zeros(0, dtype=np.int64)
+    
+    # 1. Day in cycle + 7. cycle stats (float64'te hesaplanıp float32'ye yazılır)
+    day_in_cycle = np.array([log.get('dayInCycle', 0) for log in logs], dtype=np.float64)
+    cycle_length = np.array([c.get('cycleLength', 28) for c in cycle_infos], dtype=np.float64)
+    period_length = np.array([c.get('periodLength', 5) for c in cycle_infos], dtype=np.float64)
+    X[:, COL_DAY] = day_in_cycle / cycle_length
+    X[:, COL_CYCLE_LENGTH] = cycle_length / 35.0
+    X[:, COL_PERIOD_LENGTH] = period_length / 7.0
+    
+    # 2. Phase, 5. mood, 6. flow (one-hot)
+    phase = np.array([PHASE_INDEX.get(log.get('phase', 'menstrual'), -1) for log in logs], dtype=np.int64)
+    mood = np.array([MOOD_INDEX.get(log.get('mood'), -1) for log in logs], dtype=np.int64)
+    flow = np.array([FLOW_INDEX.get(log.get('flow'), -1) for log in logs], dtype=np.int64)
+    _scatter_one_hot(X, COL_PHASE, phase)
+    _scatter_one_hot(X, COL_MOOD, mood)
+    _scatter_one_hot(X, COL_FLOW, flow)
+    
+    # 3. Symptoms (multi-hot) + 4. average severity (bilinmeyen ID'ler ortalamaya dahil)
+    symptom_entries = [
+        (row, SYMPTOM_INDEX.get(s['id'], -1), s['severity'])
+        for row, log in enumerate(logs)
+        for s in (log.get('symptoms') or [])
+    ]
+    if symptom_entries:
+        rows, cols, severities = np.array(symptom_entries, dtype=np.int64).T
+        known = cols >= 0
+        X[rows[known], COL_SYMPTOM + cols[known]] = 1.0
+        counts = np.bincount(rows, minlength=n)
+        totals = np.bincount(rows, weights=severities, minlength=n)
+        has_symptoms = counts > 0
+        X[has_symptoms, COL_SEVERITY] = totals[has_symptoms] / counts[has_symptoms] / 3.0
+    
+    # Tip label'ları (determine_tip_label öncelik sırasının tersiyle)
+    symptom_hot = X[:, COL_SYMPTOM:COL_SEVERITY] > 0
+    
+    def _has(*symptoms: str) -> np.ndarray:
+        return symptom_hot[:, [SYMPTOM_INDEX[s] for s in symptoms]].any(axis=1)
+    
+    y = np.full(n, TIP_CATEGORIES['general_wellness'], dtype=np.int64)
+    y[np.isin(mood, [MOOD_INDEX[m] for m in ['sad', 'anxious', 'irritable', 'angry']])] = TIP_CATEGORIES['mood_support']
+    y[_has('lowEnergy', 'sleepy') | (mood == MOOD_INDEX['tired'])] = TIP_CATEGORIES['energy_boost']
+    y[(phase == PHASE_INDEX['menstrual']) & _has('cramp', 'backPain', 'headache')] = TIP_CATEGORIES['menstrual_relief']
     
-    X_list = []
-    y_list = []
+    return X, y
+
+
+def find_log_cycle_indices(cycles: List[Dict[str, Any]], logs: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Her log'un ait olduğu cycle'ın indeksi (-1 = hiçbir cycle'a ait değil).
+    Shard log'larda cycleIndex taşıyorsa doğrudan kullanılır; eski shard'larda sıralı
+    cycle başlangıç ordinal'leri üzerinde np.searchsorted + cycleEnd kontrolü yapılır.
+    """
+    if logs and all('cycleIndex' in log for log in logs):
+        return np.array([log['cycleIndex'] for log in logs], dtype=np.int64)
+    if not cycles:
+        return np.full(len(logs), -1, dtype=np.int64)
+    
+    starts = np.array([c['cycleStart'] for c in cycles], dtype='datetime64[D]').astype(np.int64)
+    ends = np.array([c['cycleEnd'] for c in cycles], dtype='datetime64[D]').astype(np.int64)
+    dates = np.array([log.get('date') for log in logs], dtype='datetime64[D]').astype(np.int64)
+    
+    order = np.argsort(starts, kind='stable')
+    position = np.searchsorted(starts[order], dates, side='right') - 1
+    cycle_index = order[np.maximum(position, 0)]
+    inside = (position >= 0) & (dates <= ends[cycle_index])
+    return np.where(inside, cycle_index, -1)
+
+
+def prepare_training_data(
+    users: Iterable[Dict[str, Any]],
+    expected_samples: Optional[int] = None,
+    stages: Optional[StageRecorder] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Kullanıcı akışından feature matrix ve labels oluştur.
+    X (float32) ve y önceden ayrılır: expected_samples biliniyorsa tam boyutta, değilse
+    kapasite ikiye katlanarak büyütülür. Kullanıcı listesi tutulmaz; loglar
+    FEATURE_BATCH_SIZE'lık bloklar halinde extract_features_batch'e verilir.
+    stages verilirse blokların extraction süresi 'feature_extraction' altında biriktirilir.
+    """
+    print("\nExtracting features from logs...")
+    stages = stages or StageRecorder()
+    
+    capacity = expected_samples if expected_samples else 65536
+    X = np.empty((capacity, N_FEATURES), dtype=np.float32)
+    y = np.empty(capacity, dtype=np.int64)
+    n_samples = 0
+    n_users = 0
+    pending_logs, pending_cycles = [], []
+    
+    def _flush() -> None:
+        nonlocal X, y, capacity, n_samples
+        with stages.accumulate('feature_extraction'):
+            X_block, y_block = extract_features_batch(pending_logs, pending_cycles)
+        if n_samples + len(X_block) > capacity:
+            capacity = max(capacity * 2, n_samples + len(X_block))
+            X = _resize_rows(X, capacity)
+            y = _resize_rows(y, capacity)
+        X[n_samples:n_samples + len(X_block)] = X_block
+        y[n_samples:n_samples + len(y_block)] = y_block
+        n_samples += len(X_block)
+        pending_logs.clear()
+        pending_cycles.clear()
     
     for user in users:
+        n_users += 1
         cycles = user.get('cycles', [])
         logs = user.get('logs', [])
         
-        for log in logs:
-            # Log'un hangi cycle'a ait olduğunu bul
-            log_date = log.get('date')
-            cycle_info = None
-            
-            for cycle in cycles:
-                if cycle['cycleStart'] <= log_date <= cycle['cycleEnd']:
-                    cycle_info = cycle
-                    break
-            
-            if not cycle_info:
+        for log, cycle_index in zip(logs, find_log_cycle_indices(cycles, logs).tolist()):
+            if cycle_index < 0:
                 continue  # Cycle bulunamadı, atla
             
-            # Feature extraction
-            features = extract_features_from_log(log, cycle_info)
-            
-            # Label determination
-            phase = log.get('phase', 'menstrual')
-            label = determine_tip_label(log, phase)
-            
-            X_list.append(features)
-            y_list.append(label)
+            pending_logs.append(log)
+            pending_cycles.append(cycles[cycle_index])
+        
+        if len(pending_logs) >= FEATURE_BATCH_SIZE:
+            _flush()
     
-    X = np.array(X_list, dtype=np.float32)
-    y = np.array(y_list, dtype=np.int64)
+    _flush()
+    X = X[:n_samples]
+    y = y[:n_samples]
     
-    print(f"✓ Extracted {len(X)} samples with {X.shape[1]} features")
+    print(f"✓ Extracted {n_samples} samples with {X.shape[1]} features from {n_users} users")
     return X, y
 
 
-def train_model(X: np.ndarray, y: np.ndarray, verbose: bool = True) -> Pipeline:
-    """Neural network eğit"""
+def _resize_rows(array: np.ndarray, rows: int) -> np.ndarray:
+    """Diziyi yeni satır kapasitesine taşı (mevcut satırları koru)"""
+    resized = np.empty((rows,) + array.shape[1:], dtype=array.dtype)
+    resized[:len(array)] = array
+    return resized
+
+
+def train_model(X: np.ndarray, y: np.ndarray, verbose: bool = True,
+                stages: Optional[StageRecorder] = None) -> Tuple[Pipeline, Dict[str, np.ndarray]]:
+    """
+    Neural network eğit. Export raporu için (pipeline, split) döner: split test matrisi/etiketleri ve
+    static quantization kalibrasyonu için eğitim matrisinden CALIBRATION_ROWS satır içerir.
+    stages verilirse split / fit / evaluate aşamaları ona kaydedilir.
+    """
+    stages = stages or StageRecorder()
     if verbose:
         print("\nTraining model...")
         print(f"  Samples: {len(X)}")
@@ -214,9 +429,10 @@ def train_model(X: np.ndarray, y: np.ndarray, verbose: bool = True) -> Pipeline:
         print(f"  Classes: {len(np.unique(y))}")
     
     # Train/test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    with stages.stage('split'):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
     
     if verbose:
         print(f"  Train: {len(X_train)}, Test: {len(X_test)}")
@@ -237,17 +453,19 @@ def train_model(X: np.ndarray, y: np.ndarray, verbose: bool = True) -> Pipeline:
     ])
     
     # Eğitim
-    pipeline.fit(X_train, y_train)
+    with stages.stage('fit'):
+        pipeline.fit(X_train, y_train)
     
     if verbose:
         print("\n✓ Training completed")
         
         # Evaluation
-        y_pred = pipeline.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-        recall = recall_score(y_test, y_pred, average='weighted', zero_division=0)
-        f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
+        with stages.stage('evaluate'):
+            y_pred = pipeline.predict(X_test)
+            accuracy = accuracy_score(y_test, y_pred)
+            precision = precision_score(y_test, y_pred, average='weighted', zero_division=0)
+            recall = recall_score(y_test, y_pred, average='weighted', zero_division=0)
+            f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
         
         print("\nModel Performance:")
         print(f"  Accuracy:  {accuracy*100:.2f}%")
@@ -255,7 +473,9 @@ def train_model(X: np.ndarray, y: np.ndarray, verbose: bool = True) -> Pipeline:
         print(f"  Recall:    {recall*100:.2f}%")
         print(f"  F1-Score:  {f1*100:.2f}%")
     
-    return pipeline
+    rng = np.random.default_rng(42)
+    calibration = X_train[np.sort(rng.choice(len(X_train), min(CALIBRATION_ROWS, len(X_train)), replace=False))]
+    return pipeline, {'X_calibration': calibration, 'X_test': X_test, 'y_test': y_test}
 
 
 def export_to_onnx(model: Pipeline, n_features: int, verbose: bool = True) -> None:
@@ -275,44 +495,218 @@ def export_to_onnx(model: Pipeline, n_features: int, verbose: bool = True) -> No
         print(f"✓ ONNX model saved: {TMP_MODEL.name} ({size_mb:.2f} MB)")
 
 
-def quantize_model(output_path: Path, verbose: bool = True) -> bool:
-    """Model'i quantize et (boyut küçültme) - opsiyonel"""
-    if not QUANTIZATION_AVAILABLE:
-        if verbose:
-            print("\n⚠️  Quantization skipped (onnxruntime quantization not available)")
-            print("   Installing: pip install onnxruntime")
-        # Quantize edilmemiş modeli kopyala
-        import shutil
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy(str(TMP_MODEL), str(output_path))
-        if verbose:
-            size_mb = output_path.stat().st_size / (1024 * 1024)
-            print(f"✓ Model saved (not quantized): {output_path.name} ({size_mb:.2f} MB)")
-        return False
+def optimize_graph(input_path: Path, output_path: Path, level: str = 'basic', verbose: bool = True) -> Path:
+    """onnxruntime offline graph optimizasyonu (optimized_model_filepath); 'none' girdiyi olduğu gibi döndürür"""
+    if level == 'none':
+        return input_path
+    
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[level]
+    options.optimized_model_filepath = str(output_path)
+    onnxruntime.InferenceSession(str(input_path), options, providers=['CPUExecutionProvider'])
     
     if verbose:
-        print("\nQuantizing model...")
+        print(f"✓ Graph optimized ({level}): {output_path.name} "
+              f"({input_path.stat().st_size / 1024:.1f} KB -> {output_path.stat().st_size / 1024:.1f} KB)")
+    return output_path
+
+
+class TrainingMatrixCalibrationReader(CalibrationDataReader):
+    """Static quantization kalibrasyonu: eğitim matrisi örneğini CALIBRATION_BATCH satırlık batch'lerle besler"""
     
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, X: np.ndarray, input_name: str = "input"):
+        self.batches = iter([{input_name: np.ascontiguousarray(X[i:i + CALIBRATION_BATCH], dtype=np.float32)}
+                             for i in range(0, len(X), CALIBRATION_BATCH)])
     
-    try:
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self.batches, None)
+
+
+def float16_weights(input_path: Path, output_path: Path, min_size: int = 16) -> None:
+    """
+    Float32 ağırlıkları float16 sakla, graph başında Cast ile float32'ye aç (boyut yarıya iner, hesaplama
+    float32 kalır; onnxruntime CPU'da float16 MatMul kernel'i her op için yok).
+    """
+    onnx_model = onnx.load(str(input_path))
+    graph = onnx_model.graph
+    casts = []
+    for initializer in list(graph.initializer):
+        array = numpy_helper.to_array(initializer)
+        if array.dtype != np.float32 or array.size < min_size:
+            continue
+        name = initializer.name
+        graph.initializer.remove(initializer)
+        graph.initializer.append(numpy_helper.from_array(array.astype(np.float16), f"{name}_fp16"))
+        casts.append(helper.make_node("Cast", [f"{name}_fp16"], [name], to=TensorProto.FLOAT,
+                                      name=f"{name}_cast"))
+    nodes = casts + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+    onnx.save(onnx_model, str(output_path))
+
+
+def quantize_model(input_path: Path, output_path: Path, variant: str,
+                   calibration: Optional[np.ndarray] = None) -> None:
+    """
+    Export varyantı üret: int8-dynamic (QUInt8 ağırlık), int8-static (kalibrasyonlu QDQ: QUInt8 aktivasyon,
+    QInt8 ağırlık), fp16 (float16 ağırlık) veya fp32 (kopya). Sadece MatMul'lar quantize edilir; Scaler
+    (ai.onnx.ml) shape inference'ı durdurduğu için tensor tipi DefaultTensorType ile verilir.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if variant == 'fp32':
+        shutil.copy(str(input_path), str(output_path))
+    elif variant == 'fp16':
+        float16_weights(input_path, output_path)
+    elif not QUANTIZATION_AVAILABLE:
+        raise RuntimeError(f"{variant} needs onnxruntime.quantization (pip install onnxruntime)")
+    elif variant == 'int8-dynamic':
         quantize_dynamic(
-            model_input=str(TMP_MODEL),
+            model_input=str(input_path),
             model_output=str(output_path),
-            weight_type=QuantType.QUInt8
+            weight_type=QuantType.QUInt8,
+            op_types_to_quantize=['MatMul'],
+            extra_options={'DefaultTensorType': TensorProto.FLOAT}
         )
-        
+    elif variant == 'int8-static':
+        if calibration is None:
+            raise ValueError("int8-static needs calibration rows")
+        quantize_static(
+            model_input=str(input_path),
+            model_output=str(output_path),
+            calibration_data_reader=TrainingMatrixCalibrationReader(calibration),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=['MatMul'],
+            extra_options={'DefaultTensorType': TensorProto.FLOAT}
+        )
+    else:
+        raise ValueError(f"Unknown export variant '{variant}'")
+
+
+class ExportGateError(RuntimeError):
+    """İstenen export varyantı accuracy kaybı sınırını aşıyor ya da üretilemedi (model.onnx yazılmaz)"""
+
+
+def evaluate_onnx_model(path: Path, X_test: np.ndarray, y_test: np.ndarray,
+                        reference: np.ndarray) -> Dict[str, float]:
+    """Varyantı onnxruntime'da (1 thread) ölç: boyut, test accuracy, sklearn ile uyum, tek satır gecikmesi"""
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    session = onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    X_test = np.ascontiguousarray(X_test, dtype=np.float32)
+    labels = session.run(["output_label"], {input_name: X_test})[0]
+    
+    session.run(None, {input_name: X_test[:1]})  # Warm-up
+    timings = []
+    for i in range(min(LATENCY_ROWS, len(X_test))):
+        start = time.perf_counter()
+        session.run(None, {input_name: X_test[i:i + 1]})
+        timings.append(time.perf_counter() - start)
+    return {
+        'size_kb': path.stat().st_size / 1024,
+        'accuracy': float(accuracy_score(y_test, labels)),
+        'agreement': float(np.mean(labels == reference)),
+        'latency_us_per_row': float(np.median(timings) * 1e6),
+    }
+
+
+def export_model(model: Pipeline, split: Dict[str, np.ndarray], output_path: Path, mode: str = 'auto',
+                 graph_optimization: str = 'basic', max_accuracy_drop: float = DEFAULT_MAX_ACCURACY_DROP,
+                 report_path: Optional[Path] = DEFAULT_REPORT, verbose: bool = True,
+                 stages: Optional[StageRecorder] = None) -> Dict[str, Any]:
+    """
+    TMP_MODEL'i (fp32) optimize et, tüm varyantları üret ve test setinde ölç. Rapor model.onnx'i kapılar:
+    auto modda accuracy kaybı max_accuracy_drop içindeki en küçük varyant, açık modda istenen varyant
+    sınır içindeyse yazılır; aksi halde ExportGateError (mevcut model.onnx'e dokunulmaz).
+    stages verilirse graph optimizasyonu ve varyant başına quantize + ölçüm aşama olarak kaydedilir.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {list(QUANTIZATION_MODES)}")
+    stages = stages or StageRecorder()
+    
+    if verbose:
+        print("\nBuilding export variants...")
+    with stages.stage('graph_optimization'):
+        base = optimize_graph(TMP_MODEL, TMP_MODEL.with_name("model_optimized.onnx"), graph_optimization, verbose)
+    reference = model.predict(split['X_test'])
+    
+    rows, paths = [], {}
+    for variant in ['fp32', 'fp16', 'int8-dynamic', 'int8-static']:
+        path = TMP_MODEL.with_name(f"model_{variant}.onnx")
+        try:
+            with stages.stage(variant):
+                quantize_model(base, path, variant, split['X_calibration'])
+                rows.append(dict(variant=variant,
+                                 **evaluate_onnx_model(path, split['X_test'], split['y_test'], reference)))
+            paths[variant] = path
+        except Exception as e:
+            rows.append({'variant': variant, 'error': f"{type(e).__name__}: {str(e).splitlines()[0][:200]}"})
+    
+    if 'error' in rows[0]:
+        # Kapı fp32'ye göre ölçülür; referans yoksa hiçbir varyant değerlendirilemez
+        for path in list(paths.values()) + [TMP_MODEL.with_name("model_optimized.onnx")]:
+            path.unlink(missing_ok=True)
+        raise ExportGateError(f"fp32 baseline failed: {rows[0]['error']}; {output_path.name} not written")
+    baseline = rows[0]['accuracy']
+    for row in rows:
+        if 'error' not in row:
+            row['within_budget'] = bool(baseline - row['accuracy'] <= max_accuracy_drop)
+    
+    if mode == 'auto':
+        passing = [row for row in rows if row.get('within_budget')]
+        chosen = (min(passing, key=lambda row: (row['size_kb'], row['latency_us_per_row']))['variant']
+                  if passing else 'fp32')
+    else:
+        chosen = QUANTIZATION_MODES[mode]
+    
+    if verbose:
+        print(f"\nExport report (test rows: {len(split['y_test']):,}, sklearn accuracy "
+              f"{accuracy_score(split['y_test'], reference):.4f}, max accuracy drop {max_accuracy_drop}):")
+        print(f"  {'variant':14s} {'size':>9s} {'µs/row':>8s} {'accuracy':>9s} {'agreement':>10s}")
+        for row in rows:
+            if 'error' in row:
+                print(f"  {row['variant']:14s} failed: {row['error']}")
+                continue
+            mark = ' <- shipped' if row['variant'] == chosen else ('' if row['within_budget'] else ' (over budget)')
+            print(f"  {row['variant']:14s} {row['size_kb']:6.1f} KB {row['latency_us_per_row']:8.1f} "
+                  f"{row['accuracy']:9.4f} {row['agreement']:10.4f}{mark}")
+    
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'graph_optimization': graph_optimization,
+        'max_accuracy_drop': max_accuracy_drop,
+        'calibration_rows': len(split['X_calibration']),
+        'test_rows': len(split['y_test']),
+        'sklearn_accuracy': float(accuracy_score(split['y_test'], reference)),
+        'variants': rows,
+        'chosen': chosen,
+        'output': str(output_path),
+    }
+    if report_path is not None:
+        with Path(report_path).open("w") as f:
+            json.dump(report, f, indent=2)
         if verbose:
-            size_mb = output_path.stat().st_size / (1024 * 1024)
-            print(f"✓ Quantized model saved: {output_path.name} ({size_mb:.2f} MB)")
-        return True
-    except Exception as e:
+            print(f"✓ Export report saved: {Path(report_path).name}")
+    
+    try:
+        row = next(row for row in rows if row['variant'] == chosen)
+        if 'error' in row:
+            raise ExportGateError(f"{chosen} export failed: {row['error']}")
+        if not row['within_budget']:
+            raise ExportGateError(f"{chosen} loses {baseline - row['accuracy']:.4f} accuracy vs fp32 "
+                                  f"(max {max_accuracy_drop}); {output_path.name} not written")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(str(paths[chosen]), str(output_path))
         if verbose:
-            print(f"⚠️  Quantization failed: {e}")
-            print("   Using non-quantized model...")
-        import shutil
-        shutil.copy(str(TMP_MODEL), str(output_path))
-        return False
+            print(f"✓ Model saved ({chosen}): {output_path.name} ({output_path.stat().st_size / 1024:.1f} KB)")
+    finally:
+        for path in list(paths.values()) + [TMP_MODEL.with_name("model_optimized.onnx")]:
+            path.unlink(missing_ok=True)
+    return report
 
 
 def main():
@@ -321,7 +715,7 @@ def main():
         "--data",
         type=str,
         default="ml/synthetic_cycle_data_v2_2_part_*.json",
-        help="Data file pattern (default: v2.2 shards)"
+        help="Data file pattern, .json, .jsonl[.gz|.zst] or .npz shards (default: v2.2 JSON shards)"
     )
     parser.add_argument(
         "--output",
@@ -329,13 +723,47 @@ def main():
         default=str(DEFAULT_OUTPUT),
         help="Output ONNX model path"
     )
+    parser.add_argument(
+        "--quantization",
+        choices=list(QUANTIZATION_MODES),
+        default="auto",
+        help="Export variant for model.onnx: static (calibrated INT8), dynamic (INT8 weights), fp16, none (fp32) "
+             "or auto (smallest variant within --max-accuracy-drop)"
+    )
+    parser.add_argument(
+        "--graph-optimization",
+        choices=list(GRAPH_OPTIMIZATION_LEVELS),
+        default="basic",
+        help="onnxruntime offline graph optimization before quantization (extended adds com.microsoft ops)"
+    )
+    parser.add_argument(
+        "--max-accuracy-drop",
+        type=float,
+        default=DEFAULT_MAX_ACCURACY_DROP,
+        help="Allowed test accuracy drop vs the fp32 ONNX model; otherwise model.onnx is not written"
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=str(DEFAULT_REPORT),
+        help="Accuracy / size / latency export report (JSON)"
+    )
     parser.add_argument(
         "--synthetic",
         action="store_true",
         help="Use old synthetic generator (legacy)"
     )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        nargs="?",
+        const="profiles",
+        default=None,
+        help="Dump cProfile stats per top-level stage to DIR (default: profiles/)"
+    )
     
     args = parser.parse_args()
+    stages = StageRecorder(profile_dir=args.profile)
     
     print("="*70)
     print("CycleMate - ML Model Training v2.2")
@@ -344,37 +772,53 @@ def main():
     
     start_time = time.time()
     
-    # Load data
-    if args.synthetic:
-        print("Using legacy synthetic data generator...")
-        from train_model import generate_synthetic_data as legacy_gen
-        examples = legacy_gen()
-        X = np.array([ex.features for ex in examples], dtype=np.float32)
-        y = np.array([ex.label for ex in examples], dtype=np.int64)
-    else:
-        print(f"Loading data from: {args.data}")
-        users = load_shard_files(args.data)
-        X, y = prepare_training_data(users)
+    # Load data (shard okuma lazy: 'load' ve 'feature_extraction' aynı aşamada iç içe ölçülür)
+    with stages.stage('load_features'):
+        if args.synthetic:
+            print("Using legacy synthetic data generator...")
+            from train_model import generate_synthetic_data as legacy_gen
+            examples = legacy_gen()
+            X = np.array([ex.features for ex in examples], dtype=np.float32)
+            y = np.array([ex.label for ex in examples], dtype=np.int64)
+        else:
+            print(f"Loading data from: {args.data}")
+            shard_files = find_shard_files(args.data)
+            X, y = prepare_training_data(stages.iterate('load', iter_shard_users(shard_files)),
+                                         count_shard_logs(shard_files), stages=stages)
     
     # Train
-    model = train_model(X, y, verbose=True)
+    with stages.stage('train'):
+        model, split = train_model(X, y, verbose=True, stages=stages)
     
     # Export to ONNX
-    export_to_onnx(model, X.shape[1], verbose=True)
+    with stages.stage('export'):
+        export_to_onnx(model, X.shape[1], verbose=True)
     
-    # Quantize
+    # Optimize + quantize + gate
     output_path = Path(args.output).resolve()
-    quantize_model(output_path, verbose=True)
-    
-    # Cleanup
-    TMP_MODEL.unlink(missing_ok=True)
+    report_path = Path(args.report).resolve()
+    try:
+        with stages.stage('quantize'):
+            report = export_model(model, split, output_path, mode=args.quantization,
+                                  graph_optimization=args.graph_optimization,
+                                  max_accuracy_drop=args.max_accuracy_drop, report_path=report_path, verbose=True,
+                                  stages=stages)
+    finally:
+        # Cleanup
+        TMP_MODEL.unlink(missing_ok=True)
+    
+    # Aşama ölçümleri export raporuna (train_model.py'nin training_results.json karşılığı) eklenir
+    stages.print_summary()
+    report['pipeline_stages'] = stages.report()
+    with report_path.open("w") as f:
+        json.dump(report, f, indent=2)
     
     # Summary
     elapsed = time.time() - start_time
     print("\n" + "="*70)
     print("TRAINING COMPLETED")
     print("="*70)
-    print(f"Model saved to: {output_path}")
+    print(f"Model saved to: {output_path} ({report['chosen']})")
     print(f"Total samples: {len(X)}")
     print(f"Features: {X.shape[1]}")
     print(f"Classes: {len(np.unique(y))}")